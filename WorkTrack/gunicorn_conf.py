@@ -0,0 +1,11 @@
+"""
+Gunicorn configuration, loaded with `gunicorn --config python:WorkTrack.gunicorn_conf`.
+"""
+
+
+def post_worker_init(worker):
+    """Warm the worker up after it loaded the application and before it accepts requests."""
+    from core.warmup import warm_up
+
+    timings = warm_up()
+    worker.log.info('Worker warmed up: %s', ', '.join(f'{step} {ms} ms' for step, ms in timings.items()))
@@ -12,7 +12,6 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
-import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -75,15 +74,21 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Answers /healthz and /readyz before everything else
+    "core.middleware.HealthCheckMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Add WhiteNoise middleware
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    # Session, CSRF and authentication are skipped for /api/ requests with a bearer token,
+    # messages for all /api/ requests
+    "core.middleware.TokenAwareSessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "core.middleware.TokenAwareCsrfViewMiddleware",
+    "core.middleware.TokenAwareAuthenticationMiddleware",
+    "core.middleware.NonApiMessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.ProfilingMiddleware",
+    "core.middleware.SlowQueryMiddleware",
 ]
 
 ROOT_URLCONF = "WorkTrack.urls"
@@ -111,6 +116,8 @@ WSGI_APPLICATION = "WorkTrack.wsgi.application"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 if ON_CLOUD and os.environ.get('DATABASE_URL'):
+    import dj_database_url
+
     database_url = os.environ.get('DATABASE_URL')
 
     # Handle Supabase connection strings properly
@@ -188,8 +195,18 @@ else:
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # A file instead of the shared in-memory database, whose table locks fail at once
+            # instead of waiting, so the concurrency tests can write from several threads
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
+    # "tuned" (default) applies SQLITE_PRAGMAS to every connection (see core.sqlite_tuning)
+    # and takes the write lock when a transaction starts; "default" keeps SQLite's defaults
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'tuned')
+    if SQLITE_PROFILE == 'tuned':
+        # Without IMMEDIATE, a transaction that reads first fails with "database is locked"
+        # instead of waiting when another worker writes
+        DATABASES["default"]["OPTIONS"] = {"transaction_mode": "IMMEDIATE"}
 
 
 # Password validation
@@ -244,6 +261,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Django REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.authentication.BearerTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -296,3 +314,105 @@ SESSION_COOKIE_AGE = 86400  # 24 hours
 SESSION_SAVE_EVERY_REQUEST = True  # Keep session alive on every request
 SESSION_COOKIE_NAME = 'sessionid'
 CSRF_COOKIE_HTTPONLY = False  # Must be False for JavaScript to read it
+
+# Admission control for PDF exports
+# Renders allowed at once across all workers on the host (each host of a multi-host deploy has its own)
+EXPORT_MAX_CONCURRENT = int(os.environ.get('EXPORT_MAX_CONCURRENT', '4'))
+# Requests allowed to wait for a slot on the host, and how long they wait before getting a 429
+EXPORT_QUEUE_SIZE = int(os.environ.get('EXPORT_QUEUE_SIZE', '8'))
+EXPORT_QUEUE_TIMEOUT = float(os.environ.get('EXPORT_QUEUE_TIMEOUT', '10'))
+# Directory for the cross-process slot lock files (defaults to the system temp dir)
+EXPORT_LOCK_DIR = os.environ.get('EXPORT_LOCK_DIR', None)
+
+# Request profiling (see core.middleware.ProfilingMiddleware)
+# Fraction of all requests to profile, in addition to staff requests with ?_profile=1
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+# Number of profiles kept, and where (defaults to a directory in the system temp dir)
+PROFILE_STORE_SIZE = int(os.environ.get('PROFILE_STORE_SIZE', '50'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', None)
+
+# Slow-query log (see core.slow_queries)
+# Queries slower than this many milliseconds are logged and aggregated; "off" disables the log
+_slow_query_threshold = os.environ.get('SLOW_QUERY_THRESHOLD_MS', '200')
+SLOW_QUERY_THRESHOLD_MS = None if _slow_query_threshold.lower() == 'off' else float(_slow_query_threshold)
+# Capture the query plan once per slow query fingerprint
+SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'true') == 'true'
+# Fingerprints buffered per thread between writes to the table; further slow queries are only logged
+SLOW_QUERY_BUFFER_SIZE = int(os.environ.get('SLOW_QUERY_BUFFER_SIZE', '100'))
+
+# Budget for worker startup imports, checked by `python manage.py import_time`
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', '600'))
+
+# Live statistics stream (see core.live_stats)
+# Seconds between keep-alive comments on idle streams, and to let a burst of writes settle
+LIVE_STATS_KEEPALIVE = float(os.environ.get('LIVE_STATS_KEEPALIVE', '15'))
+LIVE_STATS_DEBOUNCE = float(os.environ.get('LIVE_STATS_DEBOUNCE', '0.25'))
+# Postgres LISTEN needs a session of its own, which a transaction pooler such as Supabase's
+# (pooler.supabase.com, port 6543) does not keep: behind one, "auto" uses the change markers below
+_live_stats_notify = os.environ.get('LIVE_STATS_NOTIFY', 'auto').lower()
+if _live_stats_notify == 'auto':
+    _database_url = os.environ.get('DATABASE_URL', '')
+    LIVE_STATS_NOTIFY = 'pooler.' not in _database_url and ':6543/' not in _database_url
+else:
+    LIVE_STATS_NOTIFY = _live_stats_notify == 'true'
+# Without Postgres LISTEN/NOTIFY, change markers are files in this directory
+# (defaults to the system temp dir), checked every LIVE_STATS_POLL_INTERVAL seconds
+LIVE_STATS_DIR = os.environ.get('LIVE_STATS_DIR', None)
+LIVE_STATS_POLL_INTERVAL = float(os.environ.get('LIVE_STATS_POLL_INTERVAL', '1'))
+
+# Per-worker caches (employee directory, facet counts) re-read their generation counter in the
+# database at most this often, so writes on other workers and hosts show up within this many seconds
+GENERATION_CHECK_INTERVAL = float(os.environ.get('GENERATION_CHECK_INTERVAL', '1'))
+
+# SQLite connection settings applied by the "tuned" SQLite profile
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Milliseconds a connection waits for a lock held by another worker before giving up
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '20000')),
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    # Negative values are KiB
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+
+# Delta sync (see /api/sync/)
+# Seconds the sync token is taken back, so rows committed by transactions still running
+# at the time of a sync are delivered by the next one
+SYNC_SAFETY_WINDOW = float(os.environ.get('SYNC_SAFETY_WINDOW', '300'))
+# Tombstones of deleted rows are kept this many days (`manage.py prune_tombstones`);
+# clients with an older token get a full download
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', '90'))
+
+# Lifetime of API bearer tokens in seconds (default: 12 hours)
+API_TOKEN_MAX_AGE = int(os.environ.get('API_TOKEN_MAX_AGE', str(60 * 60 * 12)))
+
+# Steps run by core.warmup in every gunicorn worker before it accepts requests
+# (any of: database, urls, serializers, directory, pdf; empty to disable)
+WARMUP_STEPS = [
+    step.strip() for step in os.environ.get('WARMUP_STEPS', 'database,urls,serializers,directory,pdf').split(',')
+    if step.strip()
+]
+# /readyz reports the worker as not ready when `SELECT 1` takes longer than this
+READYZ_MAX_DB_LATENCY_MS = float(os.environ.get('READYZ_MAX_DB_LATENCY_MS', '500'))
+
+# Facet counts of the employee and project lists are cached per worker for up to this many
+# seconds, and dropped earlier by writes through the "facets" generation counter
+FACET_CACHE_TIMEOUT = int(os.environ.get('FACET_CACHE_TIMEOUT', '3600'))
+
+# Change events of employees, projects and hours are delivered by `manage.py dispatch_events`
+# as JSON batches POSTed to OUTBOX_ENDPOINT, signed with HMAC-SHA256 of OUTBOX_SECRET when set.
+# No events are recorded while OUTBOX_ENDPOINT is empty.
+OUTBOX_ENDPOINT = os.environ.get('OUTBOX_ENDPOINT', '')
+OUTBOX_SECRET = os.environ.get('OUTBOX_SECRET', '')
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '500'))
+OUTBOX_TIMEOUT = float(os.environ.get('OUTBOX_TIMEOUT', '10'))
+# Seconds between polls of an empty outbox, and the longest wait between retries of a failed batch
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', '1'))
+OUTBOX_RETRY_MAX_DELAY = float(os.environ.get('OUTBOX_RETRY_MAX_DELAY', '60'))
+
+# Writes through the API, the timesheet import and the admin actions are rejected when they book an
+# employee for more than DAILY_HOURS_LIMIT hours on one day; /api/overtime/ reports the hours of
+# each day above OVERTIME_DAILY_HOURS
+DAILY_HOURS_LIMIT = float(os.environ.get('DAILY_HOURS_LIMIT', '24'))
+OVERTIME_DAILY_HOURS = float(os.environ.get('OVERTIME_DAILY_HOURS', '8'))
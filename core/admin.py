@@ -1,7 +1,38 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import HttpResponseRedirect
+from django.utils import timezone
+from django.utils.functional import cached_property
+from . import daily_totals, live_stats, month_close, outbox
 from .models import Employee, Project, EmployeeProject
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids an exact COUNT(*) over large unfiltered tables.
+    On PostgreSQL the planner's row estimate is used once the table is big;
+    filtered querysets and other databases fall back to an exact count.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if connection.vendor == 'postgresql' and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [query.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > self.exact_count_threshold:
+                return row[0]
+        return super().count
+
+
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
     list_display = ['id', 'first_name', 'last_name', 'phone_number', 'role', 'hourly_rate', 'created_at']
@@ -10,17 +41,126 @@ class EmployeeAdmin(admin.ModelAdmin):
     ordering = ['last_name', 'first_name']
 
 
+class DailyLimitAdminMixin:
+    """
+    Check the daily totals a save changed (left on the instance by the save signals) while
+    they are locked. Going over the limit rolls the admin's transaction back and is shown
+    as an error message.
+    """
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        daily_totals.check(getattr(obj, '_daily_totals', {}))
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except daily_totals.DailyLimitExceeded as exc:
+            self.message_user(request, f'Nothing was changed: {exc}', messages.ERROR)
+            return HttpResponseRedirect(request.get_full_path())
+
+
+class EmployeeProjectAdminForm(forms.ModelForm):
+    """Shows going over the daily limit as a form error; save_model checks again under the lock."""
+
+    def clean(self):
+        cleaned_data = super().clean()
+        employee, project, hours = (cleaned_data.get(field) for field in ('employee', 'project', 'hours_worked'))
+        if employee is None or project is None or hours is None:
+            return cleaned_data
+        pair = (employee.pk, project.date)
+        total = daily_totals.current({pair})[pair] + hours
+        if self.instance.pk is not None and (self.instance.employee_id, self.instance.project.date) == pair:
+            total -= self.instance.hours_worked
+        days = daily_totals.over_limit({pair: total})
+        if days:
+            raise forms.ValidationError(str(daily_totals.DailyLimitExceeded(days)))
+        return cleaned_data
+
+
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(DailyLimitAdminMixin, admin.ModelAdmin):
     list_display = ['id', 'name', 'date', 'created_at']
     list_filter = ['date', 'created_at']
     search_fields = ['name', 'description']
     ordering = ['-date', '-created_at']
+    date_hierarchy = 'date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(EmployeeProject)
-class EmployeeProjectAdmin(admin.ModelAdmin):
+class EmployeeProjectAdmin(DailyLimitAdminMixin, admin.ModelAdmin):
+    form = EmployeeProjectAdminForm
     list_display = ['id', 'employee', 'project', 'hours_worked', 'created_at', 'updated_at']
     list_filter = ['created_at', 'project__date']
+    list_select_related = ['employee', 'project']
     search_fields = ['employee__first_name', 'employee__last_name', 'project__name']
-    ordering = ['-created_at']
\ No newline at end of file
+    ordering = ['-created_at']
+    autocomplete_fields = ['employee', 'project']
+    date_hierarchy = 'project__date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['add_one_hour', 'subtract_one_hour', 'set_eight_hours', 'reset_hours']
+
+    def _update_hours(self, request, queryset, message, **values):
+        """
+        Apply a single UPDATE to all selected rows.
+        update() skips auto_now and save signals, so updated_at is set here to keep the
+        sync feed accurate, the daily totals and outbox events are written from the updated
+        rows and the touched months are published to the live statistics.
+        Nothing is changed when an employee would go over the daily limit or a selected
+        assignment is in a closed month.
+        """
+        month_dates = queryset.dates('project__date', 'month')
+        months = {live_stats.month_key(date) for date in month_dates}
+        try:
+            with transaction.atomic():
+                closed = month_close.closed_months(month_dates, lock=True)
+                if closed:
+                    self.message_user(
+                        request, f"Nothing was changed: {', '.join(closed)} closed, reopen first.", messages.ERROR
+                    )
+                    return
+                daily_totals.lock(set(queryset.values_list('employee_id', 'project__date')))
+                before = {
+                    pk: (employee_id, day, hours)
+                    for pk, employee_id, day, hours in queryset.values_list(
+                        'id', 'employee_id', 'project__date', 'hours_worked'
+                    )
+                }
+                updated = EmployeeProject.objects.filter(id__in=before).update(updated_at=timezone.now(), **values)
+                saved = list(EmployeeProject.objects.filter(id__in=before))
+                changes = []
+                for assignment in saved:
+                    employee_id, day, hours = before[assignment.id]
+                    changes.append((employee_id, day, assignment.hours_worked - hours, 0))
+                totals = daily_totals.apply(changes)
+                # Days that lost hours may stay above the limit
+                daily_totals.check({
+                    (employee_id, day): totals[(employee_id, day)]
+                    for employee_id, day, hours, _ in changes if hours > 0
+                })
+                outbox.record_many(saved, outbox.UPDATED)
+        except daily_totals.DailyLimitExceeded as exc:
+            self.message_user(request, f'Nothing was changed: {exc}', messages.ERROR)
+            return
+        live_stats.changed(months)
+        self.message_user(request, message % updated, messages.SUCCESS)
+
+    @admin.action(description='Add 1 hour to selected assignments')
+    def add_one_hour(self, request, queryset):
+        self._update_hours(request, queryset, '%d assignments updated.', hours_worked=F('hours_worked') + 1)
+
+    @admin.action(description='Subtract 1 hour from selected assignments')
+    def subtract_one_hour(self, request, queryset):
+        self._update_hours(request, queryset.filter(hours_worked__gte=1), '%d assignments updated.',
+                           hours_worked=F('hours_worked') - 1)
+
+    @admin.action(description='Set selected assignments to 8 hours')
+    def set_eight_hours(self, request, queryset):
+        self._update_hours(request, queryset, '%d assignments set to 8 hours.', hours_worked=8.0)
+
+    @admin.action(description='Reset hours of selected assignments to 0')
+    def reset_hours(self, request, queryset):
+        self._update_hours(request, queryset, '%d assignments reset.', hours_worked=0.0)
@@ -0,0 +1,188 @@
+"""
+Admission control for expensive endpoints.
+
+Caps how many requests of one kind run at the same time across all gunicorn
+workers on the host. Both the running requests and the queue of waiting ones
+are fixed sets of flock()ed slot files, since every sync worker serves one
+request at a time and a per-process limit would never be reached. Requests
+that find the queue full are rejected at once, queued ones wait for a slot
+until a deadline and are then rejected, so cheap endpoints keep a free worker
+instead of queueing behind a burst of PDF renders. The limits hold per host;
+each host of a multi-host deploy admits its own slots.
+"""
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request could not get a slot before its deadline."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Cross-process concurrency limiter with a bounded wait queue, both counted in slot files.
+    Counters are per process, each worker reports its own.
+    """
+    poll_interval = 0.05
+
+    def __init__(self, name, max_concurrent, queue_size, timeout, lock_dir=None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.lock_dir = lock_dir or tempfile.gettempdir()
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.active = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    @classmethod
+    def from_settings(cls, name):
+        return cls(
+            name,
+            max_concurrent=settings.EXPORT_MAX_CONCURRENT,
+            queue_size=settings.EXPORT_QUEUE_SIZE,
+            timeout=settings.EXPORT_QUEUE_TIMEOUT,
+            lock_dir=settings.EXPORT_LOCK_DIR,
+        )
+
+    def _retry_after(self):
+        """Seconds a rejected client should wait, based on the average run time."""
+        average_run = self.total_run / self.admitted if self.admitted else self.timeout
+        return max(1, math.ceil(average_run * (self.queue_size + 1) / self.max_concurrent))
+
+    def _try_lock(self, kind, count):
+        """Lock one of count slot files of a kind without waiting. Returns the open file, or None."""
+        for slot in range(count):
+            path = os.path.join(self.lock_dir, f'worktrack-{self.name}-{kind}-{slot}.lock')
+            handle = open(path, 'a')
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return handle
+            except OSError:
+                handle.close()
+        return None
+
+    def _acquire(self, deadline):
+        """
+        Lock one of the run slot files, polling until the deadline.
+        Returns the open file holding the lock, or None on timeout.
+        """
+        while True:
+            handle = self._try_lock('run', self.max_concurrent)
+            if handle is not None or time.monotonic() >= deadline:
+                return handle
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def _release(handle):
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot for the duration of the block, or raise AdmissionRejected."""
+        if fcntl is None:
+            # No cross-process locking on this platform, run unlimited
+            yield
+            return
+
+        # A queue ticket for every request that runs or waits, so at most queue_size wait
+        ticket = self._try_lock('ticket', self.max_concurrent + self.queue_size)
+        if ticket is None:
+            with self._lock:
+                self.rejected_queue_full += 1
+            raise AdmissionRejected('queue full', self._retry_after())
+
+        try:
+            with self._lock:
+                self.waiting += 1
+            started = time.monotonic()
+            handle = self._acquire(started + self.timeout)
+            waited = time.monotonic() - started
+            with self._lock:
+                self.waiting -= 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+                if handle is None:
+                    self.rejected_timeout += 1
+                    raise AdmissionRejected('timed out waiting for a slot', self._retry_after())
+                self.admitted += 1
+                self.active += 1
+
+            try:
+                yield
+            finally:
+                self._release(handle)
+                with self._lock:
+                    self.active -= 1
+                    self.total_run += time.monotonic() - started - waited
+        finally:
+            self._release(ticket)
+
+    def snapshot(self):
+        """Current counters of this process as a dict."""
+        with self._lock:
+            waits = self.admitted + self.rejected_timeout
+            return {
+                'name': self.name,
+                'pid': os.getpid(),
+                'max_concurrent': self.max_concurrent,
+                'queue_size': self.queue_size,
+                'queue_timeout': self.timeout,
+                'queue_depth': self.waiting,
+                'active': self.active,
+                'admitted': self.admitted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_timeout': self.rejected_timeout,
+                'average_wait': round(self.total_wait / waits, 4) if waits else 0.0,
+                'max_wait': round(self.max_wait, 4),
+                'average_run': round(self.total_run / self.admitted, 4) if self.admitted else 0.0,
+            }
+
+
+def admission_controlled(limiter):
+    """
+    View decorator that runs the view inside a limiter slot and answers
+    429 Too Many Requests with Retry-After when no slot could be obtained.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            try:
+                with limiter.slot():
+                    return view(request, *args, **kwargs)
+            except AdmissionRejected as exc:
+                response = HttpResponse(
+                    f'Too many exports in progress ({exc.reason}), please retry later', status=429
+                )
+                response['Retry-After'] = str(exc.retry_after)
+                return response
+        return wrapped
+    return decorator
+
+
+export_limiter = AdmissionLimiter.from_settings('pdf-export')
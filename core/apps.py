@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.core.signals import request_finished
+        from django.db.backends.signals import connection_created
+        from . import signals  # noqa: F401
+        from . import slow_queries, sqlite_tuning
+
+        connection_created.connect(sqlite_tuning.apply_pragmas)
+        connection_created.connect(slow_queries.install)
+        request_finished.connect(slow_queries.flush)
@@ -0,0 +1,135 @@
+"""
+Cold-storage archival of closed months.
+
+Projects and their EmployeeProject rows for a month are moved into the
+ArchivedProject / ArchivedEmployeeProject tables together with an
+ArchiveManifest row holding the month totals. The hot tables then only
+carry recent data, while reports and statistics can still read archived months.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+
+from . import facets, live_stats, outbox
+from .models import (
+    Project, EmployeeProject,
+    ArchiveManifest, ArchivedProject, ArchivedEmployeeProject
+)
+
+
+def parse_month(value):
+    """
+    Parse a 'YYYY-MM' string into a (year, month) tuple.
+    Raises ValueError for anything else.
+    """
+    year, month = value.split('-')
+    year, month = int(year), int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month: {value}")
+    return year, month
+
+
+def _copy_in_batches(queryset, model, build, batch_size, record_as=None):
+    """
+    Copy every row of queryset into model, batch_size rows per INSERT.
+    With record_as, an outbox event with that action is written for each copied row.
+    """
+    batch = []
+    for row in queryset.iterator(chunk_size=batch_size):
+        batch.append(build(row))
+        if len(batch) >= batch_size:
+            _insert(model, batch, record_as)
+            batch = []
+    if batch:
+        _insert(model, batch, record_as)
+
+
+def _insert(model, batch, record_as):
+    model.objects.bulk_create(batch)
+    if record_as is not None:
+        outbox.record_many(batch, record_as)
+
+
+def archivable_months(before):
+    """
+    Return the (year, month) tuples that still have hot rows before the given month.
+    """
+    cutoff = date(before[0], before[1], 1)
+    months = Project.objects.filter(date__lt=cutoff).dates('date', 'month')
+    return [(d.year, d.month) for d in months]
+
+
+def archive_month(year, month, batch_size=1000):
+    """
+    Move one month of projects and assignments into the archive tables.
+    Returns the ArchiveManifest for the month.
+    """
+    with transaction.atomic():
+        projects = Project.objects.filter(date__year=year, date__month=month)
+        assignments = EmployeeProject.objects.filter(project__date__year=year, project__date__month=month)
+
+        project_count = projects.count()
+        totals = assignments.aggregate(count=Count('id'), hours=Sum('hours_worked'))
+
+        _copy_in_batches(projects, ArchivedProject, lambda p: ArchivedProject(
+            id=p.id, name=p.name, description=p.description, date=p.date,
+            created_at=p.created_at, updated_at=p.updated_at,
+        ), batch_size)
+        _copy_in_batches(assignments, ArchivedEmployeeProject, lambda ep: ArchivedEmployeeProject(
+            id=ep.id, employee_id=ep.employee_id, project_id=ep.project_id, hours_worked=ep.hours_worked,
+            created_at=ep.created_at, updated_at=ep.updated_at,
+        ), batch_size)
+
+        # A month can be archived again if rows were added after it was first archived
+        manifest, created = ArchiveManifest.objects.get_or_create(year=year, month=month)
+        manifest.project_count += project_count
+        manifest.assignment_count += totals['count']
+        # Counted over the whole archived month, an employee archived twice counts once
+        manifest.employee_count = ArchivedEmployeeProject.objects.filter(
+            project__date__year=year, project__date__month=month
+        ).values('employee').distinct().count()
+        manifest.total_hours += totals['hours'] or 0.0
+        manifest.save()
+
+        # Deleting the projects cascades to their assignments. The rows still count,
+        # so downstream systems get 'archived' events instead of 'deleted' ones
+        with outbox.deletes_recorded_as(outbox.ARCHIVED):
+            projects.delete()
+
+    return manifest
+
+
+def restore_month(year, month, batch_size=1000):
+    """
+    Move an archived month back into the hot tables and drop its manifest.
+    Returns the number of projects restored.
+    """
+    with transaction.atomic():
+        projects = ArchivedProject.objects.filter(date__year=year, date__month=month)
+        assignments = ArchivedEmployeeProject.objects.filter(project__date__year=year, project__date__month=month)
+        project_count = projects.count()
+
+        _copy_in_batches(projects, Project, lambda p: Project(
+            id=p.id, name=p.name, description=p.description, date=p.date,
+        ), batch_size, record_as=outbox.RESTORED)
+        _copy_in_batches(assignments, EmployeeProject, lambda ep: EmployeeProject(
+            id=ep.id, employee_id=ep.employee_id, project_id=ep.project_id, hours_worked=ep.hours_worked,
+        ), batch_size, record_as=outbox.RESTORED)
+
+        # bulk_create stamps created_at with the current time, so put the
+        # original values back in one statement per table. updated_at keeps
+        # the restore time so sync clients pick the rows up again.
+        Project.objects.filter(id__in=projects.values('id')).update(
+            created_at=Subquery(ArchivedProject.objects.filter(id=OuterRef('id')).values('created_at')[:1])
+        )
+        EmployeeProject.objects.filter(id__in=assignments.values('id')).update(
+            created_at=Subquery(ArchivedEmployeeProject.objects.filter(id=OuterRef('id')).values('created_at')[:1])
+        )
+
+        projects.delete()
+        ArchiveManifest.objects.filter(year=year, month=month).delete()
+        live_stats.changed({f'{year:04d}-{month:02d}'})
+        facets.invalidate()
+
+    return project_count
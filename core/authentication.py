@@ -0,0 +1,27 @@
+"""
+Django REST framework authentication with the stateless bearer tokens of core.tokens.
+"""
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import tokens
+
+
+class BearerTokenAuthentication(BaseAuthentication):
+    """
+    Authenticate "Authorization: Bearer <token>" requests with one primary key query.
+    Requests without a bearer token are left to the next authentication class.
+    """
+
+    def authenticate(self, request):
+        token = tokens.from_request(request)
+        if token is None:
+            return None
+        # Shared with the lazy request.user of TokenAwareAuthenticationMiddleware
+        user = tokens.request_user(request._request)
+        if user is None:
+            raise AuthenticationFailed('Invalid, expired or revoked token.')
+        return user, token
+
+    def authenticate_header(self, request):
+        return tokens.KEYWORD
@@ -0,0 +1,130 @@
+"""
+Per-employee daily hour totals.
+
+EmployeeDailyTotal holds the hours and the number of assignments of every
+employee and workday, so the daily limit is checked and overtime reported
+from one small row per day instead of summing EmployeeProject rows joined to
+their projects. Assignment writes change the totals in their own transaction:
+
+1. lock() upserts the rows of the (employee, day) pairs a write touches
+   without changing them, before the assignments are read or written. Writes
+   for the same employee and day therefore run one after another and see the
+   hours the previous one committed.
+2. apply() adds the hour and entry differences in one statement and drops
+   rows left without entries.
+
+The save and delete signals do this for single writes and cascades, the bulk
+write paths call it themselves. Archiving a month keeps its totals.
+"""
+from collections import defaultdict
+from datetime import date
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .models import EmployeeDailyTotal
+
+# Float sums of hours may be off in the last digits
+TOLERANCE = 1e-6
+
+UPSERT_SQL = (
+    'INSERT INTO {table} (employee_id, date, hours, entries) VALUES {values} '
+    'ON CONFLICT (employee_id, date) DO UPDATE '
+    'SET hours = {table}.hours + EXCLUDED.hours, entries = {table}.entries + EXCLUDED.entries '
+    'RETURNING id, employee_id, date, hours, entries'
+)
+
+
+class DailyLimitExceeded(Exception):
+    """A write would book an employee for more than DAILY_HOURS_LIMIT hours on a day."""
+
+    def __init__(self, days):
+        self.days = days
+        super().__init__('; '.join(
+            f'employee {employee_id} would have {hours:g}h on {day}' for (employee_id, day), hours in days
+        ) + f' (daily limit {settings.DAILY_HOURS_LIMIT:g}h)')
+
+
+def _upsert(changes, using):
+    """Add (hours, entries) to each (employee_id, day) row. Returns {pair: (id, hours, entries)}."""
+    if not changes:
+        return {}
+    connection = connections[using]
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        rows = {}
+        for (employee_id, day), (hours, entries) in sorted(changes.items()):
+            total, _ = EmployeeDailyTotal.objects.using(using).select_for_update().get_or_create(
+                employee_id=employee_id, date=day
+            )
+            total.hours += hours
+            total.entries += entries
+            total.save(update_fields=['hours', 'entries'])
+            rows[(employee_id, day)] = (total.id, total.hours, total.entries)
+        return rows
+
+    date_field = EmployeeDailyTotal._meta.get_field('date')
+    params = []
+    # Sorted, so concurrent writes lock shared rows in the same order
+    for (employee_id, day), (hours, entries) in sorted(changes.items()):
+        params += [employee_id, date_field.get_db_prep_value(day, connection), hours, entries]
+    sql = UPSERT_SQL.format(
+        table=connection.ops.quote_name(EmployeeDailyTotal._meta.db_table),
+        values=', '.join(['(%s, %s, %s, %s)'] * len(changes)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    # SQLite returns the date as text
+    return {
+        (employee_id, day if isinstance(day, date) else date.fromisoformat(day)): (row_id, hours, entries)
+        for row_id, employee_id, day, hours, entries in rows
+    }
+
+
+def lock(pairs, using=DEFAULT_DB_ALIAS):
+    """Lock the totals of (employee_id, day) pairs, creating empty ones. Returns {pair: hours}."""
+    rows = _upsert({pair: (0.0, 0) for pair in pairs}, using)
+    return {pair: hours for pair, (_, hours, _) in rows.items()}
+
+
+def current(pairs, using=DEFAULT_DB_ALIAS):
+    """The totals of (employee_id, day) pairs without locking them, 0 for days without hours. Returns {pair: hours}."""
+    totals = dict.fromkeys(pairs, 0.0)
+    rows = EmployeeDailyTotal.objects.using(using).filter(
+        employee_id__in={employee_id for employee_id, _ in pairs}, date__in={day for _, day in pairs}
+    ).values_list('employee_id', 'date', 'hours')
+    for employee_id, day, hours in rows:
+        if (employee_id, day) in totals:
+            totals[(employee_id, day)] = hours
+    return totals
+
+
+def apply(changes, using=DEFAULT_DB_ALIAS):
+    """
+    Add (employee_id, day, hours, entries) changes to the totals. Several changes of one pair are summed.
+    Returns the new {pair: hours}; pairs left without entries are deleted.
+    """
+    summed = defaultdict(lambda: [0.0, 0])
+    for employee_id, day, hours, entries in changes:
+        summed[(employee_id, day)][0] += hours
+        summed[(employee_id, day)][1] += entries
+    rows = _upsert(summed, using)
+    empty = [row_id for row_id, _, entries in rows.values() if entries <= 0]
+    if empty:
+        EmployeeDailyTotal.objects.using(using).filter(id__in=empty).delete()
+    return {pair: hours for pair, (_, hours, entries) in rows.items() if entries > 0}
+
+
+def over_limit(totals):
+    """The (pair, hours) items of {pair: hours} above DAILY_HOURS_LIMIT."""
+    return sorted(
+        (pair, round(hours, 2)) for pair, hours in totals.items()
+        if hours > settings.DAILY_HOURS_LIMIT + TOLERANCE
+    )
+
+
+def check(totals):
+    """Raise DailyLimitExceeded if any of {pair: hours} is above DAILY_HOURS_LIMIT."""
+    days = over_limit(totals)
+    if days:
+        raise DailyLimitExceeded(days)
@@ -0,0 +1,138 @@
+"""
+In-process employee directory.
+
+Every worker keeps all employees in memory with indexes by id, phone number
+and name prefix, so lookups and autocomplete need no database query. The copy
+is tagged with a generation number from the database (core.generations);
+Employee saves and deletes bump it on commit, and a worker rebuilds its copy
+on the next lookup after it noticed the number changed.
+
+A worker only notices the change after GENERATION_CHECK_INTERVAL, so writes and
+exports use lookup(), which falls back to the database for ids the copy misses.
+"""
+import bisect
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+
+from .generations import GenerationCounter
+from .models import Employee
+
+FIELDS = [field.attname for field in Employee._meta.concrete_fields]
+
+generation = GenerationCounter('employee-directory')
+
+
+def _normalize(text):
+    return ' '.join(str(text).casefold().split())
+
+
+def _phone_digits(phone_number):
+    return ''.join(character for character in phone_number if character.isdigit())
+
+
+def bump_generation():
+    """Increment the shared generation so every worker rebuilds its directory."""
+    new_generation = generation.bump()
+    directory.clear()
+    return new_generation
+
+
+class Snapshot:
+    """One immutable build of the directory."""
+
+    def __init__(self, generation, rows):
+        self.generation = generation
+        self.rows = {row[0]: row for row in rows}
+        self.by_phone = {}
+        keys = []
+        for row in rows:
+            values = dict(zip(FIELDS, row))
+            self.by_phone[values['phone_number']] = row[0]
+            first, last = _normalize(values['first_name']), _normalize(values['last_name'])
+            for key in {first, last, f'{first} {last}', f'{last} {first}', *first.split(), *last.split()}:
+                if key:
+                    keys.append((key, row[0]))
+            digits = _phone_digits(values['phone_number'])
+            if digits:
+                keys.append((digits, row[0]))
+        keys.sort()
+        self.prefix_keys = [key for key, _ in keys]
+        self.prefix_ids = [employee_id for _, employee_id in keys]
+        # Model ordering: last name, then first name
+        self.rank = {
+            row[0]: position
+            for position, row in enumerate(sorted(rows, key=lambda row: (row[FIELDS.index('last_name')],
+                                                                          row[FIELDS.index('first_name')])))
+        }
+
+
+class EmployeeDirectory:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def clear(self):
+        self._snapshot = None
+
+    def snapshot(self):
+        """The current build, rebuilt when another worker (or this one) changed an employee."""
+        current = generation.read()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == current:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != current:
+                # The generation is read before the rows, so a change committed meanwhile triggers another rebuild
+                rows = list(Employee.objects.order_by().values_list(*FIELDS))
+                snapshot = self._snapshot = Snapshot(current, rows)
+        return snapshot
+
+    def _instance(self, row):
+        return Employee.from_db(DEFAULT_DB_ALIAS, FIELDS, row)
+
+    def get(self, employee_id):
+        """A fresh Employee instance for an id, or None."""
+        try:
+            row = self.snapshot().rows.get(int(employee_id))
+        except (TypeError, ValueError):
+            return None
+        return self._instance(row) if row is not None else None
+
+    def lookup(self, employee_id):
+        """Like get(), but an id missing from the copy (created by another worker meanwhile) is read from the database."""
+        employee = self.get(employee_id)
+        if employee is None and str(employee_id).isdigit():
+            employee = Employee.objects.filter(pk=employee_id).first()
+        return employee
+
+    def get_by_phone(self, phone_number):
+        snapshot = self.snapshot()
+        employee_id = snapshot.by_phone.get(phone_number)
+        return self._instance(snapshot.rows[employee_id]) if employee_id is not None else None
+
+    def search(self, query, limit=10):
+        """
+        Employees with a first name, last name, full name or phone number starting with the query,
+        as dicts in model order.
+        """
+        snapshot = self.snapshot()
+        query = _normalize(query)
+        if _phone_digits(query) and not query.strip('+0123456789 /-()'):
+            query = _phone_digits(query)
+        if not query:
+            return []
+
+        start = bisect.bisect_left(snapshot.prefix_keys, query)
+        matches = set()
+        for position in range(start, len(snapshot.prefix_keys)):
+            if not snapshot.prefix_keys[position].startswith(query):
+                break
+            matches.add(snapshot.prefix_ids[position])
+
+        ordered = sorted(matches, key=snapshot.rank.__getitem__)[:limit]
+        return [dict(zip(FIELDS, snapshot.rows[employee_id])) for employee_id in ordered]
+
+
+directory = EmployeeDirectory()
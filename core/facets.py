@@ -0,0 +1,112 @@
+"""
+Facet counts for the employee and project lists.
+
+Each facet is one grouped query over the filtered list, without the
+facet's own filter, so the sidebar still shows the other choices. Results
+are cached per process under the current facet generation; writes that can
+change a count bump the generation after commit, which makes every worker
+compute fresh counts on its next request.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Min, Value
+from django.db.models.functions import Lower, Trim, TruncMonth
+
+from .generations import GenerationCounter
+from .models import EmployeeProject
+
+generation = GenerationCounter('facets')
+
+
+def invalidate(using=DEFAULT_DB_ALIAS):
+    """Drop the cached facet counts of all workers once the current transaction commits."""
+    transaction.on_commit(generation.bump, using=using)
+
+
+def role_key(role):
+    """The role_key of a role, computed by the database exactly like the stored column."""
+    return Lower(Trim(Value(role)))
+
+
+def _month(day):
+    return f'{day.year:04d}-{day.month:02d}'
+
+
+def _role_counts(queryset, key, label, counted):
+    rows = (
+        queryset.values(key)
+        .annotate(label=Min(label), count=Count(counted, distinct=True))
+        .order_by('-count', key)
+    )
+    return [{'value': row[key], 'label': row['label'], 'count': row['count']} for row in rows]
+
+
+def _month_counts(queryset, day, counted):
+    rows = (
+        queryset.annotate(period=TruncMonth(day))
+        .values('period')
+        .annotate(count=Count(counted, distinct=True))
+        .order_by('period')
+    )
+    return [{'value': _month(row['period']), 'count': row['count']} for row in rows]
+
+
+def employee_roles(employees):
+    """Employees per role."""
+    return _role_counts(employees, 'role_key', 'role', 'id')
+
+
+def employee_months(employees):
+    """Employees with hours in each month."""
+    return _month_counts(EmployeeProject.objects.filter(employee__in=employees), 'project__date', 'employee')
+
+
+def project_months(projects):
+    """Projects per month."""
+    return _month_counts(projects, 'date', 'id')
+
+
+def project_roles(projects):
+    """Projects with at least one crew member of each role."""
+    return _role_counts(
+        EmployeeProject.objects.filter(project__in=projects), 'employee__role_key', 'employee__role', 'project'
+    )
+
+
+FACETS = {
+    'employee': {'role': employee_roles, 'month': employee_months},
+    'project': {'role': project_roles, 'month': project_months},
+}
+
+
+def requested(value, kind):
+    """The facet names of a comma separated ?facets= value. Raises ValueError for unknown names."""
+    names = list(dict.fromkeys(name.strip() for name in (value or '').split(',') if name.strip()))
+    unknown = [name for name in names if name not in FACETS[kind]]
+    if unknown:
+        raise ValueError(
+            f"Unknown facet(s): {', '.join(unknown)}. Available: {', '.join(FACETS[kind])}"
+        )
+    return names
+
+
+def counts(kind, names, queryset_for, params):
+    """
+    Counts of the requested facets. queryset_for(name) returns the filtered list without the
+    filter of that facet; params are the filter parameters it was built from (cache key).
+    """
+    current = generation.read()
+    result = {}
+    for name in names:
+        key_source = json.dumps([current, kind, name, sorted(params.items())], default=str)
+        key = f'facets:{hashlib.md5(key_source.encode()).hexdigest()}'
+        values = cache.get(key)
+        if values is None:
+            values = FACETS[kind][name](queryset_for(name))
+            cache.set(key, values, settings.FACET_CACHE_TIMEOUT)
+        result[name] = values
+    return result
@@ -0,0 +1,52 @@
+"""
+Generation counters shared by all workers of all hosts.
+
+A counter is a row of the Generation table. Per-process caches remember the
+generation they were built for and rebuild once it changed; writers bump it
+after committing. A worker reads the row at most once per
+GENERATION_CHECK_INTERVAL seconds, so other workers see a bump within that
+time, while the worker that bumped it sees it at once.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Generation
+
+
+class GenerationCounter:
+    """The counter in the Generation row of a name."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._value = None
+        self._checked_at = 0.0
+
+    def _remember(self, value):
+        with self._lock:
+            self._value, self._checked_at = value, time.monotonic()
+        return value
+
+    def read(self):
+        with self._lock:
+            if self._value is not None and time.monotonic() - self._checked_at < settings.GENERATION_CHECK_INTERVAL:
+                return self._value
+        value = Generation.objects.filter(name=self.name).values_list('value', flat=True).first()
+        return self._remember(value or 0)
+
+    def bump(self):
+        """Increment the counter and return the new generation."""
+        with transaction.atomic():
+            if not Generation.objects.filter(name=self.name).update(value=F('value') + 1):
+                try:
+                    with transaction.atomic():
+                        Generation.objects.create(name=self.name, value=1)
+                except IntegrityError:
+                    # Created by another worker meanwhile
+                    Generation.objects.filter(name=self.name).update(value=F('value') + 1)
+            value = Generation.objects.filter(name=self.name).values_list('value', flat=True).get()
+        return self._remember(value)
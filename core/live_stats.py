@@ -0,0 +1,337 @@
+"""
+Live statistics stream.
+
+Writes to Employee, Project and EmployeeProject publish the months they touch
+as change keys ('YYYY-MM', or '*' when every month is affected). Each worker
+process runs one StatisticsHub that receives those keys, recomputes the
+statistics once per watched month and fans the result out to every open
+stream watching it.
+
+The keys of a transaction are collected and published once it commits:
+through Postgres LISTEN/NOTIFY, or through small marker files (one per key,
+compared by mtime) on SQLite and behind a transaction pooler, which does not
+keep the session a LISTEN needs.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+from django.db.models import Sum
+
+from .models import Employee, Project, EmployeeProject, ArchiveManifest
+
+logger = logging.getLogger('core.live_stats')
+
+CHANNEL = 'worktrack_statistics'
+ALL_MONTHS = '*'
+
+
+def month_statistics(month=None, year=None):
+    """Total employees, and projects and hours of a month and/or year including archived months."""
+    total_employees = Employee.objects.count()
+
+    projects_query = Project.objects.all()
+    hours_query = EmployeeProject.objects.all()
+    archive_query = ArchiveManifest.objects.all()
+    if month:
+        projects_query = projects_query.filter(date__month=month)
+        hours_query = hours_query.filter(project__date__month=month)
+        archive_query = archive_query.filter(month=month)
+    if year:
+        projects_query = projects_query.filter(date__year=year)
+        hours_query = hours_query.filter(project__date__year=year)
+        archive_query = archive_query.filter(year=year)
+
+    total_projects = projects_query.count()
+    total_hours = hours_query.aggregate(total=Sum('hours_worked'))['total'] or 0.0
+
+    archived = archive_query.aggregate(projects=Sum('project_count'), hours=Sum('total_hours'))
+    total_projects += archived['projects'] or 0
+    total_hours += archived['hours'] or 0.0
+
+    return {
+        'total_employees': total_employees,
+        'total_projects': total_projects,
+        'total_hours': round(total_hours, 2),
+        'month': int(month) if month else None,
+        'year': int(year) if year else None,
+    }
+
+
+def month_key(date):
+    """'YYYY-MM' of a date, or of an ISO date string as model fields hold it until they are reloaded."""
+    if not isinstance(date, datetime.date):
+        date = datetime.date.fromisoformat(str(date))
+    return f'{date.year:04d}-{date.month:02d}'
+
+
+def affects(watch, key):
+    """Whether a change key affects the statistics of a (month, year) watch."""
+    if key == ALL_MONTHS:
+        return True
+    month, year = watch
+    key_year, key_month = int(key[:4]), int(key[5:7])
+    return (month is None or month == key_month) and (year is None or year == key_year)
+
+
+def _marker_dir():
+    path = settings.LIVE_STATS_DIR or os.path.join(tempfile.gettempdir(), 'worktrack-live-stats')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _marker_name(key):
+    return 'all' if key == ALL_MONTHS else key
+
+
+def _uses_notify(using=DEFAULT_DB_ALIAS):
+    return connections[using].vendor == 'postgresql' and settings.LIVE_STATS_NOTIFY
+
+
+def changed(keys, using=DEFAULT_DB_ALIAS):
+    """
+    Publish change keys for the current transaction.
+    The keys of all writes in a transaction are published together once it commits,
+    with a single NOTIFY or marker update; nothing is published on rollback.
+    """
+    keys = frozenset(keys)
+    if not keys:
+        return
+    connection = connections[using]
+    pending = connection.__dict__.setdefault('live_stats_pending', set())
+    # A callback registered in a savepoint that was rolled back is gone, and so are its writes
+    scheduled = any(
+        isinstance(callback, partial) and callback.func is _publish for _, callback, _ in connection.run_on_commit
+    )
+    if not scheduled:
+        pending.clear()
+    pending.update(keys)
+    if not scheduled:
+        # Runs right away outside of a transaction
+        transaction.on_commit(partial(_publish, using), using=using)
+
+
+def _publish(using):
+    pending = connections[using].__dict__.get('live_stats_pending')
+    if not pending:
+        return
+    keys = frozenset(pending)
+    pending.clear()
+    if _uses_notify(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, ','.join(sorted(keys))])
+    else:
+        _touch_markers(keys)
+
+
+def _touch_markers(keys):
+    directory = _marker_dir()
+    for key in keys:
+        path = os.path.join(directory, _marker_name(key))
+        with open(path, 'a'):
+            pass
+        os.utime(path, ns=(time.time_ns(), time.time_ns()))
+        hub.mark_seen(key, os.stat(path).st_mtime_ns)
+    hub.notify(keys)
+
+
+class Subscription:
+    """One open stream. Only the latest statistics are kept, older pending updates are replaced."""
+
+    def __init__(self, watch, loop=None):
+        self.watch = watch
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=1) if loop is not None else queue.Queue(maxsize=1)
+
+    def _offer(self, stats):
+        try:
+            self.queue.get_nowait()
+        except (asyncio.QueueEmpty, queue.Empty):
+            pass
+        self.queue.put_nowait(stats)
+
+    def deliver(self, stats):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._offer, stats)
+        else:
+            self._offer(stats)
+
+
+class StatisticsHub:
+    """
+    Per-process fan-out of statistics updates.
+    A single background thread listens for change keys, recomputes the
+    statistics once per watched (month, year) and delivers them to all
+    subscriptions of that watch. Updates that do not change the figures
+    are not pushed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._latest = {}
+        self._versions = {}
+        self._pending = set()
+        self._seen = {}
+        self._wake = threading.Event()
+        self._started = False
+
+    def _start(self):
+        if self._started:
+            return
+        self._started = True
+        threading.Thread(target=self._dispatch, name='live-stats-dispatch', daemon=True).start()
+        if _uses_notify():
+            source = self._listen_postgres
+        else:
+            source = self._poll_markers
+        threading.Thread(target=source, name='live-stats-listen', daemon=True).start()
+
+    def subscribe(self, month, year, loop=None):
+        subscription = Subscription((month, year), loop)
+        with self._lock:
+            self._start()
+            self._subscriptions.setdefault(subscription.watch, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.watch)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.watch]
+                self._latest.pop(subscription.watch, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def current(self, watch):
+        """Latest statistics of a watch, computed once and shared until the next change."""
+        with self._lock:
+            if watch in self._latest:
+                return self._latest[watch]
+            version = self._versions.get(watch, 0)
+        stats = month_statistics(*watch)
+        with self._lock:
+            if self._versions.get(watch, 0) == version and watch in self._subscriptions:
+                self._latest[watch] = stats
+        return stats
+
+    def notify(self, keys):
+        with self._lock:
+            if not self._started:
+                return
+            self._pending.update(keys)
+        self._wake.set()
+
+    def mark_seen(self, key, mtime_ns):
+        with self._lock:
+            self._seen[_marker_name(key)] = mtime_ns
+
+    def _dispatch(self):
+        while True:
+            self._wake.wait()
+            # Let a burst of writes settle so it costs one recomputation
+            time.sleep(settings.LIVE_STATS_DEBOUNCE)
+            self._wake.clear()
+            with self._lock:
+                keys, self._pending = self._pending, set()
+                watches = [watch for watch in self._subscriptions if any(affects(watch, key) for key in keys)]
+                for watch in watches:
+                    self._versions[watch] = self._versions.get(watch, 0) + 1
+            for watch in watches:
+                try:
+                    stats = month_statistics(*watch)
+                except Exception:
+                    logger.exception('Could not compute live statistics for %s', watch)
+                    continue
+                with self._lock:
+                    previous = self._latest.get(watch)
+                    self._latest[watch] = stats
+                    subscriptions = list(self._subscriptions.get(watch, ()))
+                if stats == previous:
+                    continue
+                for subscription in subscriptions:
+                    subscription.deliver(stats)
+            close_old_connections()
+
+    def _listen_postgres(self):
+        while True:
+            wrapper = connections[DEFAULT_DB_ALIAS]
+            try:
+                listener = wrapper.get_new_connection(wrapper.get_connection_params())
+                listener.autocommit = True
+                listener.execute(f'LISTEN {CHANNEL}')
+                # Changes may have been missed while (re)connecting
+                self.notify({ALL_MONTHS})
+                for notification in listener.notifies():
+                    self.notify(set(notification.payload.split(',')))
+            except Exception:
+                logger.exception('Live statistics listener lost its connection, reconnecting')
+                time.sleep(5)
+
+    def _poll_markers(self):
+        directory = _marker_dir()
+        first_scan = True
+        while True:
+            try:
+                with os.scandir(directory) as entries:
+                    current = {entry.name: entry.stat().st_mtime_ns for entry in entries}
+            except OSError:
+                logger.exception('Could not read live statistics markers in %s', directory)
+                current = {}
+            with self._lock:
+                keys = {
+                    ALL_MONTHS if name == 'all' else name
+                    for name, mtime in current.items()
+                    if self._seen.get(name, 0) < mtime
+                }
+                self._seen.update(current)
+            if keys and not first_scan:
+                self.notify(keys)
+            first_scan = False
+            time.sleep(settings.LIVE_STATS_POLL_INTERVAL)
+
+
+hub = StatisticsHub()
+
+
+def _event(stats):
+    return f'event: statistics\ndata: {json.dumps(stats)}\n\n'
+
+
+async def event_stream(month, year):
+    """Server-sent events for an ASGI worker: idle streams only hold a coroutine and a queue."""
+    subscription = hub.subscribe(month, year, asyncio.get_running_loop())
+    try:
+        yield _event(await sync_to_async(hub.current)(subscription.watch))
+        while True:
+            try:
+                stats = await asyncio.wait_for(subscription.queue.get(), settings.LIVE_STATS_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield _event(stats)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def single_event(month, year):
+    """
+    The current statistics as one event for a WSGI worker, which would hold a thread per open stream.
+    The client reconnects after the keep-alive interval, which makes the stream a poll.
+    """
+    return f'retry: {int(settings.LIVE_STATS_KEEPALIVE * 1000)}\n' + _event(month_statistics(month, year))
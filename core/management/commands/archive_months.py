@@ -0,0 +1,58 @@
+"""
+Django management command to move closed months of projects into cold storage.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import parse_month, archivable_months, archive_month
+
+
+class Command(BaseCommand):
+    help = 'Moves Project/EmployeeProject rows of closed months into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            type=str,
+            required=True,
+            help='Archive every month before this one (format: YYYY-MM)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows copied per INSERT (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the months that would be archived',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            before = parse_month(options['before'])
+        except ValueError:
+            raise CommandError('--before must be in the format YYYY-MM')
+
+        today = date.today()
+        if before > (today.year, today.month):
+            raise CommandError('Only closed months can be archived, --before must not be in the future')
+
+        months = archivable_months(before)
+        if not months:
+            self.stdout.write(self.style.SUCCESS('Nothing to archive.'))
+            return
+
+        for year, month in months:
+            if options['dry_run']:
+                self.stdout.write(f'Would archive {year}-{month:02d}')
+                continue
+            manifest = archive_month(year, month, batch_size=options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Archived {year}-{month:02d}: {manifest.project_count} projects, '
+                    f'{manifest.assignment_count} assignments, {manifest.total_hours:.2f}h'
+                )
+            )
@@ -0,0 +1,124 @@
+"""
+Django management command to measure how archiving closed months speeds up the hot-table queries.
+Seeds a multi-year data set, times the list, search and statistics endpoints, archives every month
+before the current one and times them again. Everything runs inside a transaction that is rolled
+back, so the database is left unchanged.
+"""
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from core.archive import archivable_months, archive_month
+from core.models import Employee, Project, EmployeeProject
+from core.views import EmployeeProjectViewSet, ProjectViewSet, StatisticsViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the hot-table queries before and after archiving a seeded multi-year data set'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=3,
+            help='Years of history to generate up to today (default: 3)',
+        )
+        parser.add_argument(
+            '--projects-per-day',
+            type=int,
+            default=5,
+            help='Projects generated per day (default: 5)',
+        )
+        parser.add_argument(
+            '--crew',
+            type=int,
+            default=8,
+            help='Employees per project (default: 8)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Requests per measurement (default: 5)',
+        )
+
+    def _populate(self, years, projects_per_day, crew):
+        started = time.monotonic()
+        employees = Employee.objects.bulk_create([
+            Employee(first_name=f'Bench{i}', last_name='Archive', phone_number=f'bench-archive-{i}', role='Helfer')
+            for i in range(max(crew * 4, 20))
+        ])
+        today = date.today()
+        days = [today - timedelta(days=i) for i in range(years * 365)]
+        projects = Project.objects.bulk_create(
+            [Project(name=f'Baustelle {site}', date=day) for day in days for site in range(projects_per_day)],
+            batch_size=5000,
+        )
+        batch, created = [], 0
+        for index, project in enumerate(projects):
+            for offset in range(crew):
+                employee = employees[(index + offset) % len(employees)]
+                batch.append(EmployeeProject(employee=employee, project=project, hours_worked=1 + offset % 4))
+            if len(batch) >= 10000:
+                created += len(EmployeeProject.objects.bulk_create(batch))
+                batch = []
+        created += len(EmployeeProject.objects.bulk_create(batch))
+        self.stdout.write(
+            f'Generated {created} assignments for {len(projects)} projects over {years} years '
+            f'in {time.monotonic() - started:.1f}s'
+        )
+
+    def _queries(self):
+        today = date.today()
+        return [
+            ('project search', ProjectViewSet.as_view({'get': 'list'}), '/api/projects/',
+             {'search': 'Baustelle 1'}),
+            ('assignment list', EmployeeProjectViewSet.as_view({'get': 'list'}), '/api/employeeprojects/', {}),
+            ('statistics (all)', StatisticsViewSet.as_view({'get': 'statistics'}), '/api/statistics/statistics/', {}),
+            ('statistics (month)', StatisticsViewSet.as_view({'get': 'statistics'}), '/api/statistics/statistics/',
+             {'month': today.month, 'year': today.year}),
+        ]
+
+    def _measure(self, factory, repeat):
+        results = {}
+        for label, view, path, params in self._queries():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                view(factory.get(path, params)).render()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = statistics.median(timings)
+        return results
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        today = date.today()
+        try:
+            with transaction.atomic():
+                self._populate(options['years'], options['projects_per_day'], options['crew'])
+                before = self._measure(factory, options['repeat'])
+
+                started = time.monotonic()
+                months = archivable_months((today.year, today.month))
+                for year, month in months:
+                    archive_month(year, month)
+                self.stdout.write(f'Archived {len(months)} months in {time.monotonic() - started:.1f}s')
+
+                after = self._measure(factory, options['repeat'])
+                self.stdout.write(f"  {'query':<20} {'before':>10} {'after':>10} {'speedup':>8}")
+                for label, before_ms in before.items():
+                    after_ms = after[label]
+                    self.stdout.write(
+                        f'  {label:<20} {before_ms:8.1f}ms {after_ms:8.1f}ms {before_ms / max(after_ms, 0.001):7.1f}x'
+                    )
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Benchmark data rolled back.'))
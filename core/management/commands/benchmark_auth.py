@@ -0,0 +1,69 @@
+"""
+Django management command to compare database queries and latency per API request
+with session authentication and with bearer tokens.
+The staff user and its session are created inside a transaction that is rolled back.
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import tokens
+
+ENDPOINTS = [
+    '/api/employees/autocomplete/?q=a',
+    '/api/statistics/statistics/?month=1&year=2025',
+    '/api/month-closes/',
+    '/api/profiles/',
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compares queries and latency per API request with session and bearer token authentication'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=200,
+            help='Requests per endpoint and authentication method (default: 200)',
+        )
+
+    def _measure(self, client, path, repeat, **headers):
+        queries, timings = [], []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(path, **headers)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(captured))
+        return response.status_code, statistics.mean(queries), statistics.median(timings)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                user = get_user_model().objects.create_user('benchmark-auth', password=None, is_staff=True)
+                session_client = Client()
+                session_client.force_login(user)
+                token, _ = tokens.issue(user)
+                token_client = Client(headers={'Authorization': f'{tokens.KEYWORD} {token}'})
+
+                self.stdout.write(f"{'endpoint':<48} {'session':>22} {'bearer token':>22}")
+                for path in ENDPOINTS:
+                    results = []
+                    for client in (session_client, token_client):
+                        status_code, queries, median = self._measure(client, path, options['repeat'])
+                        results.append(f'{queries:4.1f} q {median:6.2f} ms ({status_code})')
+                    self.stdout.write(f'{path:<48} {results[0]:>22} {results[1]:>22}')
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Benchmark user rolled back.'))
@@ -0,0 +1,120 @@
+"""
+Django management command to benchmark PDF rendering of the employee reports.
+Uses synthetic rows, so it needs no data in the database.
+"""
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import reports
+from core.models import Employee
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks render time and peak memory of the range PDF report, or the monthly renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[100, 1000, 10000],
+            help='Row counts to render (default: 100 1000 10000)',
+        )
+        parser.add_argument(
+            '--monthly',
+            action='store_true',
+            help='Compare the canvas and Platypus monthly renderers instead (text, page count and time)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Renders per measurement in --monthly mode (default: 20)',
+        )
+        parser.add_argument(
+            '--compare-single-table',
+            action='store_true',
+            help='Also render every month as one unchunked table for comparison',
+        )
+
+    def _rows(self, count):
+        start = date(2025, 1, 1)
+        for index in range(count):
+            yield start + timedelta(days=index * 365 // max(count, 1)), f'Projekt {index % 97}', 7.5
+
+    def _render_once(self, employee, count):
+        with tempfile.SpooledTemporaryFile(max_size=5 * 1024 * 1024) as output:
+            reports.render_range_report(employee, self._rows(count), 'Januar 2025 - Dezember 2025', output)
+            return output.tell()
+
+    def _render(self, employee, count):
+        """Time one render, then measure peak memory in a second traced render."""
+        started = time.perf_counter()
+        size = self._render_once(employee, count)
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        self._render_once(employee, count)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return elapsed, peak, size
+
+    def _compare_monthly(self, employee, repeat):
+        """Check the canvas renderer against Platypus and time both."""
+        for count in (1, 5, 10, 15):
+            rows = [(date(2025, 1, 1 + index), f'Projekt {index}', 7.5) for index in range(count)]
+            if not reports.canvas_layout_fits(employee, rows, 'Januar 2025'):
+                self.stdout.write(f'{count:>3} rows: does not fit one page, Platypus only')
+                continue
+
+            timings, outputs = {}, {}
+            for renderer in (reports.render_monthly_canvas, reports.render_monthly_platypus):
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    output = BytesIO()
+                    renderer(employee, rows, 'Januar 2025', output)
+                timings[renderer] = (time.perf_counter() - started) / repeat * 1000
+                outputs[renderer] = reports.pdf_text(output.getvalue())
+
+            canvas_text, canvas_pages = outputs[reports.render_monthly_canvas]
+            platypus_text, platypus_pages = outputs[reports.render_monthly_platypus]
+            if canvas_text != platypus_text or canvas_pages != platypus_pages:
+                raise CommandError(
+                    f'{count} rows: canvas output differs from Platypus '
+                    f'(pages {canvas_pages} vs {platypus_pages}, '
+                    f'missing {dict(platypus_text - canvas_text)}, extra {dict(canvas_text - platypus_text)})'
+                )
+            self.stdout.write(
+                f'{count:>3} rows: canvas {timings[reports.render_monthly_canvas]:6.1f} ms  '
+                f'platypus {timings[reports.render_monthly_platypus]:6.1f} ms  '
+                f'text and page count match'
+            )
+
+    def handle(self, *args, **options):
+        employee = Employee(first_name='Max', last_name='Mustermann', phone_number='000', role='Bench',
+                            hourly_rate=Decimal('20.00'))
+        if options['monthly']:
+            self._compare_monthly(employee, options['repeat'])
+            return
+
+        modes = [('chunked', reports.RANGE_CHUNK_ROWS)]
+        if options['compare_single_table']:
+            modes.append(('single table', 10 ** 9))
+
+        default_chunk = reports.RANGE_CHUNK_ROWS
+        try:
+            for label, chunk_rows in modes:
+                reports.RANGE_CHUNK_ROWS = chunk_rows
+                for count in options['rows']:
+                    elapsed, peak, size = self._render(employee, count)
+                    self.stdout.write(
+                        f'{label:>12}: {count:>6} rows  {elapsed * 1000:9.1f} ms  '
+                        f'peak {peak / 1024 / 1024:7.1f} MiB  pdf {size / 1024:8.1f} KiB'
+                    )
+        finally:
+            reports.RANGE_CHUNK_ROWS = default_chunk
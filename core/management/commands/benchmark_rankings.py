@@ -0,0 +1,108 @@
+"""
+Django management command to benchmark the rankings endpoint on a large synthetic data set.
+The data is written inside a transaction that is rolled back, so the database is left unchanged.
+"""
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from core.models import Employee, Project, EmployeeProject
+from core.views import RankingsViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks /api/rankings/ with synthetic employees, projects and assignments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000000,
+            help='Number of assignment rows to generate (default: 1000000)',
+        )
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=300,
+            help='Number of employees to generate (default: 300)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Requests per measurement (default: 5)',
+        )
+
+    def _populate(self, rows, employee_count):
+        started = time.monotonic()
+        employees = Employee.objects.bulk_create([
+            Employee(first_name=f'Bench{i}', last_name='Rankings', phone_number=f'bench-rankings-{i}',
+                     role=('Maurer', 'Helfer', 'Polier', 'Kranführer')[i % 4])
+            for i in range(employee_count)
+        ])
+        # One project per site and day over two years, crews sized to reach the row count
+        days = [date(2024, 1, 1) + timedelta(days=i) for i in range(730)]
+        sites = max(rows // (len(days) * employee_count // 2) + 1, 1)
+        projects = Project.objects.bulk_create(
+            [Project(name=f'Baustelle {site}', date=day) for day in days for site in range(sites)],
+            batch_size=5000,
+        )
+        crew_size = min(-(-rows // len(projects)), employee_count)
+
+        batch, created = [], 0
+        for index, project in enumerate(projects):
+            for offset in range(crew_size):
+                if created == rows:
+                    break
+                employee = employees[(index * 7 + offset) % employee_count]
+                batch.append(EmployeeProject(employee=employee, project=project, hours_worked=4 + (index + offset) % 6))
+                created += 1
+            if len(batch) >= 10000:
+                EmployeeProject.objects.bulk_create(batch)
+                batch = []
+        EmployeeProject.objects.bulk_create(batch)
+        self.stdout.write(
+            f'Generated {created} assignments for {len(projects)} projects and {employee_count} employees '
+            f'in {time.monotonic() - started:.1f}s'
+        )
+
+    def _measure(self, view, factory, params, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = view(factory.get('/api/rankings/', params))
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), response
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        view = RankingsViewSet.as_view({'get': 'list'})
+        try:
+            with transaction.atomic():
+                self._populate(options['rows'], options['employees'])
+
+                plan = RankingsViewSet.ranking_queryset(
+                    'employee', 'hours', date(2025, 6, 1), date(2025, 7, 1), date(2025, 5, 1)
+                ).explain()
+                self.stdout.write('Query plan (employee, month):')
+                self.stdout.write(plan)
+
+                for by in RankingsViewSet.SUBJECTS:
+                    for metric in RankingsViewSet.METRICS:
+                        for period in ({'month': 6, 'year': 2025}, {'year': 2025}):
+                            params = {'by': by, 'metric': metric, 'limit': 10, **period}
+                            median, response = self._measure(view, factory, params, options['repeat'])
+                            label = f"by={by:<8} metric={metric:<7} {'month' if 'month' in period else 'year '}"
+                            top = response.data['results'][0] if response.data['results'] else {}
+                            self.stdout.write(f"  {label} {median:8.1f} ms  top value {top.get('value')}")
+                raise Rollback
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Benchmark data rolled back.'))
@@ -0,0 +1,140 @@
+"""
+Django management command to compare SQLite's default settings with the tuned profile
+under concurrent writers. Each profile runs against its own temporary database, with
+worker processes standing in for gunicorn workers entering timesheets.
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import Employee, Project
+from core.serializers import EmployeeProjectCreateSerializer, ProjectCrewSerializer
+from core import live_stats
+
+PROFILES = ('default', 'tuned')
+
+
+def use_database(path, profile):
+    """Point the default connection at a benchmark database with the given profile."""
+    connection.close()
+    settings.SQLITE_PROFILE = profile
+    # Keep the lock waits out of the slow-query log and the change markers next to the database
+    settings.SLOW_QUERY_THRESHOLD_MS = None
+    settings.LIVE_STATS_DIR = os.path.dirname(path)
+    connection.settings_dict['NAME'] = path
+    connection.settings_dict['OPTIONS'] = {'transaction_mode': 'IMMEDIATE'} if profile == 'tuned' else {}
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks concurrent timesheet writes on SQLite with the default and the tuned profile'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent worker processes (default: 4)')
+        parser.add_argument('--seconds', type=float, default=10, help='Duration per profile (default: 10)')
+        parser.add_argument('--worker', type=str, default=None, help='Internal: run one worker on this database')
+        parser.add_argument('--profile', type=str, default='tuned', choices=PROFILES, help='Internal: worker profile')
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            return self._worker(options['worker'], options['profile'], options['seconds'])
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite')
+
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in PROFILES:
+                path = os.path.join(directory, f'{profile}.sqlite3')
+                self._prepare(path, profile)
+                workers = [
+                    subprocess.Popen(
+                        [sys.executable, sys.argv[0], 'benchmark_sqlite', '--worker', path,
+                         '--profile', profile, '--seconds', str(options['seconds'])],
+                        stdout=subprocess.PIPE, text=True,
+                    )
+                    for _ in range(options['workers'])
+                ]
+                results = [json.loads(worker.communicate()[0].strip().splitlines()[-1]) for worker in workers]
+                self._report(profile, results, options['seconds'])
+
+    def _prepare(self, path, profile):
+        use_database(path, profile)
+        call_command('migrate', verbosity=0)
+        Employee.objects.bulk_create([
+            Employee(first_name=f'Bench{i}', last_name='SQLite', phone_number=f'bench-sqlite-{i}', role='Maurer')
+            for i in range(20)
+        ])
+        # One project per day: an employee then has at most one assignment a day and the
+        # writes stay below DAILY_HOURS_LIMIT however often they hit the same employee
+        Project.objects.bulk_create([
+            Project(name=f'Baustelle {i}', date=date.today() - timedelta(days=i)) for i in range(10)
+        ])
+        connection.close()
+
+    def _worker(self, path, profile, seconds):
+        use_database(path, profile)
+        employee_ids = list(Employee.objects.values_list('id', flat=True))
+        projects = list(Project.objects.all())
+        latencies, errors = {}, Counter()
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            operation = random.choice(('entry', 'entry', 'crew', 'read'))
+            project = random.choice(projects)
+            started = time.perf_counter()
+            try:
+                if operation == 'entry':
+                    # A single hours entry, written in autocommit mode
+                    serializer = EmployeeProjectCreateSerializer(data={
+                        'employee': random.choice(employee_ids), 'project': project.id,
+                        'hours_worked': random.randint(1, 10),
+                    })
+                elif operation == 'crew':
+                    # A crew update: reads, then writes inside one transaction
+                    serializer = ProjectCrewSerializer(project, data={
+                        'name': project.name, 'date': project.date,
+                        'assignments': [{'employee': employee_id, 'hours_worked': 8}
+                                        for employee_id in random.sample(employee_ids, 5)],
+                    })
+                if operation == 'read':
+                    live_stats.month_statistics(project.date.month, project.date.year)
+                else:
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save()
+                latencies.setdefault(operation, []).append((time.perf_counter() - started) * 1000)
+            except Exception as exc:
+                errors[f'{operation}: {exc}'] += 1
+
+        self.stdout.write(json.dumps({'latencies': latencies, 'errors': errors}))
+
+    def _report(self, profile, results, seconds):
+        errors = Counter()
+        latencies = {}
+        for result in results:
+            errors.update(result['errors'])
+            for operation, values in result['latencies'].items():
+                latencies.setdefault(operation, []).extend(values)
+
+        done = sum(len(values) for values in latencies.values())
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{profile} profile: {done / seconds:.0f} operations/s'))
+        for operation, values in sorted(latencies.items()):
+            values.sort()
+            self.stdout.write(
+                f'  {operation:<6} {len(values):6d} ok  p50={statistics.median(values):6.1f}ms  '
+                f'p95={values[int(len(values) * 0.95) - 1]:7.1f}ms'
+            )
+        for message, count in errors.most_common():
+            self.stdout.write(self.style.ERROR(f'  {count:6d} x {message}'))
+        if not errors:
+            self.stdout.write('  no errors')
@@ -0,0 +1,44 @@
+"""
+Django management command to close months after payroll.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import parse_month
+from core.month_close import MonthAlreadyClosed, close_month
+
+
+class Command(BaseCommand):
+    help = 'Locks months against changes and snapshots their statistics, totals and PDF reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'months',
+            nargs='+',
+            type=str,
+            help='Months to close (format: YYYY-MM)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            months = [parse_month(value) for value in options['months']]
+        except ValueError:
+            raise CommandError('Months must be in the format YYYY-MM')
+
+        today = date.today()
+        if any(month > (today.year, today.month) for month in months):
+            raise CommandError('Future months cannot be closed')
+
+        for year, month in months:
+            try:
+                close = close_month(year, month)
+            except MonthAlreadyClosed:
+                self.stdout.write(self.style.WARNING(f'{year}-{month:02d} is already closed. Skipping.'))
+                continue
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Closed {year}-{month:02d}: {close.statistics['total_projects']} projects, "
+                    f"{close.statistics['total_hours']:.2f}h, {close.reports.count()} employee reports"
+                )
+            )
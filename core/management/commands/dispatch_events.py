@@ -0,0 +1,62 @@
+"""
+Django management command to deliver the outbox change events to downstream systems.
+Runs as a long-lived worker next to the web process; run exactly one per database,
+since a second dispatcher would post the same events in parallel and out of order.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core import slow_queries
+from core.outbox import DeliveryError, dispatch_batch
+
+logger = logging.getLogger('core.outbox')
+
+
+class Command(BaseCommand):
+    help = 'Delivers pending change events in ordered batches to OUTBOX_ENDPOINT, retrying failed batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoint', type=str, help='URL the batches are POSTed to (default: OUTBOX_ENDPOINT)')
+        parser.add_argument(
+            '--batch-size', type=int, default=None, help='Events per POST (default: OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver the pending events and exit, failing on the first batch that is not accepted',
+        )
+
+    def handle(self, *args, **options):
+        endpoint = options['endpoint'] or settings.OUTBOX_ENDPOINT
+        if not endpoint:
+            raise CommandError('Set OUTBOX_ENDPOINT or pass --endpoint')
+
+        delivered, failures = 0, 0
+        while True:
+            slow_queries.flush()
+            close_old_connections()
+            try:
+                sent = dispatch_batch(endpoint, options['batch_size'])
+            except DeliveryError as exc:
+                if options['once']:
+                    raise CommandError(f'Delivery to {endpoint} failed: {exc} ({delivered} events delivered)')
+                failures += 1
+                delay = min(2 ** (failures - 1), settings.OUTBOX_RETRY_MAX_DELAY)
+                logger.warning('Delivery to %s failed (%s), retrying in %.0fs', endpoint, exc, delay)
+                time.sleep(delay)
+                continue
+
+            failures = 0
+            delivered += sent
+            if sent:
+                self.stdout.write(f'Delivered {sent} events')
+                # A full batch means more may be waiting, deliver them right away
+                continue
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS(f'Delivered {delivered} events.'))
+                return
+            time.sleep(settings.OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,88 @@
+"""
+Django management command to measure worker startup import time with `python -X importtime`.
+Fails when the startup imports go over budget or pull in modules that must stay lazy,
+so it can run as a check in CI or build.sh.
+"""
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a gunicorn worker imports before serving its first request
+WORKER_STARTUP = (
+    "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WorkTrack.settings'); "
+    "import WorkTrack.wsgi; "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+# Modules that are only needed by a few endpoints and must not load at startup
+LAZY_MODULES = ['reportlab', 'core.reports', 'core.profiling']
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+class Command(BaseCommand):
+    help = 'Measures worker startup import time and fails when it goes over budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=settings.IMPORT_TIME_BUDGET_MS,
+            help=f'Maximum total import time in ms (default: {settings.IMPORT_TIME_BUDGET_MS})',
+        )
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=3,
+            help='Measure this many fresh interpreters and keep the fastest run (default: 3)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Number of top-level imports to list (default: 15)',
+        )
+
+    def _measure(self):
+        """Run one fresh interpreter and return {module: (self_us, cumulative_us, depth)}."""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WORKER_STARTUP],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'WorkTrack.settings'},
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Worker startup failed:\n{result.stderr[-2000:]}')
+
+        modules = {}
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                depth = len(match.group(3)) // 2
+                modules[match.group(4)] = (int(match.group(1)), int(match.group(2)), depth)
+        return modules
+
+    def handle(self, *args, **options):
+        runs = [self._measure() for _ in range(max(options['runs'], 1))]
+        modules = min(runs, key=lambda run: sum(self_us for self_us, _, _ in run.values()))
+        total_ms = sum(self_us for self_us, _, _ in modules.values()) / 1000
+
+        self.stdout.write(f'Worker startup imports: {len(modules)} modules, {total_ms:.1f} ms')
+        top_level = sorted(
+            ((cumulative, name) for name, (_, cumulative, depth) in modules.items() if depth <= 1),
+            reverse=True,
+        )
+        for cumulative, name in top_level[:options['top']]:
+            self.stdout.write(f'  {cumulative / 1000:8.1f} ms  {name}')
+
+        eager = [name for name in LAZY_MODULES if name in modules]
+        if eager:
+            raise CommandError(f"Modules that must stay lazy were imported at startup: {', '.join(eager)}")
+        if total_ms > options['budget_ms']:
+            raise CommandError(f"Startup import time {total_ms:.1f} ms is over the {options['budget_ms']:.0f} ms budget")
+        self.stdout.write(self.style.SUCCESS(f"Within the {options['budget_ms']:.0f} ms budget."))
@@ -0,0 +1,74 @@
+"""
+Django management command to import historical timesheets from a CSV file.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import slow_queries
+from core.timesheets import TimesheetImport
+
+
+class Command(BaseCommand):
+    help = 'Imports timesheet rows (employee, project, date, hours) from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='CSV file with the columns employee, project, date, hours')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows upserted per INSERT (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file and report errors without writing anything',
+        )
+        parser.add_argument(
+            '--max-errors',
+            type=int,
+            default=100,
+            help='Number of row errors to list (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(run):
+            slow_queries.flush()
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'{run.rows} rows read, {run.imported} imported, {run.error_count} errors '
+                f'({run.rows / elapsed:.0f} rows/s)'
+            )
+
+        run = TimesheetImport(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            max_errors=options['max_errors'],
+            progress=progress,
+        )
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as csv_file:
+                report = run.run(csv_file)
+        except OSError as exc:
+            raise CommandError(f'Could not read {options["path"]}: {exc}')
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            slow_queries.flush()
+
+        for error in report['errors']:
+            self.stdout.write(self.style.WARNING(f"Line {error['line']}: {error['error']}"))
+        if report['error_count'] > len(report['errors']):
+            self.stdout.write(self.style.WARNING(f"... and {report['error_count'] - len(report['errors'])} more errors"))
+
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {report['imported']} of {report['rows']} rows, "
+                f"{report['created_projects']} new projects, {report['error_count']} errors "
+                f'in {time.monotonic() - started:.1f}s'
+            )
+        )
@@ -0,0 +1,31 @@
+"""
+Django management command to reopen closed months.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import parse_month
+from core.month_close import reopen_month
+
+
+class Command(BaseCommand):
+    help = 'Reopens closed months for changes and drops their snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'months',
+            nargs='+',
+            type=str,
+            help='Months to reopen (format: YYYY-MM)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            months = [parse_month(value) for value in options['months']]
+        except ValueError:
+            raise CommandError('Months must be in the format YYYY-MM')
+
+        for year, month in months:
+            if not reopen_month(year, month):
+                self.stdout.write(self.style.WARNING(f'{year}-{month:02d} is not closed. Skipping.'))
+                continue
+            self.stdout.write(self.style.SUCCESS(f'Reopened {year}-{month:02d}'))
@@ -0,0 +1,32 @@
+"""
+Django management command to move archived months back into the live tables.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import parse_month, restore_month
+from core.models import ArchiveManifest
+
+
+class Command(BaseCommand):
+    help = 'Restores archived months back into the Project/EmployeeProject tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'months',
+            nargs='+',
+            type=str,
+            help='Months to restore (format: YYYY-MM)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            months = [parse_month(value) for value in options['months']]
+        except ValueError:
+            raise CommandError('Months must be in the format YYYY-MM')
+
+        for year, month in months:
+            if not ArchiveManifest.objects.filter(year=year, month=month).exists():
+                self.stdout.write(self.style.WARNING(f'{year}-{month:02d} is not archived. Skipping.'))
+                continue
+            count = restore_month(year, month)
+            self.stdout.write(self.style.SUCCESS(f'Restored {year}-{month:02d}: {count} projects'))
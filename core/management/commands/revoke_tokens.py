@@ -0,0 +1,32 @@
+"""
+Django management command to revoke API bearer tokens.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import tokens
+
+
+class Command(BaseCommand):
+    help = 'Revokes the API bearer tokens of the given users, or of everyone with --all'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', type=str, help='Users whose tokens are revoked')
+        parser.add_argument('--all', action='store_true', help='Revoke every token issued so far')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            tokens.revoke()
+            self.stdout.write(self.style.SUCCESS('Revoked all API tokens.'))
+            return
+        if not options['usernames']:
+            raise CommandError('Name at least one user or pass --all')
+
+        User = get_user_model()
+        for username in options['usernames']:
+            user = User.objects.filter(**{User.USERNAME_FIELD: username}).first()
+            if user is None:
+                self.stdout.write(self.style.WARNING(f'User {username} does not exist. Skipping.'))
+                continue
+            tokens.revoke(user.pk)
+            self.stdout.write(self.style.SUCCESS(f'Revoked the API tokens of {username}.'))
@@ -0,0 +1,62 @@
+"""
+Django management command to print the slowest queries recorded by the slow-query log.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = 'Prints the top slow queries by total time, count or maximum time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Number of queries to show (default: 10)',
+        )
+        parser.add_argument(
+            '--order',
+            choices=['total', 'count', 'max'],
+            default='total',
+            help='Sort by total time, number of occurrences or slowest single run (default: total)',
+        )
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            help='Also print the captured query plans',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Delete all recorded slow queries',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} slow query records.'))
+            return
+
+        order = {'total': '-total_ms', 'count': '-count', 'max': '-max_ms'}[options['order']]
+        queries = SlowQuery.objects.order_by(order)[:options['limit']]
+        if not queries:
+            self.stdout.write(self.style.SUCCESS('No slow queries recorded.'))
+            return
+
+        for query in queries:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'{query.fingerprint[:12]}  {query.count}x  total {query.total_ms:.1f}ms  '
+                    f'avg {query.total_ms / query.count:.1f}ms  max {query.max_ms:.1f}ms'
+                )
+            )
+            self.stdout.write(f'  view: {query.last_view or "-"}  route: {query.last_route or "-"}')
+            self.stdout.write(f'  sql: {query.normalized_sql}')
+            self.stdout.write(f'  last param types: {query.last_params}')
+            if options['explain'] and query.explain:
+                self.stdout.write('  plan:')
+                for line in query.explain.splitlines():
+                    self.stdout.write(f'    {line}')
+            self.stdout.write('')
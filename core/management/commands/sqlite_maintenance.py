@@ -0,0 +1,64 @@
+"""
+Django management command for routine maintenance of a SQLite database.
+Safe to run from cron while the site is up; VACUUM briefly blocks writers.
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.sqlite_tuning import current_pragmas
+
+
+class Command(BaseCommand):
+    help = 'Runs PRAGMA optimize, checkpoints the WAL and optionally VACUUMs the SQLite database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Rebuild the database file to reclaim free pages (needs free disk space of the file size)',
+        )
+        parser.add_argument(
+            '--integrity-check',
+            action='store_true',
+            help='Run PRAGMA integrity_check first and stop if it reports problems',
+        )
+
+    def _size(self, path):
+        return sum(os.path.getsize(p) for p in (path, f'{path}-wal') if os.path.exists(p))
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite')
+
+        path = str(connection.settings_dict['NAME'])
+        size_before = self._size(path)
+        self.stdout.write(f'Connection settings: {current_pragmas(connection)}')
+
+        with connection.cursor() as cursor:
+            if options['integrity_check']:
+                cursor.execute('PRAGMA integrity_check')
+                problems = [row[0] for row in cursor.fetchall() if row[0] != 'ok']
+                if problems:
+                    raise CommandError('Integrity check failed:\n' + '\n'.join(problems))
+                self.stdout.write('Integrity check: ok')
+
+            cursor.execute('PRAGMA optimize')
+            self.stdout.write('Query planner statistics refreshed (PRAGMA optimize)')
+
+            if options['vacuum']:
+                cursor.execute('VACUUM')
+                self.stdout.write('Database rebuilt (VACUUM)')
+
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            busy, log_frames, checkpointed = cursor.fetchone()
+            if busy:
+                self.stdout.write(self.style.WARNING('WAL checkpoint could not finish, a reader is still active'))
+            elif log_frames >= 0:
+                self.stdout.write(f'WAL checkpointed: {checkpointed} pages')
+
+        size_after = self._size(path)
+        self.stdout.write(
+            self.style.SUCCESS(f'Done: {size_before / 1024 / 1024:.1f} MB -> {size_after / 1024 / 1024:.1f} MB')
+        )
@@ -0,0 +1,29 @@
+"""
+Django management command to run the worker warm-up steps and show what each one costs.
+In a fresh process the timings are what a new worker's first requests would otherwise pay.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.warmup import STEPS, warm_up
+
+
+class Command(BaseCommand):
+    help = 'Runs the worker warm-up steps and reports their durations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'steps',
+            nargs='*',
+            type=str,
+            help=f"Steps to run (default: WARMUP_STEPS, available: {', '.join(STEPS)})",
+        )
+
+    def handle(self, *args, **options):
+        unknown = [step for step in options['steps'] if step not in STEPS]
+        if unknown:
+            raise CommandError(f"Unknown warm-up step(s): {', '.join(unknown)}")
+
+        timings = warm_up(options['steps'] or None)
+        for step, ms in timings.items():
+            self.stdout.write(f'{step:<12} {ms:8.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'Warmed up in {sum(timings.values()):.1f} ms'))
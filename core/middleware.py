@@ -0,0 +1,167 @@
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connection
+from django.http import JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from . import slow_queries, tokens, warmup
+
+
+class HealthCheckMiddleware:
+    """
+    Answer the load balancer probes before any other middleware runs, so they skip
+    sessions, CSRF, authentication and URL resolution (and the ALLOWED_HOSTS check).
+    /healthz: the worker is alive. /readyz: the database answers within READYZ_MAX_DB_LATENCY_MS.
+    Must come first in MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path_info == '/healthz':
+            return self._respond(200, {'status': 'ok'})
+        if request.path_info == '/readyz':
+            return self._readiness()
+        return self.get_response(request)
+
+    def _respond(self, status, data):
+        response = JsonResponse(data, status=status)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def _readiness(self):
+        started = time.perf_counter()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        except Exception as exc:
+            return self._respond(503, {'status': 'unavailable', 'database': str(exc)})
+        latency = round((time.perf_counter() - started) * 1000, 2)
+        ready = latency <= settings.READYZ_MAX_DB_LATENCY_MS
+        return self._respond(200 if ready else 503, {
+            'status': 'ready' if ready else 'degraded',
+            'database_ms': latency,
+            'warmed_up': warmup.warmed_up,
+        })
+
+
+class TokenAwareSessionMiddleware(SessionMiddleware):
+    """
+    SessionMiddleware that leaves out API requests authenticated with a bearer token,
+    so they neither read nor save a session row.
+    """
+
+    def process_request(self, request):
+        if not tokens.is_token_request(request):
+            super().process_request(request)
+
+    def process_response(self, request, response):
+        if not hasattr(request, 'session'):
+            return response
+        return super().process_response(request, response)
+
+
+class TokenAwareCsrfViewMiddleware(CsrfViewMiddleware):
+    """
+    CsrfViewMiddleware that leaves out API requests authenticated with a bearer token.
+    A bearer token is never sent by the browser on its own, so CSRF does not apply to them.
+    """
+
+    def process_request(self, request):
+        if not tokens.is_token_request(request):
+            super().process_request(request)
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if tokens.is_token_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class TokenAwareAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware that takes the user of bearer token API requests from the token
+    instead of the session, with one primary key query and only if the user is used.
+    """
+
+    def process_request(self, request):
+        if not tokens.is_token_request(request):
+            return super().process_request(request)
+        request.user = SimpleLazyObject(
+            lambda: tokens.request_user(request) or AnonymousUser()
+        )
+
+
+class NonApiMessageMiddleware(MessageMiddleware):
+    """MessageMiddleware for the admin and other pages; the API does not use messages."""
+
+    def process_request(self, request):
+        if not request.path_info.startswith('/api/'):
+            super().process_request(request)
+
+
+class ProfilingMiddleware:
+    """
+    Profile selected requests and keep the results in the local profile store.
+    Staff users turn it on per request with ?_profile=1 or an X-Profile: 1 header;
+    other requests are sampled at PROFILE_SAMPLE_RATE (0 disables sampling).
+    Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _trigger(self, request):
+        # Checking the flag first keeps other requests from loading the lazy user (a session or token lookup)
+        if request.GET.get('_profile') == '1' or request.headers.get('X-Profile') == '1':
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_staff:
+                return 'staff'
+        if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+            return 'sampled'
+        return None
+
+    def __call__(self, request):
+        trigger = self._trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        # Loaded on first use to keep cProfile/pstats out of worker startup
+        from .profiling import RequestProfile
+
+        with RequestProfile.capture() as profile:
+            response = self.get_response(request)
+        if profile is not None:
+            profile_id = profile.save(request, response, trigger)
+            if trigger == 'staff':
+                response['X-Profile-Id'] = profile_id
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Tag slow queries with the view and route that ran them. The aggregated
+    statistics are stored on request_finished, see core.apps.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = slow_queries.current_view.set(('', request.path))
+        try:
+            return self.get_response(request)
+        finally:
+            slow_queries.current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        slow_queries.current_view.set((match.view_name or match._func_path, match.route))
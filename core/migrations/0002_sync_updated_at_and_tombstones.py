@@ -0,0 +1,70 @@
+# Generated by Django 5.1.6 on 2026-10-19 09:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employee",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model_name", models.CharField(max_length=50)),
+                ("object_id", models.BigIntegerField()),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "Tombstones",
+                "ordering": ["deleted_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["deleted_at"], name="tombstone_deleted_at_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(fields=["updated_at"], name="employee_updated_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(fields=["updated_at"], name="project_updated_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="employeeproject",
+            index=models.Index(
+                fields=["updated_at"], name="employeeproject_updated_at_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_sync_updated_at_and_tombstones"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedProject",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=200)),
+                ("description", models.TextField(blank=True)),
+                ("date", models.DateField()),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name_plural": "Archived Projects",
+                "ordering": ["-date", "-created_at"],
+                "indexes": [
+                    models.Index(fields=["date"], name="archivedproject_date_idx")
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedEmployeeProject",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("hours_worked", models.FloatField()),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="archived_employee_projects",
+                        to="core.employee",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="employee_projects",
+                        to="core.archivedproject",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Archived Employee Projects",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchiveManifest",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveIntegerField()),
+                ("month", models.PositiveSmallIntegerField()),
+                ("project_count", models.PositiveIntegerField(default=0)),
+                ("assignment_count", models.PositiveIntegerField(default=0)),
+                ("total_hours", models.FloatField(default=0.0)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "Archive Manifests",
+                "ordering": ["-year", "-month"],
+                "unique_together": {("year", "month")},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-19 14:57
+
+from django.db import migrations, models
+
+
+def count_employees(apps, schema_editor):
+    """Fill in the distinct employees of the months archived so far."""
+    ArchiveManifest = apps.get_model('core', 'ArchiveManifest')
+    ArchivedEmployeeProject = apps.get_model('core', 'ArchivedEmployeeProject')
+    for manifest in ArchiveManifest.objects.all():
+        manifest.employee_count = ArchivedEmployeeProject.objects.filter(
+            project__date__year=manifest.year, project__date__month=manifest.month
+        ).values('employee').distinct().count()
+        manifest.save(update_fields=['employee_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_archive_months"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivemanifest",
+            name="employee_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_employees, migrations.RunPython.noop),
+    ]
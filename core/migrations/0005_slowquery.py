@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_archivemanifest_employee_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint", models.CharField(max_length=40, unique=True)),
+                ("normalized_sql", models.TextField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("total_ms", models.FloatField(default=0.0)),
+                ("max_ms", models.FloatField(default=0.0)),
+                ("last_sql", models.TextField(blank=True)),
+                ("last_params", models.TextField(blank=True)),
+                ("last_view", models.CharField(blank=True, max_length=200)),
+                ("last_route", models.CharField(blank=True, max_length=200)),
+                ("explain", models.TextField(blank=True)),
+                ("first_seen", models.DateTimeField(auto_now_add=True)),
+                ("last_seen", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Slow Queries",
+                "ordering": ["-total_ms"],
+            },
+        ),
+    ]
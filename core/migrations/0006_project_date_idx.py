@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_slowquery"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="project",
+            index=models.Index(fields=["date"], name="project_date_idx"),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_project_date_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthClose",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveIntegerField()),
+                ("month", models.PositiveSmallIntegerField()),
+                ("statistics", models.JSONField(default=dict)),
+                ("closed_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "Month Closes",
+                "ordering": ["-year", "-month"],
+                "unique_together": {("year", "month")},
+            },
+        ),
+        migrations.CreateModel(
+            name="ClosedMonthReport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("total_hours", models.FloatField(default=0.0)),
+                ("entry_count", models.PositiveIntegerField(default=0)),
+                ("pdf", models.BinaryField()),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="closed_month_reports",
+                        to="core.employee",
+                    ),
+                ),
+                (
+                    "close",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reports",
+                        to="core.monthclose",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Closed Month Reports",
+                "ordering": ["employee__last_name", "employee__first_name"],
+                "unique_together": {("close", "employee")},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:40
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_month_close"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="employee",
+            name="role_key",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.text.Lower(
+                    django.db.models.functions.text.Trim("role")
+                ),
+                output_field=models.CharField(max_length=100),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="employee",
+            index=models.Index(fields=["role_key"], name="employee_role_key_idx"),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_daily_totals(apps, schema_editor):
+    """Sum the existing hot and archived assignments per employee and day."""
+    EmployeeDailyTotal = apps.get_model("core", "EmployeeDailyTotal")
+    totals = {}
+    for model_name in ("EmployeeProject", "ArchivedEmployeeProject"):
+        rows = (
+            apps.get_model("core", model_name).objects
+            .values_list("employee_id", "project__date")
+            .annotate(hours=Sum("hours_worked"), entries=Count("id"))
+            .order_by()
+        )
+        for employee_id, day, hours, entries in rows:
+            total = totals.setdefault((employee_id, day), [0.0, 0])
+            total[0] += hours or 0.0
+            total[1] += entries
+    EmployeeDailyTotal.objects.bulk_create(
+        [
+            EmployeeDailyTotal(employee_id=employee_id, date=day, hours=hours, entries=entries)
+            for (employee_id, day), (hours, entries) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_outbox_event"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmployeeDailyTotal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("hours", models.FloatField(default=0.0)),
+                ("entries", models.IntegerField(default=0)),
+                (
+                    "employee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_totals",
+                        to="core.employee",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Employee Daily Totals",
+                "ordering": ["date"],
+                "indexes": [models.Index(fields=["date"], name="dailytotal_date_idx")],
+                "unique_together": {("employee", "date")},
+            },
+        ),
+        migrations.RunPython(fill_daily_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-19 16:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("core", "0011_generation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ApiTokenProfile",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="api_token_profile",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("token_generation", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "API Token Profiles",
+            },
+        ),
+    ]
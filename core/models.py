@@ -1,7 +1,22 @@
-from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router, transaction
+from django.db.models.functions import Lower, Trim
 
 
-class Employee(models.Model):
+class AtomicSaveMixin:
+    """
+    Saves in a transaction, so the outbox event written by the post_save signal
+    is committed or rolled back together with the row.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Employee(AtomicSaveMixin, models.Model):
     """
     Employee model representing a worker in the system.
     """
@@ -9,18 +24,29 @@ class Employee(models.Model):
     last_name = models.CharField(max_length=100)
     phone_number = models.CharField(max_length=20, unique=True)
     role = models.CharField(max_length=100)
+    # Lower-cased, trimmed role kept by the database, for indexed equality filters and role facets
+    role_key = models.GeneratedField(
+        expression=Lower(Trim('role')),
+        output_field=models.CharField(max_length=100),
+        db_persist=True,
+    )
     hourly_rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['last_name', 'first_name']
         verbose_name_plural = 'Employees'
+        indexes = [
+            models.Index(fields=['updated_at'], name='employee_updated_at_idx'),
+            models.Index(fields=['role_key'], name='employee_role_key_idx'),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
 
-class Project(models.Model):
+class Project(AtomicSaveMixin, models.Model):
     """
     Project model representing a work project.
     """
@@ -28,16 +54,21 @@ class Project(models.Model):
     description = models.TextField(blank=True)
     date = models.DateField(help_text="The workday for this project")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-date', '-created_at']
         verbose_name_plural = 'Projects'
+        indexes = [
+            models.Index(fields=['updated_at'], name='project_updated_at_idx'),
+            models.Index(fields=['date'], name='project_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.date})"
 
 
-class EmployeeProject(models.Model):
+class EmployeeProject(AtomicSaveMixin, models.Model):
     """
     Relation table linking employees to projects with hours worked.
     If an employee works on the same project on the same date, the record is updated.
@@ -52,6 +83,233 @@ class EmployeeProject(models.Model):
         ordering = ['-created_at']
         unique_together = ['employee', 'project']
         verbose_name_plural = 'Employee Projects'
+        indexes = [
+            models.Index(fields=['updated_at'], name='employeeproject_updated_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee} - {self.project}: {self.hours_worked}h"
+
+
+class EmployeeDailyTotal(models.Model):
+    """
+    Hours and number of assignments of one employee on one workday, changed together
+    with every EmployeeProject write (see core/daily_totals.py). Archived months keep their totals.
+    """
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='daily_totals')
+    date = models.DateField()
+    hours = models.FloatField(default=0.0)
+    entries = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['date']
+        unique_together = ['employee', 'date']
+        verbose_name_plural = 'Employee Daily Totals'
+        indexes = [
+            models.Index(fields=['date'], name='dailytotal_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} on {self.date}: {self.hours}h"
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted row, kept so offline clients can drop it on their next sync.
+    Written for every delete, including rows removed by FK cascades.
+    """
+    model_name = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+        verbose_name_plural = 'Tombstones'
+        indexes = [
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} #{self.object_id} deleted at {self.deleted_at}"
+
+class ArchiveManifest(models.Model):
+    """
+    One row per archived month, with the totals captured when it was archived.
+    The statistics endpoint reads these totals instead of scanning the archive tables.
+    """
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    project_count = models.PositiveIntegerField(default=0)
+    assignment_count = models.PositiveIntegerField(default=0)
+    employee_count = models.PositiveIntegerField(default=0)
+    total_hours = models.FloatField(default=0.0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        unique_together = ['year', 'month']
+        verbose_name_plural = 'Archive Manifests'
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d}: {self.project_count} projects, {self.total_hours}h"
+
+
+class ArchivedProject(models.Model):
+    """
+    Cold-storage copy of a Project from an archived month.
+    Keeps the original id so the month can be restored unchanged.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    date = models.DateField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-date', '-created_at']
+        verbose_name_plural = 'Archived Projects'
+        indexes = [
+            models.Index(fields=['date'], name='archivedproject_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.date})"
+
+
+class ArchivedEmployeeProject(models.Model):
+    """
+    Cold-storage copy of an EmployeeProject from an archived month.
+    Employees with archived hours cannot be deleted, so payroll history and manifest totals stay intact.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    employee = models.ForeignKey(Employee, on_delete=models.PROTECT, related_name='archived_employee_projects')
+    project = models.ForeignKey(ArchivedProject, on_delete=models.CASCADE, related_name='employee_projects')
+    hours_worked = models.FloatField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'Archived Employee Projects'
+
+    def __str__(self):
+        return f"{self.employee} - {self.project}: {self.hours_worked}h"
+
+
+class MonthClose(models.Model):
+    """
+    A closed month. Its projects and hours can no longer be changed through the API,
+    and its statistics, per-employee totals and PDF reports are served from the
+    snapshots taken when it was closed. Reopening deletes the row and its snapshots.
+    """
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    statistics = models.JSONField(default=dict)
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-year', '-month']
+        unique_together = ['year', 'month']
+        verbose_name_plural = 'Month Closes'
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} closed at {self.closed_at}"
+
+
+class ClosedMonthReport(models.Model):
+    """
+    Snapshot of one employee's work in a closed month: totals and the rendered PDF report.
+    """
+    close = models.ForeignKey(MonthClose, on_delete=models.CASCADE, related_name='reports')
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='closed_month_reports')
+    total_hours = models.FloatField(default=0.0)
+    entry_count = models.PositiveIntegerField(default=0)
+    pdf = models.BinaryField()
+
+    class Meta:
+        ordering = ['employee__last_name', 'employee__first_name']
+        unique_together = ['close', 'employee']
+        verbose_name_plural = 'Closed Month Reports'
+
+    def __str__(self):
+        return f"{self.employee} - {self.close.year}-{self.close.month:02d}: {self.total_hours}h"
+
+
+class SlowQuery(models.Model):
+    """
+    Aggregated statistics for one normalized SQL statement that went over
+    SLOW_QUERY_THRESHOLD_MS, with the view it last came from and its query plan.
+    last_params holds the parameter types only, the values may be personal data.
+    """
+    fingerprint = models.CharField(max_length=40, unique=True)
+    normalized_sql = models.TextField()
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0.0)
+    max_ms = models.FloatField(default=0.0)
+    last_sql = models.TextField(blank=True)
+    last_params = models.TextField(blank=True)
+    last_view = models.CharField(max_length=200, blank=True)
+    last_route = models.CharField(max_length=200, blank=True)
+    explain = models.TextField(blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-total_ms']
+        verbose_name_plural = 'Slow Queries'
+
+    def __str__(self):
+        return f"{self.fingerprint}: {self.count}x, {self.total_ms:.1f}ms"
+
+
+class Generation(models.Model):
+    """
+    A counter that per-process caches compare against to notice they are stale
+    (see core/generations.py). Bumped after commit by the writes that change the cached data.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'Generations'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class ApiTokenProfile(models.Model):
+    """
+    API bearer token state of a user (see core/tokens.py). Tokens carry the generation
+    they were issued under; bumping it revokes them.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='api_token_profile'
+    )
+    token_generation = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'API Token Profiles'
+
+    def __str__(self):
+        return f"{self.user_id}: {self.token_generation}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Change event of an Employee, Project or EmployeeProject, written in the same
+    transaction as the change and deleted once dispatch_events delivered it.
+    """
+    model_name = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = 'Outbox Events'
 
     def __str__(self):
-        return f"{self.employee} - {self.project}: {self.hours_worked}h"
\ No newline at end of file
+        return f"#{self.id} {self.model_name} #{self.object_id} {self.action}"
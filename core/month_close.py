@@ -0,0 +1,125 @@
+"""
+Month close.
+
+Closing a month after payroll locks its Project and EmployeeProject rows
+against API writes and stores what is read about it afterwards: the month
+statistics, per-employee totals and every employee's rendered PDF report.
+Reads of a closed month are answered from those snapshots. Reopening the
+month drops them and unlocks the rows.
+"""
+from io import BytesIO
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import live_stats
+from .models import (
+    Employee, EmployeeProject,
+    ArchiveManifest, ArchivedEmployeeProject,
+    MonthClose, ClosedMonthReport
+)
+
+
+# Postgres advisory lock namespace of months: writes hold shared locks, close_month an exclusive one
+MONTH_LOCK_CLASS = 0x4D43
+
+
+class MonthAlreadyClosed(Exception):
+    pass
+
+
+def _lock(months, shared=True, using=DEFAULT_DB_ALIAS):
+    """
+    Lock (year, month) pairs until the current transaction ends. SQLite write transactions
+    start IMMEDIATE and so already run one at a time.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql' or not months:
+        return
+    function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {function}(%s, key) FROM unnest(%s::integer[]) AS key',
+            [MONTH_LOCK_CLASS, sorted(year * 100 + month for year, month in months)],
+        )
+
+
+def is_closed(day):
+    """Whether the month of a date is closed."""
+    return MonthClose.objects.filter(year=day.year, month=day.month).exists()
+
+
+def closed_months(days, lock=False):
+    """
+    The 'YYYY-MM' keys of the closed months among the given dates, sorted.
+    With lock=True, called inside a write transaction, the other months cannot be closed
+    until it ends: close_month waits for it.
+    """
+    months = {(day.year, day.month) for day in days}
+    if not months:
+        return []
+    if lock:
+        _lock(months)
+    closed = MonthClose.objects.filter(
+        year__in={year for year, _ in months}, month__in={month for _, month in months}
+    ).values_list('year', 'month')
+    return sorted(f'{year:04d}-{month:02d}' for year, month in closed if (year, month) in months)
+
+
+def _month_rows(year, month):
+    """(date, project name, hours) rows of every employee in the month, including an archived part."""
+    rows = {}
+    assignments = EmployeeProject.objects.filter(
+        project__date__year=year, project__date__month=month
+    ).order_by('project__date').values_list('employee_id', 'project__date', 'project__name', 'hours_worked')
+    for employee_id, *row in assignments.iterator(chunk_size=2000):
+        rows.setdefault(employee_id, []).append(tuple(row))
+
+    if ArchiveManifest.objects.filter(year=year, month=month).exists():
+        archived = ArchivedEmployeeProject.objects.filter(
+            project__date__year=year, project__date__month=month
+        ).values_list('employee_id', 'project__date', 'project__name', 'hours_worked')
+        for employee_id, *row in archived.iterator(chunk_size=2000):
+            rows.setdefault(employee_id, []).append(tuple(row))
+        for employee_rows in rows.values():
+            employee_rows.sort(key=lambda row: row[0])
+    return rows
+
+
+def close_month(year, month):
+    """
+    Close a month and snapshot its statistics, per-employee totals and PDF reports.
+    Raises MonthAlreadyClosed if it is closed already. Returns the MonthClose.
+    """
+    # ReportLab is only loaded by the processes that actually render a PDF
+    from . import reports
+
+    with transaction.atomic():
+        # Waits for the writes to the month that checked it was open
+        _lock({(year, month)}, shared=False)
+        if MonthClose.objects.filter(year=year, month=month).exists():
+            raise MonthAlreadyClosed(f'{year}-{month:02d} is already closed')
+        close = MonthClose.objects.create(
+            year=year, month=month, statistics=live_stats.month_statistics(month, year)
+        )
+
+        period_label = f"{reports.MONTH_NAMES_GERMAN[month]} {year}"
+        rows_by_employee = _month_rows(year, month)
+        employees = Employee.objects.in_bulk(rows_by_employee)
+        for employee_id, rows in rows_by_employee.items():
+            buffer = BytesIO()
+            reports.render_monthly_report(employees[employee_id], rows, period_label, buffer)
+            # One report at a time, so memory use does not grow with the number of employees
+            ClosedMonthReport.objects.create(
+                close=close,
+                employee_id=employee_id,
+                total_hours=round(sum(hours for _, _, hours in rows), 2),
+                entry_count=len(rows),
+                pdf=buffer.getvalue(),
+            )
+    return close
+
+
+def reopen_month(year, month):
+    """Reopen a closed month and drop its snapshots. Returns False if it was not closed."""
+    deleted, _ = MonthClose.objects.filter(year=year, month=month).delete()
+    return deleted > 0
@@ -0,0 +1,124 @@
+"""
+Transactional outbox of change events for downstream systems (payroll, BI).
+
+Every create, update and delete of an Employee, Project or EmployeeProject
+writes an OutboxEvent row in the same transaction as the change: the save and
+delete signals cover single writes and FK cascades, the bulk write paths that
+send no signals record their rows themselves. The dispatch_events command
+posts the events in id order and in batches to OUTBOX_ENDPOINT and deletes
+them once the endpoint accepted a batch, so consumers get every event at least
+once and deduplicate by event id.
+
+Nothing is recorded while OUTBOX_ENDPOINT is unset, so a deployment without a
+dispatcher does not fill the table with events nobody delivers.
+
+Events of one row keep their order, since a second write of a row waits for
+the transaction of the first. Events of different rows committed by
+concurrent transactions may arrive out of id order.
+"""
+import hashlib
+import hmac
+import json
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Employee, Project, EmployeeProject, OutboxEvent
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+# Rows moved into or out of the archive tables, they still count for payroll
+ARCHIVED = 'archived'
+RESTORED = 'restored'
+
+# Fields sent with every event, foreign keys as ids
+FIELDS = {
+    Employee: ['first_name', 'last_name', 'phone_number', 'role', 'hourly_rate'],
+    Project: ['name', 'description', 'date'],
+    EmployeeProject: ['employee_id', 'project_id', 'hours_worked'],
+}
+
+# Action recorded by the post_delete signal, see deletes_recorded_as()
+delete_action = ContextVar('outbox_delete_action', default=DELETED)
+
+
+class DeliveryError(Exception):
+    """The endpoint could not be reached or did not accept a batch."""
+
+
+@contextmanager
+def deletes_recorded_as(action):
+    """Record the deletes inside the block, including cascades, with another action than 'deleted'."""
+    token = delete_action.set(action)
+    try:
+        yield
+    finally:
+        delete_action.reset(token)
+
+
+def event(instance, action):
+    """An unsaved OutboxEvent for a row."""
+    return OutboxEvent(
+        model_name=instance._meta.model_name,
+        object_id=instance.pk,
+        action=action,
+        data={field.removesuffix('_id'): getattr(instance, field) for field in FIELDS[type(instance)]},
+    )
+
+
+def record(instance, action, using=DEFAULT_DB_ALIAS):
+    if settings.OUTBOX_ENDPOINT:
+        event(instance, action).save(using=using)
+
+
+def record_many(instances, action, using=DEFAULT_DB_ALIAS):
+    """Record one event per row with a single INSERT."""
+    if settings.OUTBOX_ENDPOINT:
+        OutboxEvent.objects.using(using).bulk_create([event(instance, action) for instance in instances])
+
+
+def message(outbox_event):
+    return {
+        'id': outbox_event.id,
+        'model': outbox_event.model_name,
+        'object_id': outbox_event.object_id,
+        'action': outbox_event.action,
+        'data': outbox_event.data,
+        'occurred_at': outbox_event.created_at,
+    }
+
+
+def deliver(events, endpoint=None, timeout=None):
+    """POST a batch of events to the endpoint. Raises DeliveryError unless it answers with a 2xx status."""
+    body = json.dumps({'events': [message(e) for e in events]}, cls=DjangoJSONEncoder).encode()
+    headers = {'Content-Type': 'application/json'}
+    if settings.OUTBOX_SECRET:
+        signature = hmac.new(settings.OUTBOX_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        headers['X-WorkTrack-Signature'] = f'sha256={signature}'
+    request = urllib.request.Request(endpoint or settings.OUTBOX_ENDPOINT, data=body, headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout or settings.OUTBOX_TIMEOUT) as response:
+            response.read()
+    except urllib.error.HTTPError as exc:
+        raise DeliveryError(f'{exc.code} {exc.reason}') from exc
+    except (urllib.error.URLError, OSError) as exc:
+        raise DeliveryError(str(getattr(exc, 'reason', exc))) from exc
+
+
+def dispatch_batch(endpoint=None, batch_size=None, timeout=None):
+    """
+    Deliver the oldest pending events as one batch and delete them.
+    Returns the number of events delivered; raises DeliveryError and keeps them when delivery fails.
+    """
+    events = list(OutboxEvent.objects.order_by('id')[:batch_size or settings.OUTBOX_BATCH_SIZE])
+    if not events:
+        return 0
+    deliver(events, endpoint, timeout)
+    OutboxEvent.objects.filter(id__in=[e.id for e in events]).delete()
+    return len(events)
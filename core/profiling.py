@@ -0,0 +1,173 @@
+"""
+On-demand request profiling.
+
+A profiled request records a cProfile call graph, the SQL queries it ran
+with their durations, and the tracemalloc peak. Profiles are kept as files
+in a bounded local directory, so every worker on the host can list them.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+# Profile files are named <id>.json (summary) and <id>.prof (pstats dump)
+PROFILE_ID_LENGTH = 27
+
+
+def profile_dir():
+    path = settings.PROFILE_DIR or os.path.join(tempfile.gettempdir(), 'worktrack-profiles')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class QueryTimer:
+    """Database execute wrapper that records every query with its duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'many': many,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+class RequestProfile:
+    """Everything captured for one profiled request."""
+
+    # tracemalloc is process wide, so only one request per process is profiled at a time
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.query_timer = QueryTimer()
+        self.started_tracing = False
+        self.duration = 0.0
+        self.memory_peak = None
+
+    @classmethod
+    @contextmanager
+    def capture(cls):
+        """
+        Profile the enclosed block. Yields the RequestProfile, or None when
+        another request in this process is already being profiled.
+        """
+        if not cls._lock.acquire(blocking=False):
+            yield None
+            return
+        profile = cls()
+        try:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                profile.started_tracing = True
+            tracemalloc.reset_peak()
+            started = time.perf_counter()
+            with connection.execute_wrapper(profile.query_timer):
+                profile.profiler.enable()
+                try:
+                    yield profile
+                finally:
+                    profile.profiler.disable()
+            profile.duration = time.perf_counter() - started
+            profile.memory_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            if profile.started_tracing:
+                tracemalloc.stop()
+            cls._lock.release()
+
+    def top_functions(self, limit=25):
+        """The slowest functions by cumulative time, as printed by pstats."""
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+    def save(self, request, response, trigger):
+        """Write the profile to the store and drop the oldest profiles beyond PROFILE_STORE_SIZE."""
+        # Ids sort by creation time (microseconds since the epoch), the suffix keeps them unique
+        profile_id = f"{int(time.time() * 1_000_000):016d}-{uuid.uuid4().hex[:10]}"
+        directory = profile_dir()
+        match = request.resolver_match
+        summary = {
+            'id': profile_id,
+            'created_at': time.time(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'trigger': trigger,
+            'user': request.user.get_username() if request.user.is_authenticated else None,
+            'duration_ms': round(self.duration * 1000, 3),
+            'memory_peak_bytes': self.memory_peak,
+            'query_count': len(self.query_timer.queries),
+            'query_time_ms': round(sum(query['duration_ms'] for query in self.query_timer.queries), 3),
+            'queries': self.query_timer.queries,
+            'top_functions': self.top_functions(),
+        }
+        self.profiler.dump_stats(os.path.join(directory, f'{profile_id}.prof'))
+        with open(os.path.join(directory, f'{profile_id}.json'), 'w') as handle:
+            json.dump(summary, handle)
+        prune_profiles(settings.PROFILE_STORE_SIZE)
+        return profile_id
+
+
+def list_profiles():
+    """Summaries of the stored profiles, newest first, without the bulky fields."""
+    profiles = []
+    for name in sorted(os.listdir(profile_dir()), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        summary = load_profile(name[:-5])
+        if summary:
+            summary.pop('queries', None)
+            summary.pop('top_functions', None)
+            profiles.append(summary)
+    return profiles
+
+
+def _profile_path(profile_id, extension):
+    """Path of a stored profile file, or None for ids that are not ours."""
+    if len(profile_id) != PROFILE_ID_LENGTH or not profile_id.replace('-', '').isalnum():
+        return None
+    return os.path.join(profile_dir(), f'{profile_id}.{extension}')
+
+
+def load_profile(profile_id):
+    path = _profile_path(profile_id, 'json')
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (TypeError, OSError, ValueError):
+        return None
+
+
+def profile_stats_path(profile_id):
+    path = _profile_path(profile_id, 'prof')
+    return path if path and os.path.exists(path) else None
+
+
+def prune_profiles(keep):
+    """Delete all but the newest keep profiles."""
+    directory = profile_dir()
+    ids = sorted({name.rsplit('.', 1)[0] for name in os.listdir(directory)}, reverse=True)
+    for profile_id in ids[keep:]:
+        for extension in ('json', 'prof'):
+            try:
+                os.remove(os.path.join(directory, f'{profile_id}.{extension}'))
+            except OSError:
+                pass
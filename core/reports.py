@@ -0,0 +1,493 @@
+"""
+PDF report building blocks shared by the employee export endpoints.
+"""
+import os
+import re
+import zlib
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+
+# Write binary streams instead of ASCII85-encoding them. Encoding the logo
+# in pure Python otherwise dominates the render time of a one-page report.
+rl_config.useA85 = 0
+
+MONTH_NAMES_GERMAN = {
+    1: 'Januar', 2: 'Februar', 3: 'März', 4: 'April',
+    5: 'Mai', 6: 'Juni', 7: 'Juli', 8: 'August',
+    9: 'September', 10: 'Oktober', 11: 'November', 12: 'Dezember'
+}
+
+LOGO_PATH = os.path.join(settings.BASE_DIR, 'static', 'logo_transp.png')
+
+# Rows per Table flowable in the range report. Platypus lays out and splits
+# each table as a whole, so many small tables are much cheaper than one big one.
+RANGE_CHUNK_ROWS = 250
+
+
+def print_timestamp():
+    """Current date and time in the German format used on the reports (24-hour time)."""
+    now = datetime.now()
+    month_name = MONTH_NAMES_GERMAN.get(now.month, f"Monat {now.month}")
+    return f"{month_name} {now.day}, {now.year} um {now.hour:02d}:{now.minute:02d} Uhr"
+
+
+def employee_info_lines(employee, period_label):
+    """(label, value) pairs shown below the report title."""
+    lines = [
+        ('Mitarbeiter:', f"{employee.first_name} {employee.last_name}"),
+        ('Telefonnummer:', employee.phone_number),
+        ('Rolle:', employee.role),
+    ]
+    if employee.hourly_rate:
+        lines.append(('Stundensatz:', f"€{employee.hourly_rate:.2f}"))
+    lines.append(('Zeitraum:', period_label))
+    return lines
+
+
+def report_styles():
+    """Paragraph styles used by the employee reports."""
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=20,
+            textColor=colors.HexColor('#1a1a1a'),
+            spaceAfter=10,
+            alignment=1,  # Center alignment
+        ),
+        'org': ParagraphStyle(
+            'OrgStyle',
+            parent=styles['Heading2'],
+            fontSize=16,
+            textColor=colors.HexColor('#1800ad'),
+            spaceAfter=5,
+            alignment=1,  # Center alignment
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#2c3e50'),
+            spaceAfter=12,
+        ),
+        'normal': styles['Normal'],
+        'date': ParagraphStyle(
+            'DateStyle',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.HexColor('#666666'),
+            alignment=2,  # Right alignment
+        ),
+        'bold': ParagraphStyle(
+            'BoldStyle',
+            parent=styles['Normal'],
+            fontName='Helvetica-Bold',
+        ),
+    }
+
+
+def report_header(employee, period_label, styles):
+    """
+    Build the report header: logo, organization, title, print date,
+    employee information and the covered period.
+    """
+    elements = []
+
+    # Add header with logo and organization name
+    if os.path.exists(LOGO_PATH):
+        try:
+            logo = Image(LOGO_PATH, width=2*inch, height=0.8*inch)
+            logo.hAlign = 'CENTER'
+            elements.append(logo)
+            elements.append(Spacer(1, 0.1 * inch))
+        except Exception:
+            pass
+
+    # Organization name
+    elements.append(Paragraph("ZeenAlZein", styles['org']))
+    elements.append(Spacer(1, 0.1 * inch))
+
+    # Add title
+    elements.append(Paragraph("Mitarbeiter Arbeitsbericht", styles['title']))
+
+    elements.append(Paragraph(f"<i>Gedruckt: {print_timestamp()}</i>", styles['date']))
+    elements.append(Spacer(1, 0.2 * inch))
+
+    # Add employee information and the covered period
+    for label, value in employee_info_lines(employee, period_label):
+        elements.append(Paragraph(f"<b>{label}</b> {value}", styles['normal']))
+    elements.append(Spacer(1, 0.3 * inch))
+    return elements
+
+
+def _range_chunk(rows, header, col_widths, amount_columns, subtotal=None):
+    """
+    One Table flowable for a slice of rows. Cells are plain strings instead of
+    Paragraphs, which skips markup parsing for every cell.
+    """
+    data = [header, *rows]
+    if subtotal:
+        data.append(subtotal)
+    table = Table(data, colWidths=col_widths, repeatRows=1)
+    last_body_row = -2 if subtotal else -1
+    style = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        *[('ALIGN', (col, 0), (col, -1), 'RIGHT') for col in amount_columns],
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('ROWBACKGROUNDS', (0, 1), (-1, last_body_row), [colors.white, colors.lightgrey]),
+    ]
+    if subtotal:
+        style += [
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#ecf0f1')),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ]
+    table.setStyle(TableStyle(style))
+    return table
+
+
+def render_range_report(employee, rows, period_label, output):
+    """
+    Write a multi-month report for an employee to the file-like output.
+    rows is an iterable of (date, project name, hours) tuples ordered by date.
+    The table is split into RANGE_CHUNK_ROWS-sized chunks with a repeated header
+    and a subtotal after every month.
+    """
+    styles = report_styles()
+    hourly_rate = float(employee.hourly_rate) if employee.hourly_rate and employee.hourly_rate > 0 else None
+
+    if hourly_rate:
+        header = ['Datum', 'Projektname', 'Gearbeitete Stunden', 'Betrag']
+        col_widths = [1.5 * inch, 2.8 * inch, 1.2 * inch, 1.5 * inch]
+        amount_columns = [2, 3]
+    else:
+        header = ['Datum', 'Projektname', 'Gearbeitete Stunden']
+        col_widths = [1.5 * inch, 3.5 * inch, 1.5 * inch]
+        amount_columns = [2]
+
+    def total_row(label, hours):
+        row = ['', label, f"{hours:.2f}"]
+        if hourly_rate:
+            row.append(f"€{hours * hourly_rate:.2f}")
+        return row
+
+    elements = report_header(employee, period_label, styles)
+    chunk = []
+    current_month = None
+    month_hours = 0.0
+    total_hours = 0.0
+
+    def flush_month():
+        label = f"SUMME {MONTH_NAMES_GERMAN[current_month[1]]} {current_month[0]}"
+        elements.append(_range_chunk(chunk, header, col_widths, amount_columns, total_row(label, month_hours)))
+        elements.append(Spacer(1, 0.2 * inch))
+
+    for date, name, hours in rows:
+        if (date.year, date.month) != current_month:
+            if current_month:
+                flush_month()
+            current_month = (date.year, date.month)
+            chunk, month_hours = [], 0.0
+            elements.append(
+                Paragraph(f"<b>{MONTH_NAMES_GERMAN[date.month]} {date.year}</b>", styles['heading'])
+            )
+        elif len(chunk) >= RANGE_CHUNK_ROWS:
+            elements.append(_range_chunk(chunk, header, col_widths, amount_columns))
+            chunk = []
+
+        row = [date.strftime('%Y-%m-%d'), name, f"{hours:.2f}"]
+        if hourly_rate:
+            row.append(f"€{hours * hourly_rate:.2f}")
+        chunk.append(row)
+        month_hours += hours
+        total_hours += hours
+
+    if current_month:
+        flush_month()
+        elements.append(_range_chunk([], header, col_widths, amount_columns, total_row('GESAMTSTUNDEN', total_hours)))
+    else:
+        elements.append(Paragraph(f"Für {period_label} wurden keine Projekte gefunden", styles['normal']))
+
+    SimpleDocTemplate(output, pagesize=letter).build(elements)
+
+
+def _monthly_columns(employee):
+    """Hourly rate (or None) and column widths of the monthly report table."""
+    hourly_rate = float(employee.hourly_rate) if employee.hourly_rate and employee.hourly_rate > 0 else None
+    if hourly_rate:
+        return hourly_rate, [1.5 * inch, 2.8 * inch, 1.2 * inch, 1.5 * inch]
+    return hourly_rate, [1.5 * inch, 3.5 * inch, 1.5 * inch]
+
+
+def _monthly_cells(rows, hourly_rate):
+    """Header, body and total row texts of the monthly report table."""
+    header = ['Datum', 'Projektname', 'Gearbeitete Stunden']
+    if hourly_rate:
+        header.append('Betrag')
+
+    body = []
+    total_hours = 0.0
+    for date, name, hours in rows:
+        row = [date.strftime('%Y-%m-%d'), name, f"{hours:.2f}"]
+        if hourly_rate:
+            row.append(f"€{hours * hourly_rate:.2f}")
+        body.append(row)
+        total_hours += hours
+
+    total = ['', 'GESAMTSTUNDEN', f"{total_hours:.2f}"]
+    if hourly_rate:
+        total.append(f"€{total_hours * hourly_rate:.2f}")
+    return header, body, total
+
+
+def render_monthly_platypus(employee, rows, period_label, output):
+    """
+    Render the monthly report with Platypus flowables.
+    Handles wrapping and pagination, so it works for any report.
+    """
+    styles = report_styles()
+    normal_style = styles['normal']
+    bold_style = styles['bold']
+    hourly_rate, col_widths = _monthly_columns(employee)
+
+    elements = report_header(employee, period_label, styles)
+
+    if rows:
+        elements.append(Paragraph("<b>Bearbeitete Projekte</b>", styles['heading']))
+
+        header, body, total = _monthly_cells(rows, hourly_rate)
+        table_data = [
+            [Paragraph(f'<b>{text}</b>', normal_style) for text in header],
+            *body,
+            [total[0], *[Paragraph(f'<b>{text}</b>', bold_style) for text in total[1:]]],
+        ]
+
+        # Right align hours and amount columns
+        align_rules = [('ALIGN', (col, 0), (col, -1), 'RIGHT') for col in range(2, len(header))]
+
+        table = Table(table_data, colWidths=col_widths)
+        table_style = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            *align_rules,
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('TOPPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.lightgrey]),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#ecf0f1')),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.black),
+            ('FONTSIZE', (0, -1), (-1, -1), 11),
+            ('TOPPADDING', (0, -1), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, -1), (-1, -1), 8),
+        ]
+        table.setStyle(TableStyle(table_style))
+        elements.append(table)
+    else:
+        elements.append(Paragraph(f"Für {period_label} wurden keine Projekte gefunden", normal_style))
+
+    SimpleDocTemplate(output, pagesize=letter).build(elements)
+
+
+# Page geometry of SimpleDocTemplate(pagesize=letter): 1 inch margins plus 6pt frame padding
+PAGE_WIDTH, PAGE_HEIGHT = letter
+FRAME_LEFT = inch + 6
+FRAME_WIDTH = PAGE_WIDTH - 2 * inch - 12
+FRAME_TOP = PAGE_HEIGHT - inch - 6
+FRAME_BOTTOM = inch + 6
+
+# Table row heights used by the Platypus layout (text leading plus cell padding)
+HEADER_ROW_PADDING = 2 * 12
+BODY_ROW_HEIGHT = 12 + 2 * 3
+TOTAL_ROW_HEIGHT = 12 + 2 * 8
+CELL_PADDING = 6
+
+# Vertical space taken by everything above the table, measured from FRAME_TOP
+_LOGO_BLOCK = 0.8 * inch + 0.1 * inch
+_TITLE_BLOCK = 12 + 18 + 5 + 0.1 * inch + 22 + 10 + 12 + 0.2 * inch
+_TABLE_HEADING_BLOCK = 0.3 * inch + 12 + 18 + 12
+
+
+def _canvas_header_height(line_count):
+    logo = _LOGO_BLOCK if os.path.exists(LOGO_PATH) else 0
+    return logo + _TITLE_BLOCK + 12 * line_count + _TABLE_HEADING_BLOCK
+
+
+def _header_lines(header, col_widths):
+    """Header texts wrapped to their columns the way the Paragraph cells wrap."""
+    return [simpleSplit(text, 'Helvetica-Bold', 10, width - 2 * CELL_PADDING) for text, width in zip(header, col_widths)]
+
+
+def canvas_layout_fits(employee, rows, period_label):
+    """
+    Whether the monthly report fits on one page without wrapping any text,
+    which is what render_monthly_canvas supports.
+    """
+    hourly_rate, col_widths = _monthly_columns(employee)
+    lines = employee_info_lines(employee, period_label)
+
+    for label, value in lines:
+        width = stringWidth(label + ' ', 'Helvetica-Bold', 10) + stringWidth(str(value), 'Helvetica', 10)
+        if width > FRAME_WIDTH:
+            return False
+
+    name_width = col_widths[1] - 2 * CELL_PADDING
+    if any(stringWidth(name, 'Helvetica', 10) > name_width for _, name, _ in rows):
+        return False
+
+    header, _, _ = _monthly_cells([], hourly_rate)
+    header_height = 12 * max(len(lines) for lines in _header_lines(header, col_widths)) + HEADER_ROW_PADDING
+    table_height = header_height + BODY_ROW_HEIGHT * len(rows) + TOTAL_ROW_HEIGHT
+    return _canvas_header_height(len(lines)) + table_height <= FRAME_TOP - FRAME_BOTTOM
+
+
+def render_monthly_canvas(employee, rows, period_label, output):
+    """
+    Render the monthly report by drawing the Platypus layout directly on the canvas.
+    Skips paragraph parsing and table wrap/split, but only handles reports for
+    which canvas_layout_fits() is true.
+    """
+    hourly_rate, col_widths = _monthly_columns(employee)
+    pdf = canvas.Canvas(output, pagesize=letter)
+    center = PAGE_WIDTH / 2
+    y = FRAME_TOP
+
+    if os.path.exists(LOGO_PATH):
+        try:
+            pdf.drawImage(LOGO_PATH, center - inch, y - 0.8 * inch, width=2 * inch, height=0.8 * inch, mask='auto')
+            y -= _LOGO_BLOCK
+        except Exception:
+            pass
+
+    # Organization name: Heading2 spacing with a 16pt font
+    y -= 12
+    pdf.setFillColor(colors.HexColor('#1800ad'))
+    pdf.setFont('Helvetica-Bold', 16)
+    pdf.drawCentredString(center, y - 16, "ZeenAlZein")
+    y -= 18 + 5 + 0.1 * inch
+
+    pdf.setFillColor(colors.HexColor('#1a1a1a'))
+    pdf.setFont('Helvetica-Bold', 20)
+    pdf.drawCentredString(center, y - 20, "Mitarbeiter Arbeitsbericht")
+    y -= 22 + 10
+
+    pdf.setFillColor(colors.HexColor('#666666'))
+    pdf.setFont('Helvetica-Oblique', 9)
+    pdf.drawRightString(FRAME_LEFT + FRAME_WIDTH, y - 9, f"Gedruckt: {print_timestamp()}")
+    y -= 12 + 0.2 * inch
+
+    pdf.setFillColor(colors.black)
+    for label, value in employee_info_lines(employee, period_label):
+        pdf.setFont('Helvetica-Bold', 10)
+        pdf.drawString(FRAME_LEFT, y - 10, label)
+        pdf.setFont('Helvetica', 10)
+        pdf.drawString(FRAME_LEFT + stringWidth(label + ' ', 'Helvetica-Bold', 10), y - 10, str(value))
+        y -= 12
+    y -= 0.3 * inch
+
+    if not rows:
+        pdf.setFont('Helvetica', 10)
+        pdf.drawString(FRAME_LEFT, y - 10, f"Für {period_label} wurden keine Projekte gefunden")
+        pdf.showPage()
+        pdf.save()
+        return
+
+    y -= 12
+    pdf.setFillColor(colors.HexColor('#2c3e50'))
+    pdf.setFont('Helvetica-Bold', 14)
+    pdf.drawString(FRAME_LEFT, y - 14, "Bearbeitete Projekte")
+    y -= 18 + 12
+
+    header, body, total = _monthly_cells(rows, hourly_rate)
+    header_lines = _header_lines(header, col_widths)
+    table_width = sum(col_widths)
+    left = center - table_width / 2
+    col_lefts = [left + sum(col_widths[:index]) for index in range(len(col_widths))]
+    # Header and total cells are left aligned Paragraphs in the Platypus layout, so
+    # ALIGN and TEXTCOLOR do not apply to them; only body amounts are right aligned.
+    table_rows = [
+        (header_lines, 12 * max(len(lines) for lines in header_lines) + HEADER_ROW_PADDING,
+         colors.HexColor('#34495e'), 'Helvetica-Bold', False),
+        *[([[text] for text in row], BODY_ROW_HEIGHT, (colors.white, colors.lightgrey)[index % 2], 'Helvetica', True)
+          for index, row in enumerate(body)],
+        ([[text] for text in total], TOTAL_ROW_HEIGHT, colors.HexColor('#ecf0f1'), 'Helvetica-Bold', False),
+    ]
+    table_top = y
+
+    for cells, height, background, font, align_amounts in table_rows:
+        pdf.setFillColor(background)
+        pdf.rect(left, y - height, table_width, height, stroke=0, fill=1)
+        pdf.setFillColor(colors.black)
+        pdf.setFont(font, 10)
+        for col, lines in enumerate(cells):
+            # Vertically centre the cell's lines, 12pt leading with the baseline 10pt below the line top
+            baseline = y - (height - 12 * len(lines)) / 2 - 10
+            for text in lines:
+                if align_amounts and col >= 2:
+                    pdf.drawRightString(col_lefts[col] + col_widths[col] - CELL_PADDING, baseline, text)
+                else:
+                    pdf.drawString(col_lefts[col] + CELL_PADDING, baseline, text)
+                baseline -= 12
+        y -= height
+
+    # Grid
+    pdf.setStrokeColor(colors.black)
+    pdf.setLineWidth(1)
+    row_y = table_top
+    for _, height, _, _, _ in table_rows:
+        pdf.line(left, row_y, left + table_width, row_y)
+        row_y -= height
+    pdf.line(left, y, left + table_width, y)
+    for col_left in [*col_lefts, left + table_width]:
+        pdf.line(col_left, table_top, col_left, y)
+
+    pdf.showPage()
+    pdf.save()
+
+
+def pdf_text(data):
+    """
+    Words drawn with Tj in the FlateDecode streams of a ReportLab PDF, and the page count.
+    Good enough to compare two renderings of the same report.
+    """
+    words = Counter()
+    for match in re.finditer(rb'/FlateDecode.*?stream\r?\n(.*?)endstream', data, re.S):
+        try:
+            content = zlib.decompress(match.group(1))
+        except zlib.error:
+            continue
+        for text in re.finditer(rb'\(((?:\\.|[^\\)])*)\)\s*Tj', content):
+            words.update(re.sub(rb'\\(.)', rb'\1', text.group(1)).decode('latin-1').split())
+    return words, len(re.findall(rb'/Type /Page\b', data))
+
+
+def render_monthly_report(employee, rows, period_label, output):
+    """
+    Render the monthly report, drawing straight on the canvas when it fits on
+    one page without wrapping and falling back to Platypus otherwise.
+    Returns the name of the renderer used.
+    """
+    if canvas_layout_fits(employee, rows, period_label):
+        render_monthly_canvas(employee, rows, period_label, output)
+        return 'canvas'
+    render_monthly_platypus(employee, rows, period_label, output)
+    return 'platypus'
@@ -1,5 +1,37 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Employee, Project, EmployeeProject
+from rest_framework.validators import UniqueTogetherValidator
+from . import daily_totals, facets, live_stats, month_close, outbox
+from .directory import directory
+from .models import Employee, Project, EmployeeProject, EmployeeDailyTotal
+
+
+def validate_months_open(*days, lock=False):
+    """
+    Reject changes to the projects or hours of closed months.
+    Writes check again with lock=True inside their transaction, which also keeps the months
+    from being closed before it commits.
+    """
+    closed = month_close.closed_months([day for day in days if day is not None], lock=lock)
+    if closed:
+        raise serializers.ValidationError(
+            f"Closed month(s) cannot be changed: {', '.join(closed)}. Reopen them first."
+        )
+
+
+def validate_daily_limit(totals):
+    """Reject writes that book an employee for more than DAILY_HOURS_LIMIT hours on a day."""
+    days = daily_totals.over_limit(totals)
+    if days:
+        booked = ', '.join(
+            f'{directory.get(employee_id) or f"employee {employee_id}"} on {day} ({hours:g}h)'
+            for (employee_id, day), hours in days
+        )
+        raise serializers.ValidationError(
+            f'More than the daily limit of {settings.DAILY_HOURS_LIMIT:g} hours: {booked}.'
+        )
 
 
 class EmployeeProjectSerializer(serializers.ModelSerializer):
@@ -74,6 +106,23 @@ class ProjectSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at']
 
+    def validate(self, attrs):
+        validate_months_open(attrs.get('date'), self.instance.date if self.instance else None)
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        validate_months_open(validated_data.get('date'), lock=True)
+        return super().create(validated_data)
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        validate_months_open(validated_data.get('date'), instance.date, lock=True)
+        instance = super().update(instance, validated_data)
+        # A new date moves the crew's hours to another day
+        validate_daily_limit(instance._daily_totals)
+        return instance
+
 
 class ProjectListSerializer(serializers.ModelSerializer):
     """
@@ -90,33 +139,360 @@ class ProjectListSerializer(serializers.ModelSerializer):
         return obj.employee_projects.count()
 
 
+class DirectoryEmployeeField(serializers.PrimaryKeyRelatedField):
+    """
+    Employee primary key field resolved from the in-memory employee directory,
+    or from the database when the directory does not know the id yet.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            employee_id = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        employee = directory.lookup(employee_id)
+        if employee is None:
+            self.fail('does_not_exist', pk_value=data)
+        return employee
+
+
 class EmployeeProjectCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating/updating EmployeeProject.
     Handles upsert logic (update if exists, create if not).
     """
-    employee = serializers.PrimaryKeyRelatedField(queryset=Employee.objects.all())
+    employee = DirectoryEmployeeField(queryset=Employee.objects.all())
     project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all())
     hours_worked = serializers.FloatField(required=False, default=0.0, allow_null=False)
 
+    # One statement for both cases: created_at is only written by the INSERT, so it
+    # equals updated_at exactly when the row was created
+    UPSERT_SQL = (
+        'INSERT INTO {table} (employee_id, project_id, hours_worked, created_at, updated_at) '
+        'VALUES (%s, %s, %s, %s, %s) '
+        'ON CONFLICT (employee_id, project_id) DO UPDATE '
+        'SET hours_worked = EXCLUDED.hours_worked, updated_at = EXCLUDED.updated_at '
+        'RETURNING id, employee_id, project_id, hours_worked, created_at, updated_at, '
+        'created_at = updated_at AS created'
+    )
+    # Postgres: the upsert, the hours it replaced and the change of the daily total in one statement
+    UPSERT_WITH_TOTAL_SQL = (
+        'WITH previous AS ('
+        'SELECT hours_worked FROM {table} WHERE employee_id = %s AND project_id = %s'
+        '), upsert AS (' + UPSERT_SQL + '), total AS ('
+        'UPDATE {totals} SET '
+        'hours = {totals}.hours + upsert.hours_worked - COALESCE((SELECT hours_worked FROM previous), 0), '
+        'entries = {totals}.entries + CASE WHEN upsert.created THEN 1 ELSE 0 END '
+        'FROM upsert WHERE {totals}.employee_id = %s AND {totals}.date = %s '
+        'RETURNING {totals}.hours'
+        ') SELECT upsert.*, (SELECT hours FROM total) AS day_hours FROM upsert'
+    )
+
     class Meta:
         model = EmployeeProject
         fields = ['id', 'employee', 'project', 'hours_worked', 'created_at']
         read_only_fields = ['created_at']
 
+    def get_validators(self):
+        """
+        Creating an existing employee/project pair updates it, so the unique-together check
+        only applies when an existing assignment is edited.
+        """
+        validators = super().get_validators()
+        if self.instance is None:
+            validators = [v for v in validators if not isinstance(v, UniqueTogetherValidator)]
+        return validators
+
+    def validate(self, attrs):
+        project = attrs.get('project')
+        validate_months_open(
+            project.date if project else None,
+            self.instance.project.date if self.instance else None,
+        )
+        return attrs
+
+    @transaction.atomic
     def create(self, validated_data):
         """
         Create or update EmployeeProject record.
         If record exists for same employee and project, update hours_worked.
+        Sets self.created to whether a new row was inserted.
         """
         employee = validated_data['employee']
         project = validated_data['project']
         hours_worked = validated_data.get('hours_worked', 0.0)
+        validate_months_open(project.date, lock=True)
 
-        employee_project, created = EmployeeProject.objects.update_or_create(
-            employee=employee,
-            project=project,
-            defaults={'hours_worked': hours_worked}
-        )
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            employee_project, self.created = EmployeeProject.objects.update_or_create(
+                employee=employee,
+                project=project,
+                defaults={'hours_worked': hours_worked}
+            )
+            validate_daily_limit(employee_project._daily_totals)
+            return employee_project
 
+        # The raw INSERT sends no save signals, so the daily total is changed here. It is checked
+        # after the write; going over the limit raises and rolls the transaction back.
+        pair = (employee.id, project.date)
+        now = EmployeeProject._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+        upsert_params = [employee.id, project.id, hours_worked, now, now]
+        if connection.vendor == 'postgresql':
+            # Locking the total first makes the statement's snapshot include the hours
+            # every earlier writer of this employee and day committed
+            daily_totals.lock({pair})
+            employee_project = next(iter(EmployeeProject.objects.raw(
+                self.UPSERT_WITH_TOTAL_SQL.format(
+                    table=EmployeeProject._meta.db_table, totals=EmployeeDailyTotal._meta.db_table
+                ),
+                [employee.id, project.id, *upsert_params, employee.id, project.date],
+            )))
+            self.created = bool(employee_project.created)
+            day_hours = employee_project.day_hours
+        else:
+            # SQLite has one writer at a time, a transaction that read rows another one
+            # changed since fails instead of writing
+            previous = EmployeeProject.objects.filter(employee=employee, project=project).values_list(
+                'hours_worked', flat=True
+            ).first() or 0.0
+            employee_project = next(iter(EmployeeProject.objects.raw(
+                self.UPSERT_SQL.format(table=EmployeeProject._meta.db_table), upsert_params
+            )))
+            self.created = bool(employee_project.created)
+            day_hours = daily_totals.apply(
+                [(employee.id, project.date, hours_worked - previous, int(self.created))]
+            )[pair]
+        validate_daily_limit({pair: day_hours})
+        outbox.record(employee_project, outbox.CREATED if self.created else outbox.UPDATED)
+        employee_project.employee = employee
+        employee_project.project = project
+        live_stats.changed({live_stats.month_key(project.date)})
+        if self.created:
+            facets.invalidate()
         return employee_project
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        project = validated_data.get('project')
+        validate_months_open(project.date if project else None, instance.project.date, lock=True)
+        instance = super().update(instance, validated_data)
+        validate_daily_limit(instance._daily_totals)
+        return instance
+
+
+class EmployeeSyncSerializer(serializers.ModelSerializer):
+    """
+    Flat Employee representation used by the delta-sync feed.
+    """
+
+    class Meta:
+        model = Employee
+        fields = [
+            'id', 'first_name', 'last_name', 'phone_number',
+            'role', 'hourly_rate', 'created_at', 'updated_at'
+        ]
+
+
+class ProjectSyncSerializer(serializers.ModelSerializer):
+    """
+    Flat Project representation used by the delta-sync feed.
+    """
+
+    class Meta:
+        model = Project
+        fields = ['id', 'name', 'description', 'date', 'created_at', 'updated_at']
+
+
+class EmployeeProjectSyncSerializer(serializers.ModelSerializer):
+    """
+    Flat EmployeeProject representation used by the delta-sync feed.
+    Related rows are referenced by id only, clients join them locally.
+    """
+
+    class Meta:
+        model = EmployeeProject
+        fields = ['id', 'employee', 'project', 'hours_worked', 'created_at', 'updated_at']
+
+
+class CrewAssignmentSerializer(serializers.Serializer):
+    """
+    One crew member of a project in a nested project write.
+    Employee ids are checked together by ProjectCrewSerializer.
+    """
+    employee = serializers.IntegerField()
+    hours_worked = serializers.FloatField(required=False, default=0.0, allow_null=False)
+
+
+class ProjectCrewSerializer(serializers.ModelSerializer):
+    """
+    Serializer for creating/updating a Project together with its full crew.
+    Assignments missing from the list are removed, the others are upserted in bulk.
+    """
+    assignments = CrewAssignmentSerializer(many=True)
+
+    class Meta:
+        model = Project
+        fields = ['id', 'name', 'description', 'date', 'created_at', 'assignments']
+        read_only_fields = ['created_at']
+
+    def validate_assignments(self, assignments):
+        """Reject duplicate employees and check that all employees exist."""
+        employee_ids = [assignment['employee'] for assignment in assignments]
+        if len(employee_ids) != len(set(employee_ids)):
+            raise serializers.ValidationError('Each employee can only be assigned once.')
+
+        existing = set(Employee.objects.filter(id__in=employee_ids).values_list('id', flat=True))
+        missing = sorted(set(employee_ids) - existing)
+        if missing:
+            raise serializers.ValidationError(f"Unknown employee id(s): {', '.join(map(str, missing))}")
+        return assignments
+
+    def validate(self, attrs):
+        validate_months_open(attrs.get('date'), self.instance.date if self.instance else None)
+        return attrs
+
+    def _save_crew(self, project, assignments):
+        """Upsert the given assignments and delete the ones no longer listed."""
+        # bulk_create sends no save signals, so the daily totals are locked, checked and changed here
+        totals = daily_totals.lock({(assignment['employee'], project.date) for assignment in assignments})
+        existing = dict(EmployeeProject.objects.filter(project=project).values_list('employee_id', 'hours_worked'))
+        changes = [
+            (
+                assignment['employee'], project.date,
+                assignment.get('hours_worked', 0.0) - existing.get(assignment['employee'], 0.0),
+                int(assignment['employee'] not in existing),
+            )
+            for assignment in assignments
+        ]
+        validate_daily_limit({
+            (employee_id, day): totals[(employee_id, day)] + hours for employee_id, day, hours, _ in changes
+        })
+        saved = EmployeeProject.objects.bulk_create(
+            [
+                EmployeeProject(
+                    employee_id=assignment['employee'],
+                    project=project,
+                    hours_worked=assignment.get('hours_worked', 0.0),
+                )
+                for assignment in assignments
+            ],
+            update_conflicts=True,
+            unique_fields=['employee', 'project'],
+            update_fields=['hours_worked', 'updated_at'],
+        )
+        EmployeeProject.objects.filter(project=project).exclude(
+            employee_id__in=[assignment['employee'] for assignment in assignments]
+        ).delete()
+        # bulk_create sends no save signals, the delete above does
+        daily_totals.apply(changes)
+        outbox.record_many(
+            [assignment for assignment in saved if assignment.employee_id not in existing], outbox.CREATED
+        )
+        outbox.record_many([assignment for assignment in saved if assignment.employee_id in existing], outbox.UPDATED)
+        live_stats.changed({live_stats.month_key(project.date)})
+        facets.invalidate()
+
+    @transaction.atomic
+    def create(self, validated_data):
+        validate_months_open(validated_data.get('date'), lock=True)
+        assignments = validated_data.pop('assignments')
+        project = Project.objects.create(**validated_data)
+        self._save_crew(project, assignments)
+        return project
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        validate_months_open(validated_data.get('date'), instance.date, lock=True)
+        assignments = validated_data.pop('assignments', None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save()
+        if assignments is not None:
+            self._save_crew(instance, assignments)
+        else:
+            # A new date moves the crew's hours to another day
+            validate_daily_limit(instance._daily_totals)
+        return instance
+
+    def to_representation(self, instance):
+        instance = Project.objects.prefetch_related('employee_projects__employee').get(pk=instance.pk)
+        return ProjectSerializer(instance).data
+
+
+class ProjectCloneSerializer(serializers.Serializer):
+    """
+    Serializer for copying the projects of one day (and their crews) to other days.
+    """
+    source_date = serializers.DateField()
+    target_dates = serializers.ListField(child=serializers.DateField(), min_length=1, max_length=31)
+    project_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    copy_hours = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if attrs['source_date'] in attrs['target_dates']:
+            raise serializers.ValidationError({'target_dates': 'Target dates must differ from the source date.'})
+        if len(set(attrs['target_dates'])) != len(attrs['target_dates']):
+            raise serializers.ValidationError({'target_dates': 'Target dates must be unique.'})
+        try:
+            validate_months_open(*attrs['target_dates'])
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({'target_dates': exc.detail})
+        return attrs
+
+    @transaction.atomic
+    def create(self, validated_data):
+        """
+        Copy the source projects to every target date with one bulk insert per table.
+        Returns the created projects as dicts with the id of the project they were copied from.
+        """
+        validate_months_open(*validated_data['target_dates'], lock=True)
+        sources = Project.objects.filter(date=validated_data['source_date']).order_by('id')
+        if 'project_ids' in validated_data:
+            sources = sources.filter(id__in=validated_data['project_ids'])
+        sources = list(sources.values('id', 'name', 'description'))
+
+        copies = [
+            (source['id'], Project(name=source['name'], description=source['description'], date=target_date))
+            for target_date in validated_data['target_dates']
+            for source in sources
+        ]
+        # Primary keys are returned by the INSERT on PostgreSQL and SQLite 3.35+
+        Project.objects.bulk_create([project for _, project in copies])
+
+        crews = {}
+        for employee_id, project_id, hours_worked in EmployeeProject.objects.filter(
+            project_id__in=[source['id'] for source in sources]
+        ).values_list('employee_id', 'project_id', 'hours_worked'):
+            crews.setdefault(project_id, []).append((employee_id, hours_worked))
+
+        copy_hours = validated_data['copy_hours']
+        assignments = [
+            EmployeeProject(employee_id=employee_id, project=project, hours_worked=hours_worked if copy_hours else 0.0)
+            for source_id, project in copies
+            for employee_id, hours_worked in crews.get(source_id, [])
+        ]
+        changes = [
+            (assignment.employee_id, assignment.project.date, assignment.hours_worked, 1) for assignment in assignments
+        ]
+        totals = daily_totals.lock({(employee_id, day) for employee_id, day, _, _ in changes})
+        for employee_id, day, hours, _ in changes:
+            totals[(employee_id, day)] += hours
+        validate_daily_limit(totals)
+        EmployeeProject.objects.bulk_create(assignments)
+
+        # bulk_create sends no save signals
+        daily_totals.apply(changes)
+        outbox.record_many([project for _, project in copies] + assignments, outbox.CREATED)
+        live_stats.changed({live_stats.month_key(target_date) for target_date in validated_data['target_dates']})
+        facets.invalidate()
+
+        return {
+            'created_projects': len(copies),
+            'created_assignments': len(assignments),
+            'projects': [
+                {'id': project.id, 'source_id': source_id, 'name': project.name, 'date': project.date}
+                for source_id, project in copies
+            ],
+        }
@@ -0,0 +1,189 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import daily_totals, directory, facets, live_stats, outbox, tokens
+from .models import Employee, Project, EmployeeProject, Tombstone
+
+
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=EmployeeProject)
+def record_tombstone(sender, instance, **kwargs):
+    """
+    Keep a tombstone for every deleted row so the sync feed can report it.
+    Django sends post_delete for each row removed by a cascade as well,
+    so assignments deleted together with their employee or project are covered.
+    """
+    Tombstone.objects.create(model_name=sender._meta.model_name, object_id=instance.pk)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=EmployeeProject)
+def record_saved_event(sender, instance, created, using, **kwargs):
+    """Write the outbox event of a save; the models save in a transaction, so it commits with the row."""
+    outbox.record(instance, outbox.CREATED if created else outbox.UPDATED, using)
+
+
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=EmployeeProject)
+def record_deleted_event(sender, instance, using, **kwargs):
+    """Write the outbox event of a delete. Deletes run in a transaction and send this for cascaded rows too."""
+    outbox.record(instance, outbox.delete_action.get(), using)
+
+
+def _as_date(value):
+    """A project date, which may still be the ISO string it was assigned as."""
+    return Project._meta.get_field('date').to_python(value)
+
+
+def _project_date(assignment):
+    if EmployeeProject.project.is_cached(assignment):
+        return _as_date(assignment.project.date)
+    return Project.objects.filter(pk=assignment.project_id).values_list('date', flat=True).first()
+
+
+@receiver(pre_save, sender=Project)
+@receiver(pre_save, sender=EmployeeProject)
+def remember_statistics_month(sender, instance, update_fields=None, **kwargs):
+    """
+    Remember the month an updated project or assignment belonged to before the save,
+    so moving it to another month refreshes the live statistics of both months.
+    """
+    field = 'date' if sender is Project else 'project'
+    instance._statistics_date = None
+    if instance._state.adding or (update_fields is not None and field not in update_fields):
+        return
+    lookup = 'date' if sender is Project else 'project__date'
+    instance._statistics_date = sender.objects.filter(pk=instance.pk).values_list(lookup, flat=True).first()
+
+
+@receiver(pre_save, sender=EmployeeProject)
+def lock_daily_totals(sender, instance, using, **kwargs):
+    """
+    Lock the daily totals an assignment save changes and remember the employee, day and hours
+    it had before. instance._daily_totals holds the employee's hours of the day after the save.
+    """
+    day = instance._daily_total_date = _project_date(instance)
+    pair = (instance.employee_id, day)
+    totals = daily_totals.lock({pair}, using)
+    previous = None
+    if not instance._state.adding:
+        previous = sender.objects.using(using).select_for_update(of=('self',)).filter(pk=instance.pk).values_list(
+            'employee_id', 'project__date', 'hours_worked'
+        ).first()
+    if previous is not None and previous[:2] != pair:
+        daily_totals.lock({previous[:2]}, using)
+    instance._daily_total_previous = previous
+    same_day_hours = previous[2] if previous is not None and previous[:2] == pair else 0.0
+    instance._daily_totals = {pair: totals[pair] - same_day_hours + instance.hours_worked}
+
+
+@receiver(post_save, sender=EmployeeProject)
+def update_daily_totals(sender, instance, using, **kwargs):
+    changes = [(instance.employee_id, instance._daily_total_date, instance.hours_worked, 1)]
+    if instance._daily_total_previous is not None:
+        employee_id, day, hours = instance._daily_total_previous
+        changes.append((employee_id, day, -hours, -1))
+    daily_totals.apply(changes, using)
+
+
+@receiver(post_delete, sender=EmployeeProject)
+def remove_from_daily_totals(sender, instance, using, origin=None, **kwargs):
+    """Take a deleted assignment out of its daily total, also when a project delete cascades to it."""
+    if outbox.delete_action.get() == outbox.ARCHIVED:
+        # Archived months keep their totals
+        return
+    if getattr(origin, 'model', type(origin)) is Employee:
+        # The employee's daily totals are deleted with it
+        return
+    day = _as_date(origin.date) if isinstance(origin, Project) else _project_date(instance)
+    daily_totals.apply([(instance.employee_id, day, -instance.hours_worked, -1)], using)
+
+
+@receiver(post_save, sender=Project)
+def move_daily_totals(sender, instance, using, **kwargs):
+    """
+    Move the crew's hours to the new day when a project's date changed.
+    instance._daily_totals holds the crew's hours of the new day afterwards.
+    """
+    instance._daily_totals = {}
+    previous, day = instance._statistics_date, _as_date(instance.date)
+    if previous is None or previous == day:
+        return
+    crew = EmployeeProject.objects.using(using).filter(project=instance)
+    employee_ids = list(crew.values_list('employee_id', flat=True))
+    if not employee_ids:
+        return
+    daily_totals.lock({(employee_id, date) for employee_id in employee_ids for date in (previous, day)}, using)
+    changes = []
+    for employee_id, hours in crew.values_list('employee_id', 'hours_worked'):
+        changes += [(employee_id, previous, -hours, -1), (employee_id, day, hours, 1)]
+    totals = daily_totals.apply(changes, using)
+    instance._daily_totals = {pair: hours for pair, hours in totals.items() if pair[1] == day}
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_employee_directory(sender, using, **kwargs):
+    """Make every worker rebuild its in-memory employee directory once the change is committed."""
+    transaction.on_commit(directory.bump_generation, using=using)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def revoke_user_tokens(sender, instance, using, created=False, update_fields=None, **kwargs):
+    """
+    A changed user (password, staff or active flag) loses the API tokens issued before.
+    """
+    if created or update_fields == {'last_login'}:
+        return
+    transaction.on_commit(partial(tokens.revoke, instance.pk), using=using)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_deleted_user(sender, using, **kwargs):
+    """Drop the user rows the workers cached for token checks, so the tokens of a deleted user fail."""
+    transaction.on_commit(tokens.bump_users_generation, using=using)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def publish_employee_change(sender, instance, using, created=True, **kwargs):
+    # Only the employee count is part of the statistics, so plain updates change nothing
+    if created:
+        live_stats.changed({live_stats.ALL_MONTHS}, using=using)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=EmployeeProject)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=EmployeeProject)
+def publish_month_change(sender, instance, using, origin=None, **kwargs):
+    """Publish the months a project or assignment write touched to the live statistics streams."""
+    if sender is EmployeeProject and origin is not None:
+        # Cascades from a deleted project or employee are published by that delete
+        if getattr(origin, 'model', type(origin)) is not EmployeeProject:
+            return
+    dates = [_as_date(instance.date) if sender is Project else _project_date(instance)]
+    dates.append(getattr(instance, '_statistics_date', None))
+    live_stats.changed({live_stats.month_key(date) for date in dates if date is not None}, using=using)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=EmployeeProject)
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=EmployeeProject)
+def invalidate_facets(sender, using, origin=None, **kwargs):
+    """Make every worker recompute its cached facet counts once the write is committed."""
+    if sender is EmployeeProject and origin is not None:
+        # Cascades from a deleted project or employee are covered by that delete
+        if getattr(origin, 'model', type(origin)) is not EmployeeProject:
+            return
+    facets.invalidate(using)
@@ -0,0 +1,201 @@
+"""
+Slow-query log.
+
+Every database connection gets an execute wrapper that times its queries.
+Queries over SLOW_QUERY_THRESHOLD_MS are logged and aggregated per normalized
+SQL fingerprint in a per-thread buffer, then written to the SlowQuery table
+when the request finishes (outside of any transaction the view opened), or
+by management commands between their units of work. The query plan is
+captured once per fingerprint. Parameter values are only kept in memory for
+the plan; the log and the table get their types, since they may hold
+personal data.
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections, transaction, IntegrityError, DatabaseError
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger('core.slow_queries')
+
+# (view name, route) of the request being served
+current_view = ContextVar('slow_query_view', default=('', ''))
+
+# Per thread: paused while flushing, pending aggregates and fingerprints dropped since the last flush
+_state = threading.local()
+_explained = set()
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """SQL with literals replaced by ? and IN lists collapsed, so similar queries group together."""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+def _paused():
+    return getattr(_state, 'paused', False)
+
+
+def _pending():
+    if not hasattr(_state, 'pending'):
+        _state.pending = {}
+        _state.dropped = 0
+    return _state.pending
+
+
+def redact(params):
+    """The types of query parameters, without their values."""
+    if params is None:
+        return ''
+    if isinstance(params, dict):
+        return ', '.join(f'{name}=<{type(value).__name__}>' for name, value in params.items())
+    return ', '.join(f'<{type(value).__name__}>' for value in params)
+
+
+class SlowQueryRecorder:
+    """Execute wrapper installed on every connection."""
+
+    def __call__(self, execute, sql, params, many, context):
+        if _paused():
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            threshold = settings.SLOW_QUERY_THRESHOLD_MS
+            if threshold is not None and elapsed_ms >= threshold:
+                record(context['connection'].alias, sql, params, many, elapsed_ms)
+
+
+def install(connection, **kwargs):
+    """connection_created handler adding the recorder to a new connection."""
+    if settings.SLOW_QUERY_THRESHOLD_MS is None:
+        return
+    if not any(isinstance(wrapper, SlowQueryRecorder) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryRecorder())
+
+
+def record(alias, sql, params, many, elapsed_ms):
+    """Log one slow query and add it to the pending aggregates."""
+    normalized = normalize_sql(sql)
+    key = fingerprint(normalized)
+    view, route = current_view.get()
+    logger.warning(
+        'Slow query %.1fms [%s] view=%s route=%s sql=%s params=%s',
+        elapsed_ms, key[:12], view or '-', route or '-', normalized, '(many)' if many else redact(params)
+    )
+    pending = _pending()
+    if key not in pending and len(pending) >= settings.SLOW_QUERY_BUFFER_SIZE:
+        # Only logged; the table keeps the aggregates of the fingerprints already buffered
+        _state.dropped += 1
+        return
+    entry = pending.setdefault(key, {
+        'alias': alias, 'normalized_sql': normalized, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+    })
+    entry['count'] += 1
+    entry['total_ms'] += elapsed_ms
+    entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+    entry.update(sql=sql, params=None if many else params, view=view, route=route)
+
+
+def explain(alias, sql, params):
+    """Query plan of a SELECT as text, or '' when it cannot be explained."""
+    if params is None or not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    connection = connections[alias]
+    if connection.vendor == 'postgresql':
+        prefix = 'EXPLAIN (FORMAT JSON) '
+    elif connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return ''
+    # PostgreSQL returns the JSON plan as a single already-parsed value
+    return '\n'.join(
+        ' '.join(json.dumps(value) if isinstance(value, (list, dict)) else str(value) for value in row)
+        for row in rows
+    )
+
+
+def flush(**kwargs):
+    """
+    Write the pending aggregates of this thread to the SlowQuery table.
+    Connected to request_finished; long-running commands call it between their units of work.
+    """
+    from .models import SlowQuery
+
+    pending = _pending()
+    if not pending:
+        return
+    _state.pending = {}
+    if _state.dropped:
+        logger.warning('Slow-query buffer was full, %d slow queries were only logged', _state.dropped)
+        _state.dropped = 0
+
+    _state.paused = True
+    try:
+        for key, entry in pending.items():
+            connection = connections[entry['alias']]
+            if connection.in_atomic_block and connection.needs_rollback:
+                continue
+            values = {
+                'last_sql': entry['sql'],
+                'last_params': redact(entry['params']),
+                'last_view': entry['view'][:200],
+                'last_route': entry['route'][:200],
+                'last_seen': timezone.now(),
+            }
+            plan = ''
+            if settings.SLOW_QUERY_EXPLAIN and key not in _explained:
+                _explained.add(key)
+                plan = explain(entry['alias'], entry['sql'], entry['params'])
+                if plan:
+                    values['explain'] = plan
+            try:
+                with transaction.atomic(using=entry['alias']):
+                    queryset = SlowQuery.objects.using(entry['alias']).filter(fingerprint=key)
+                    updated = queryset.update(
+                        count=F('count') + entry['count'],
+                        total_ms=F('total_ms') + entry['total_ms'],
+                        max_ms=Greatest('max_ms', entry['max_ms']),
+                        **values,
+                    )
+                    if not updated:
+                        SlowQuery.objects.using(entry['alias']).create(
+                            fingerprint=key,
+                            normalized_sql=entry['normalized_sql'],
+                            count=entry['count'],
+                            total_ms=entry['total_ms'],
+                            max_ms=entry['max_ms'],
+                            **values,
+                        )
+            except (IntegrityError, DatabaseError):
+                logger.exception('Could not store slow query %s', key[:12])
+    finally:
+        _state.paused = False
@@ -1,3 +1,1173 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, OperationalError, close_old_connections, connection, connections, transaction
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import ValidationError
+
+from . import (
+    archive, daily_totals, directory, live_stats, reports, serializers, sqlite_tuning, timesheets, tokens, views
+)
+from .admission import export_limiter
+from .generations import GenerationCounter
+from .middleware import ProfilingMiddleware
+from .models import (
+    Employee, Project, EmployeeProject, EmployeeDailyTotal, ApiTokenProfile, ArchiveManifest, ArchivedProject,
+    ArchivedEmployeeProject, Generation, MonthClose, OutboxEvent, Tombstone
+)
+
+
+def create_employee(index=0, **fields):
+    return Employee.objects.create(
+        **{'first_name': f'Max{index}', 'last_name': 'Mustermann', 'phone_number': f'0151 {index:06d}',
+           'role': 'Maurer', **fields}
+    )
+
+
+class ExportAdmissionStressTest(TransactionTestCase):
+    """A burst of PDF exports is capped and shed while the list endpoint stays responsive."""
+    render_seconds = 0.3
+
+    def setUp(self):
+        self.employee = create_employee()
+        for day in range(1, 11):
+            project = Project.objects.create(name=f'Baustelle {day}', date=date(2025, 3, day))
+            EmployeeProject.objects.create(employee=self.employee, project=project, hours_worked=8)
+
+        self.lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.lock_dir.cleanup)
+        for name, value in {
+            'max_concurrent': 2, 'queue_size': 2, 'timeout': 2.0, 'lock_dir': self.lock_dir.name,
+            'waiting': 0, 'active': 0, 'admitted': 0, 'rejected_queue_full': 0, 'rejected_timeout': 0,
+            'total_wait': 0.0, 'max_wait': 0.0, 'total_run': 0.0,
+        }.items():
+            patcher = mock.patch.object(export_limiter, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.rendering = 0
+        self.peak_rendering = 0
+        self.lock = threading.Lock()
+        render = reports.render_monthly_report
+
+        def slow_render(*args, **kwargs):
+            with self.lock:
+                self.rendering += 1
+                self.peak_rendering = max(self.peak_rendering, self.rendering)
+            try:
+                time.sleep(self.render_seconds)
+                return render(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.rendering -= 1
+
+        patcher = mock.patch.object(reports, 'render_monthly_report', slow_render)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def list_latencies(self, samples=20):
+        client = Client()
+        timings = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            self.assertEqual(client.get('/api/employees/').status_code, 200)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def test_burst_is_capped_and_list_stays_responsive(self):
+        idle = statistics.median(self.list_latencies())
+
+        responses = []
+
+        def export():
+            responses.append(Client().get(f'/api/export-employee/{self.employee.id}/3/?year=2025'))
+
+        threads = [threading.Thread(target=export) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        burst = statistics.median(self.list_latencies())
+        for thread in threads:
+            thread.join()
+
+        # At most two render and two wait for a slot, the rest is shed at once. Which requests
+        # get in depends on thread scheduling, so only the counts are checked.
+        admitted = [response for response in responses if response.status_code == 200]
+        rejected = [response for response in responses if response.status_code != 200]
+        self.assertLessEqual(len(admitted), 4)
+        self.assertGreaterEqual(len(admitted), 1)
+        self.assertLessEqual(self.peak_rendering, 2)
+        for response in admitted:
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+        for response in rejected:
+            self.assertEqual(response.status_code, 429)
+            self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        stats = export_limiter.snapshot()
+        self.assertEqual(stats['admitted'], len(admitted))
+        self.assertEqual(stats['rejected_queue_full'] + stats['rejected_timeout'], len(rejected))
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['active'], 0)
+
+        # The list endpoint never waits behind the renders
+        self.assertLess(burst, max(idle * 5, idle + 50))
+
+    def test_stats_are_staff_only(self):
+        self.assertEqual(Client().get('/api/export-employee/stats/').status_code, 401)
+        client = Client()
+        client.force_login(User.objects.create_user('staff', password='secret', is_staff=True))
+        self.assertEqual(client.get('/api/export-employee/stats/').json()['max_concurrent'], 2)
+
+
+@mock.patch.object(reports, 'print_timestamp', lambda: 'März 3, 2025 um 10:00 Uhr')
+class MonthlyReportRenderingTest(SimpleTestCase):
+    """The canvas fast path draws the same text on the same pages as the Platypus renderer."""
+
+    def employee(self, hourly_rate=Decimal('20.00'), **fields):
+        return Employee(**{'first_name': 'Max', 'last_name': 'Mustermann', 'phone_number': '0151 000000',
+                           'role': 'Maurer', 'hourly_rate': hourly_rate, **fields})
+
+    def rows(self, count, name='Baustelle'):
+        return [(date(2025, 3, 1 + index % 28), f'{name} {index}', 7.5) for index in range(count)]
+
+    def render(self, renderer, employee, rows):
+        output = BytesIO()
+        renderer(employee, rows, 'März 2025', output)
+        return reports.pdf_text(output.getvalue())
+
+    def test_canvas_matches_platypus(self):
+        for hourly_rate in (Decimal('20.00'), None):
+            for count in (0, 1, 5, 10, 15):
+                with self.subTest(hourly_rate=hourly_rate, rows=count):
+                    employee, rows = self.employee(hourly_rate), self.rows(count)
+                    self.assertTrue(reports.canvas_layout_fits(employee, rows, 'März 2025'))
+                    canvas_text, canvas_pages = self.render(reports.render_monthly_canvas, employee, rows)
+                    platypus_text, platypus_pages = self.render(reports.render_monthly_platypus, employee, rows)
+                    self.assertEqual(canvas_pages, 1)
+                    self.assertEqual(canvas_pages, platypus_pages)
+                    self.assertEqual(canvas_text, platypus_text)
+
+    def test_report_content(self):
+        text, pages = self.render(reports.render_monthly_report, self.employee(), self.rows(4))
+        self.assertEqual(pages, 1)
+        for word in ('Max', 'Mustermann', 'GESAMTSTUNDEN', '30.00', '2025-03-04'):
+            self.assertIn(word, text)
+        self.assertEqual(text['7.50'], 4)
+
+    def test_renderer_choice(self):
+        cases = [
+            (self.employee(), self.rows(10), 'canvas'),
+            # Too many rows for one page
+            (self.employee(), self.rows(60), 'platypus'),
+            # Project names that wrap in their column
+            (self.employee(), self.rows(3, name='Sanierung der Tiefgarage am Hauptbahnhof Nord'), 'platypus'),
+            # Employee names that wrap in the header
+            (self.employee(last_name='Mustermann-Schmidt ' * 8), self.rows(3), 'platypus'),
+        ]
+        for employee, rows, expected in cases:
+            with self.subTest(expected=expected, rows=len(rows)):
+                self.assertEqual(reports.render_monthly_report(employee, rows, 'März 2025', BytesIO()), expected)
+
+    def test_platypus_paginates_long_reports(self):
+        text, pages = self.render(reports.render_monthly_report, self.employee(), self.rows(60))
+        self.assertGreater(pages, 1)
+        self.assertEqual(text['7.50'], 60)
+        self.assertIn('GESAMTSTUNDEN', text)
+
+
+class ImportTimeBudgetTest(SimpleTestCase):
+    """import_time fails when worker startup goes over the budget."""
+
+    def test_over_budget_fails(self):
+        with self.assertRaisesMessage(CommandError, 'over the'):
+            call_command('import_time', runs=1, budget_ms=1, stdout=StringIO())
+
+
+class LiveStatisticsPublishTest(TransactionTestCase):
+    """Writes publish their months once per committed transaction."""
+
+    def setUp(self):
+        patcher = mock.patch.object(live_stats, '_touch_markers')
+        self.touch_markers = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self):
+        return [call.args[0] for call in self.touch_markers.call_args_list]
+
+    def test_one_publish_per_transaction(self):
+        employee = create_employee()
+        self.touch_markers.reset_mock()
+        with transaction.atomic():
+            for day in (1, 2):
+                project = Project.objects.create(name=f'Baustelle {day}', date=date(2025, 3, day))
+                EmployeeProject.objects.create(employee=employee, project=project, hours_worked=8)
+            Project.objects.create(name='Baustelle 3', date=date(2025, 4, 1))
+            self.assertEqual(self.published(), [])
+        self.assertEqual(self.published(), [frozenset({'2025-03', '2025-04'})])
+
+    def test_nothing_published_on_rollback(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                Project.objects.create(name='Baustelle', date=date(2025, 5, 1))
+                raise ValueError
+        self.assertEqual(self.published(), [])
+        Project.objects.create(name='Baustelle', date=date(2025, 3, 1))
+        self.assertEqual(self.published(), [frozenset({'2025-03'})])
+
+    def test_string_dates(self):
+        employee = create_employee()
+        self.touch_markers.reset_mock()
+        project = Project.objects.create(name='Baustelle', date='2031-01-01')
+        EmployeeProject.objects.create(employee=employee, project=project, hours_worked=8)
+        project.date = '2031-02-03'
+        project.save()
+        self.assertEqual(self.published(), [frozenset({'2031-01'})] * 2 + [frozenset({'2031-01', '2031-02'})])
+        self.assertEqual(
+            list(EmployeeDailyTotal.objects.values_list('date', 'hours')), [(date(2031, 2, 3), 8.0)]
+        )
+
+
+class StatisticsStreamTest(TestCase):
+    """The statistics stream under WSGI sends one event and closes."""
+
+    def test_wsgi_sends_current_figures_and_closes(self):
+        create_employee()
+        response = Client().get('/api/statistics/stream/', {'month': 3, 'year': 2025})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        retry, event, data = response.content.decode().splitlines()[:3]
+        self.assertEqual(retry, 'retry: 15000')
+        self.assertEqual(event, 'event: statistics')
+        self.assertEqual(json.loads(data.removeprefix('data: '))['total_employees'], 1)
+
+    def test_invalid_month(self):
+        self.assertEqual(Client().get('/api/statistics/stream/', {'month': 13}).status_code, 400)
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=None, OUTBOX_ENDPOINT='http://127.0.0.1/events')
+class EmployeeProjectUpsertTest(TransactionTestCase):
+    """Concurrent submissions of the same assignments through the single-statement upsert."""
+    threads = 8
+    writes_per_thread = 20
+
+    def setUp(self):
+        self.employees = [create_employee(index) for index in range(2)]
+        self.projects = [Project.objects.create(name=f'Baustelle {index}', date=date(2025, 3, 3)) for index in range(2)]
+
+    def post(self, client, employee, project, hours):
+        return client.post(
+            '/api/employeeprojects/',
+            json.dumps({'employee': employee.id, 'project': project.id, 'hours_worked': hours}),
+            content_type='application/json',
+        )
+
+    def test_concurrent_submissions(self):
+        statuses, errors = [], []
+        barrier = threading.Barrier(self.threads)
+
+        def submit(index):
+            client = Client()
+            barrier.wait()
+            try:
+                for write in range(self.writes_per_thread):
+                    employee = self.employees[(index + write) % 2]
+                    project = self.projects[write % 2]
+                    statuses.append(self.post(client, employee, project, 1 + (index + write) % 4).status_code)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=submit, args=(index,)) for index in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        writes = self.threads * self.writes_per_thread
+        # One insert per pair, every other submission updates it
+        self.assertEqual(sorted(set(statuses)), [200, 201])
+        self.assertEqual(statuses.count(201), 4)
+        self.assertEqual(EmployeeProject.objects.count(), 4)
+        for assignment in EmployeeProject.objects.all():
+            self.assertLessEqual(assignment.created_at, assignment.updated_at)
+
+        events = OutboxEvent.objects.filter(model_name='employeeproject')
+        self.assertEqual(events.count(), writes)
+        self.assertEqual(events.filter(action='created').count(), 4)
+
+        for employee in self.employees:
+            hours = sum(EmployeeProject.objects.filter(employee=employee).values_list('hours_worked', flat=True))
+            total = EmployeeDailyTotal.objects.get(employee=employee, date=date(2025, 3, 3))
+            self.assertEqual((total.hours, total.entries), (hours, 2))
+
+    def test_created_at_is_kept(self):
+        client = Client()
+        self.assertEqual(self.post(client, self.employees[0], self.projects[0], 4).status_code, 201)
+        first = EmployeeProject.objects.get()
+        response = self.post(client, self.employees[0], self.projects[0], 6)
+        self.assertEqual(response.status_code, 200)
+        second = EmployeeProject.objects.get()
+        self.assertEqual((second.id, second.created_at, second.hours_worked), (first.id, first.created_at, 6))
+        self.assertGreater(second.updated_at, first.updated_at)
+
+    def test_fewer_queries_than_update_or_create(self):
+        def queries_per_write(project):
+            counts = []
+            for hours in (4, 6):
+                serializer = serializers.EmployeeProjectCreateSerializer(
+                    data={'employee': self.employees[0].id, 'project': project.id, 'hours_worked': hours}
+                )
+                serializer.is_valid(raise_exception=True)
+                with CaptureQueriesContext(connection) as queries:
+                    serializer.save()
+                counts.append(len(queries))
+            return counts
+
+        upsert = queries_per_write(self.projects[0])
+        # The update_or_create path other databases take
+        with mock.patch.object(serializers, 'connection', mock.Mock(vendor='other')):
+            update_or_create = queries_per_write(self.projects[1])
+        for upsert_count, update_or_create_count in zip(upsert, update_or_create):
+            self.assertLessEqual(upsert_count, update_or_create_count - 5)
+
+
+@override_settings(GENERATION_CHECK_INTERVAL=0)
+class GenerationCounterTest(TransactionTestCase):
+    def test_bump_is_seen_by_other_workers(self):
+        # Two counters of one name stand in for two worker processes
+        writer, reader = GenerationCounter('test'), GenerationCounter('test')
+        self.assertEqual(reader.read(), 0)
+        self.assertEqual(writer.bump(), 1)
+        self.assertEqual(writer.bump(), 2)
+        self.assertEqual(reader.read(), 2)
+        self.assertEqual(Generation.objects.get(name='test').value, 2)
+
+    def test_read_is_cached_for_the_check_interval(self):
+        writer, reader = GenerationCounter('test'), GenerationCounter('test')
+        with override_settings(GENERATION_CHECK_INTERVAL=60):
+            reader.read()
+            writer.bump()
+            self.assertEqual(reader.read(), 0)
+        self.assertEqual(reader.read(), 1)
+
+    def test_employee_save_bumps_directory_generation(self):
+        before = directory.generation.read()
+        create_employee()
+        self.assertEqual(directory.generation.read(), before + 1)
+
+
+@override_settings(GENERATION_CHECK_INTERVAL=0)
+class FacetCountTest(TransactionTestCase):
+    """Facet counts leave out their own filter and are recomputed after writes."""
+
+    def setUp(self):
+        cache.clear()
+        for index, role in enumerate(['Maurer', 'MAURER ', 'Helfer']):
+            employee = create_employee(index, role=role)
+            project = Project.objects.create(name=f'Baustelle {index}', date=date(2025, 3 + index // 2, 1))
+            EmployeeProject.objects.create(employee=employee, project=project, hours_worked=8)
+
+    def facets(self, path, **params):
+        response = Client().get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counts_ignore_their_own_filter(self):
+        data = self.facets('/api/employees/', role='helfer', facets='role,month')
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(
+            [(row['value'], row['count']) for row in data['facets']['role']], [('maurer', 2), ('helfer', 1)]
+        )
+        self.assertEqual(data['facets']['month'], [{'value': '2025-04', 'count': 1}])
+
+        data = self.facets('/api/projects/', facets='month,role')
+        self.assertEqual(
+            [(row['value'], row['count']) for row in data['facets']['month']], [('2025-03', 2), ('2025-04', 1)]
+        )
+        self.assertEqual(
+            [(row['value'], row['count']) for row in data['facets']['role']], [('maurer', 2), ('helfer', 1)]
+        )
+
+    def test_writes_invalidate_cached_counts(self):
+        self.assertEqual(self.facets('/api/employees/', facets='role')['facets']['role'][1]['count'], 1)
+        create_employee(9, role='helfer')
+        self.assertEqual(
+            [(row['value'], row['count']) for row in self.facets('/api/employees/', facets='role')['facets']['role']],
+            [('helfer', 2), ('maurer', 2)],
+        )
+
+    def test_unknown_facet(self):
+        response = Client().get('/api/employees/', {'facets': 'colour'})
+        self.assertEqual(response.status_code, 400)
+
+
+class MonthCloseTest(TestCase):
+    """Closed months are locked against writes and their snapshots are revalidated by clients."""
+
+    def setUp(self):
+        self.employee = create_employee()
+        self.project = Project.objects.create(name='Baustelle', date=date(2025, 3, 3))
+        self.assignment = EmployeeProject.objects.create(employee=self.employee, project=self.project, hours_worked=4)
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+
+    def test_closed_month_reads_are_revalidated(self):
+        MonthClose.objects.create(year=2025, month=3, statistics={'total_hours': 4})
+        response = self.client.get('/api/statistics/statistics/', {'month': 3, 'year': 2025})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'total_hours': 4})
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('max-age', response['Cache-Control'])
+
+        response = self.client.get(
+            '/api/statistics/statistics/', {'month': 3, 'year': 2025}, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_month_closed_after_validation_is_rejected_on_save(self):
+        serializer = serializers.EmployeeProjectCreateSerializer(
+            data={'employee': self.employee.id, 'project': self.project.id, 'hours_worked': 8}
+        )
+        serializer.is_valid(raise_exception=True)
+        MonthClose.objects.create(year=2025, month=3)
+        with self.assertRaisesMessage(ValidationError, 'Closed month(s) cannot be changed: 2025-03'):
+            serializer.save()
+        self.assertEqual(EmployeeProject.objects.get().hours_worked, 4)
+
+    def test_admin_bulk_update_skips_closed_months(self):
+        MonthClose.objects.create(year=2025, month=3)
+        response = self.client.post(
+            '/admin/core/employeeproject/',
+            {'action': 'add_one_hour', '_selected_action': [self.assignment.id]},
+            follow=True,
+        )
+        self.assertContains(response, 'Nothing was changed: 2025-03 closed')
+        self.assertEqual(EmployeeProject.objects.get().hours_worked, 4)
+
+
+class BearerTokenTest(TestCase):
+    """Token checks are served from the per-worker user cache until a user or token changes."""
+
+    def setUp(self):
+        # The generations roll back with each test, the cached user rows of earlier tests must not match them
+        tokens.clear_cache()
+        self.user = User.objects.create_user('staff', password='secret', is_staff=True)
+        response = Client().post('/api/auth/token/', {'username': 'staff', 'password': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.token = response.json()['token']
+        self.client = Client(headers={'Authorization': f'Bearer {self.token}'})
+
+    def assertAccepted(self, accepted=True):
+        self.assertEqual(self.client.get('/api/employees/').status_code, 200 if accepted else 401)
+
+    @override_settings(GENERATION_CHECK_INTERVAL=60)
+    def test_warm_check_runs_no_query(self):
+        tokens.verify(self.token)
+        with self.assertNumQueries(0):
+            user = tokens.verify(self.token)
+        self.assertEqual((user.pk, user.is_active, user.is_staff), (self.user.pk, True, True))
+
+    def test_revoke_endpoint(self):
+        self.assertAccepted()
+        self.assertEqual(self.client.post('/api/auth/token/revoke/').status_code, 204)
+        self.assertAccepted(False)
+        self.assertEqual(ApiTokenProfile.objects.get(user=self.user).token_generation, 1)
+
+    def test_revoke_all(self):
+        self.assertAccepted()
+        call_command('revoke_tokens', all=True, stdout=StringIO())
+        self.assertAccepted(False)
+
+    @override_settings(GENERATION_CHECK_INTERVAL=60)
+    def test_inactive_user(self):
+        self.assertAccepted()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertAccepted(False)
+
+    @override_settings(GENERATION_CHECK_INTERVAL=60)
+    def test_deleted_user(self):
+        self.assertAccepted()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertAccepted(False)
+
+
+@override_settings(OUTBOX_ENDPOINT='http://127.0.0.1/events')
+class OutboxDispatchTest(TransactionTestCase):
+    """dispatch_events posts signed, ordered batches to a local stub receiver."""
+
+    def setUp(self):
+        self.received = []
+        self.statuses = []
+        test = self
+
+        class Receiver(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                test.received.append((self.headers.get('X-WorkTrack-Signature'), body))
+                self.send_response(test.statuses.pop(0) if test.statuses else 200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Receiver)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.endpoint = f'http://127.0.0.1:{server.server_port}/events'
+
+        employee = create_employee()
+        project = Project.objects.create(name='Baustelle', date=date(2025, 3, 3))
+        EmployeeProject.objects.create(employee=employee, project=project, hours_worked=8)
+        project.delete()
+        self.event_ids = list(OutboxEvent.objects.values_list('id', flat=True))
+
+    def dispatch(self):
+        call_command('dispatch_events', once=True, endpoint=self.endpoint, batch_size=2, stdout=StringIO())
+
+    @override_settings(OUTBOX_SECRET='s3cret')
+    def test_signed_batches_in_order(self):
+        self.dispatch()
+        self.assertEqual(len(self.received), 3)
+        delivered = []
+        for signature, body in self.received:
+            expected = hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+            self.assertEqual(signature, f'sha256={expected}')
+            events = json.loads(body)['events']
+            self.assertLessEqual(len(events), 2)
+            delivered += [event['id'] for event in events]
+        self.assertEqual(delivered, self.event_ids)
+        self.assertEqual(
+            [event['action'] for event in json.loads(self.received[-1][1])['events']][-1], 'deleted'
+        )
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_rejected_batch_is_kept_and_retried(self):
+        self.statuses = [200, 503]
+        with self.assertRaisesMessage(CommandError, '503'):
+            self.dispatch()
+        # The first batch was accepted and deleted, the second is sent again
+        self.assertEqual(list(OutboxEvent.objects.values_list('id', flat=True)), self.event_ids[2:])
+        self.dispatch()
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertEqual(self.received[1][1], self.received[2][1])
+
+    @override_settings(OUTBOX_ENDPOINT='')
+    def test_nothing_is_recorded_without_endpoint(self):
+        employee = create_employee(1)
+        employee.delete()
+        self.assertEqual(list(OutboxEvent.objects.values_list('id', flat=True)), self.event_ids)
+
+
+@override_settings(DAILY_HOURS_LIMIT=10)
+class DailyLimitAdminTest(TestCase):
+    """Admin forms and bulk actions keep employees within the daily limit."""
+
+    def setUp(self):
+        self.employee = create_employee()
+        self.monday = Project.objects.create(name='Baustelle 1', date=date(2025, 3, 3))
+        self.tuesday = Project.objects.create(name='Baustelle 2', date=date(2025, 3, 4))
+        self.first = EmployeeProject.objects.create(employee=self.employee, project=self.monday, hours_worked=6)
+        self.second = EmployeeProject.objects.create(employee=self.employee, project=self.tuesday, hours_worked=6)
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+
+    def change_assignment(self, hours):
+        return self.client.post(
+            f'/admin/core/employeeproject/{self.first.id}/change/',
+            {'employee': self.employee.id, 'project': self.monday.id, 'hours_worked': hours},
+            follow=True,
+        )
+
+    def assertUnchanged(self):
+        self.assertEqual(
+            sorted(EmployeeProject.objects.values_list('project__date', 'hours_worked')),
+            [(date(2025, 3, 3), 6.0), (date(2025, 3, 4), 6.0)],
+        )
+        self.assertEqual(
+            sorted(EmployeeDailyTotal.objects.values_list('date', 'hours')),
+            [(date(2025, 3, 3), 6.0), (date(2025, 3, 4), 6.0)],
+        )
+
+    def test_change_form(self):
+        self.assertContains(self.change_assignment(12), 'would have 12h on 2025-03-03')
+        self.assertUnchanged()
+        self.change_assignment(10)
+        self.assertEqual(EmployeeProject.objects.get(pk=self.first.pk).hours_worked, 10)
+
+    def test_limit_checked_again_when_saving(self):
+        # A concurrent write the form did not see yet
+        with mock.patch.object(daily_totals, 'current', lambda pairs: dict.fromkeys(pairs, 0.0)):
+            response = self.change_assignment(12)
+        self.assertContains(response, 'Nothing was changed: employee')
+        self.assertUnchanged()
+
+    def test_project_date_change(self):
+        response = self.client.post(
+            f'/admin/core/project/{self.tuesday.id}/change/',
+            {'name': 'Baustelle 2', 'description': '', 'date': '2025-03-03'},
+            follow=True,
+        )
+        self.assertContains(response, 'would have 12h on 2025-03-03')
+        self.assertUnchanged()
+
+    def test_bulk_action(self):
+        EmployeeProject.objects.filter(pk=self.first.pk).update(hours_worked=9.5)
+        EmployeeDailyTotal.objects.filter(date=date(2025, 3, 3)).update(hours=9.5)
+        response = self.client.post(
+            '/admin/core/employeeproject/',
+            {'action': 'add_one_hour', '_selected_action': [self.first.id, self.second.id]},
+            follow=True,
+        )
+        self.assertContains(response, 'Nothing was changed: employee')
+        self.assertEqual(
+            sorted(EmployeeProject.objects.values_list('hours_worked', flat=True)), [6.0, 9.5]
+        )
+
+
+class TimesheetImportTest(TestCase):
+    """A dry run reports what the import would do."""
+
+    def setUp(self):
+        self.employee = create_employee()
+        Project.objects.create(name='Baustelle 1', date=date(2025, 3, 3))
+        rows = [
+            f'{self.employee.phone_number},Baustelle {site},2025-03-0{day},2' for day in (3, 4) for site in (1, 2, 3)
+        ]
+        self.lines = ['employee,project,date,hours', *rows, *rows]
+
+    def run_import(self, dry_run):
+        return timesheets.TimesheetImport(batch_size=4, dry_run=dry_run).run(self.lines)
+
+    @mock.patch.object(timesheets, 'PROJECT_CACHE_SIZE', 3)
+    def test_dry_run_report_matches_import(self):
+        dry_run = self.run_import(dry_run=True)
+        self.assertEqual(Project.objects.count(), 1)
+        self.assertFalse(EmployeeProject.objects.exists())
+        report = self.run_import(dry_run=False)
+        self.assertEqual({**dry_run, 'dry_run': False}, report)
+        self.assertEqual((report['imported'], report['created_projects'], report['error_count']), (12, 5, 0))
+        self.assertEqual(EmployeeProject.objects.count(), 6)
+
+
+class SyncFeedTest(TestCase):
+    """Delta sync tokens, tombstones of deleted and archived rows, and their pruning."""
+
+    def setUp(self):
+        self.employee = create_employee()
+        self.project = Project.objects.create(name='Baustelle', date=date(2025, 3, 3))
+        self.assignment = EmployeeProject.objects.create(employee=self.employee, project=self.project, hours_worked=8)
+
+    def sync(self, since=None):
+        response = Client().get('/api/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_token_is_taken_back_by_the_safety_window(self):
+        before = timezone.now()
+        data = self.sync()
+        after = timezone.now()
+        self.assertTrue(data['full'])
+        token_time = views.SyncViewSet.decode_token(data['token'])
+        window = timedelta(seconds=settings.SYNC_SAFETY_WINDOW)
+        self.assertTrue(before - window <= token_time <= after - window)
+
+    def test_rows_committed_late_are_delivered(self):
+        token = self.sync()['token']
+        # Saved before the sync above, but committed only after it
+        late = create_employee(1)
+        Employee.objects.filter(pk=late.pk).update(updated_at=timezone.now() - timedelta(seconds=60))
+        data = self.sync(token)
+        self.assertFalse(data['full'])
+        self.assertIn(late.id, [employee['id'] for employee in data['employees']])
+
+    def test_deletes_and_archives_are_reported(self):
+        token = self.sync()['token']
+        other = Project.objects.create(name='Baustelle 2', date=date(2025, 4, 1))
+        crew = EmployeeProject.objects.create(employee=self.employee, project=other, hours_worked=4)
+        deleted_ids = other.id, crew.id
+        other.delete()
+        archive.archive_month(2025, 3)
+        deleted = self.sync(token)['deleted']
+        self.assertEqual(sorted(deleted['projects']), [self.project.id, deleted_ids[0]])
+        self.assertEqual(sorted(deleted['employee_projects']), [self.assignment.id, deleted_ids[1]])
+        self.assertEqual(deleted['employees'], [])
+
+    def test_token_older_than_the_retention_gets_a_full_download(self):
+        old = timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+        data = self.sync(views.SyncViewSet.encode_token(old))
+        self.assertTrue(data['full'])
+        self.assertEqual([project['id'] for project in data['projects']], [self.project.id])
+
+    def test_prune_tombstones(self):
+        self.project.delete()
+        Tombstone.objects.update(
+            deleted_at=timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+        )
+        recent = Tombstone.objects.create(model_name='employee', object_id=99)
+        call_command('prune_tombstones', batch_size=1, stdout=StringIO())
+        self.assertEqual(list(Tombstone.objects.all()), [recent])
+
+
+class ArchiveRoundTripTest(TestCase):
+    """Archiving a month moves it to cold storage and restoring brings it back unchanged."""
+
+    def setUp(self):
+        self.employees = [create_employee(index) for index in range(2)]
+        for day in (3, 4):
+            project = Project.objects.create(name=f'Baustelle {day}', date=date(2025, 3, day), description='Dach')
+            for employee in self.employees:
+                EmployeeProject.objects.create(employee=employee, project=project, hours_worked=day)
+        project = Project.objects.create(name='Baustelle April', date=date(2025, 4, 1))
+        EmployeeProject.objects.create(employee=self.employees[0], project=project, hours_worked=8)
+
+    def snapshot(self):
+        return (
+            sorted(Project.objects.values_list('id', 'name', 'description', 'date', 'created_at')),
+            sorted(EmployeeProject.objects.values_list(
+                'id', 'employee_id', 'project_id', 'hours_worked', 'created_at'
+            )),
+            sorted(EmployeeDailyTotal.objects.values_list('employee_id', 'date', 'hours', 'entries')),
+        )
+
+    @override_settings(OUTBOX_ENDPOINT='http://127.0.0.1/events')
+    def test_archive_and_restore(self):
+        before = self.snapshot()
+        manifest = archive.archive_month(2025, 3)
+        self.assertEqual(
+            (manifest.project_count, manifest.assignment_count, manifest.employee_count, manifest.total_hours),
+            (2, 4, 2, 14.0),
+        )
+        self.assertEqual(list(Project.objects.values_list('date', flat=True)), [date(2025, 4, 1)])
+        self.assertEqual(ArchivedEmployeeProject.objects.count(), 4)
+
+        self.assertEqual(archive.restore_month(2025, 3), 2)
+        self.assertEqual(self.snapshot(), before)
+        self.assertFalse(ArchiveManifest.objects.exists())
+        self.assertFalse(ArchivedProject.objects.exists())
+        self.assertEqual(
+            sorted(OutboxEvent.objects.filter(action__in=['archived', 'restored']).values_list('action', flat=True)),
+            ['archived'] * 6 + ['restored'] * 6,
+        )
+
+    def test_rearchiving_counts_each_employee_once(self):
+        archive.archive_month(2025, 3)
+        project = Project.objects.create(name='Nachtrag', date=date(2025, 3, 10))
+        EmployeeProject.objects.create(employee=self.employees[0], project=project, hours_worked=2)
+        manifest = archive.archive_month(2025, 3)
+        self.assertEqual((manifest.assignment_count, manifest.employee_count), (5, 2))
+
+    def test_employee_with_archived_hours_cannot_be_deleted(self):
+        archive.archive_month(2025, 3)
+        client = Client()
+        client.force_login(User.objects.create_superuser('admin', password='secret'))
+        response = client.delete(f'/api/employees/{self.employees[1].id}/')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Employee.objects.filter(pk=self.employees[1].pk).exists())
+        self.assertEqual(ArchivedEmployeeProject.objects.filter(employee=self.employees[1]).count(), 2)
+
+
+class HoursAnalyticsTest(TestCase):
+    """Grouped hours, with caching only for ranges of closed months."""
+
+    def setUp(self):
+        cache.clear()
+        for index, role in enumerate(['Maurer', ' maurer', 'Helfer']):
+            employee = create_employee(index, role=role)
+            project = Project.objects.create(name=f'Baustelle {index}', date=date(2025, 3, 3 + index))
+            EmployeeProject.objects.create(employee=employee, project=project, hours_worked=8)
+        self.params = {'group_by': 'role', 'date_from': '2025-03-01', 'date_to': '2025-03-31'}
+
+    def hours(self, **headers):
+        return Client().get('/api/analytics/hours/', self.params, **headers)
+
+    def test_roles_are_grouped_by_role_key(self):
+        results = self.hours().json()['results']
+        self.assertEqual(
+            [(row['role'], row['total_hours'], row['headcount']) for row in results],
+            [('helfer', 8.0, 1), ('maurer', 16.0, 2)],
+        )
+
+    def test_open_months_are_not_cached(self):
+        self.assertNotIn('ETag', self.hours())
+        EmployeeProject.objects.update(hours_worked=4)
+        self.assertEqual(self.hours().json()['results'][0]['total_hours'], 4.0)
+
+    def test_closed_months_are_cached_and_revalidated(self):
+        MonthClose.objects.create(year=2025, month=3)
+        response = self.hours()
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(self.hours(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        # Reopened and changed: the cached result is not used any more
+        MonthClose.objects.all().delete()
+        EmployeeProject.objects.update(hours_worked=4)
+        response = self.hours()
+        self.assertNotIn('ETag', response)
+        self.assertEqual(response.json()['results'][0]['total_hours'], 4.0)
+
+    def test_range_with_an_open_month_is_not_cached(self):
+        MonthClose.objects.create(year=2025, month=3)
+        self.params['date_to'] = '2025-04-30'
+        self.assertNotIn('ETag', self.hours())
+
+
+class RankingsTest(TestCase):
+    """Leaderboards of a month against the previous month."""
+
+    def setUp(self):
+        hours = [('Maurer', 8), (' maurer', 8), ('Helfer', 16), ('Kranführer', 4)]
+        for index, (role, worked) in enumerate(hours):
+            employee = create_employee(index, role=role)
+            project = Project.objects.create(name=f'Baustelle {index}', date=date(2025, 3, 3))
+            EmployeeProject.objects.create(employee=employee, project=project, hours_worked=worked)
+
+    def rankings(self, **params):
+        return Client().get('/api/rankings/', {'month': 3, 'year': 2025, **params}).json()['results']
+
+    def test_ties_share_a_rank(self):
+        results = self.rankings(by='employee')
+        self.assertEqual([row['rank'] for row in results], [1, 2, 2, 4])
+        self.assertEqual([row['value'] for row in results], [16.0, 8.0, 8.0, 4.0])
+        self.assertEqual(results[0]['share'], 0.4444)
+
+    def test_limit(self):
+        self.assertEqual(len(self.rankings(by='employee', limit=2)), 2)
+        response = Client().get('/api/rankings/', {'by': 'employee', 'limit': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_roles_are_grouped_by_role_key(self):
+        results = self.rankings(by='role')
+        self.assertEqual(
+            [(row['role'], row['rank'], row['value']) for row in results],
+            [('helfer', 1, 16.0), ('maurer', 1, 16.0), ('kranführer', 3, 4.0)],
+        )
+
+
+class EmployeeDirectoryTest(TransactionTestCase):
+    """Autocomplete from the in-memory directory; writes and exports do not trust a stale copy."""
+
+    def setUp(self):
+        directory.directory.clear()
+        self.employees = [
+            create_employee(0, first_name='Anna', last_name='Becker', phone_number='+49 151 2345'),
+            create_employee(1, first_name='Andreas', last_name='Zimmer', phone_number='+49 160 9876'),
+            create_employee(2, first_name='Jonas', last_name='Anders', phone_number='0171 5555'),
+        ]
+        self.project = Project.objects.create(name='Baustelle', date=date(2025, 3, 3))
+
+    def autocomplete(self, query, **params):
+        response = Client().get('/api/employees/autocomplete/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['full_name'] for row in response.json()['results']]
+
+    def test_prefix_of_any_name_in_model_order(self):
+        self.assertEqual(self.autocomplete('an'), ['Jonas Anders', 'Anna Becker', 'Andreas Zimmer'])
+        self.assertEqual(self.autocomplete('AN', limit=1), ['Jonas Anders'])
+        self.assertEqual(self.autocomplete('anna be'), ['Anna Becker'])
+        self.assertEqual(self.autocomplete('zimmer andreas'), ['Andreas Zimmer'])
+        self.assertEqual(self.autocomplete('x'), [])
+
+    def test_phone_number_digits(self):
+        self.assertEqual(self.autocomplete('+49 16'), ['Andreas Zimmer'])
+        self.assertEqual(self.autocomplete('0171-55'), ['Jonas Anders'])
+
+    def test_saves_and_deletes_refresh_the_directory(self):
+        self.assertEqual(self.autocomplete('jo'), ['Jonas Anders'])
+        create_employee(3, first_name='Johanna', last_name='Yilmaz')
+        self.employees[2].delete()
+        self.assertEqual(self.autocomplete('jo'), ['Johanna Yilmaz'])
+
+    def test_employee_unknown_to_the_directory_is_read_from_the_database(self):
+        directory.directory.snapshot()
+        # bulk_create sends no signals, like an employee another worker created moments ago
+        employee, = Employee.objects.bulk_create([Employee(first_name='Neu', last_name='Lehmann', phone_number='1')])
+        self.assertIsNone(directory.directory.get(employee.id))
+
+        response = Client().post(
+            '/api/employeeprojects/', {'employee': employee.id, 'project': self.project.id, 'hours_worked': 8}
+        )
+        self.assertEqual(response.status_code, 201)
+        response = Client().get(f'/api/export-employee/{employee.id}/3/', {'year': 2025})
+        self.assertEqual(response.status_code, 200)
+
+    def test_write_for_employee_deleted_meanwhile_is_rejected(self):
+        employee = self.employees[0]
+        directory.directory.snapshot()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {Employee._meta.db_table} WHERE id = %s', [employee.id])
+        self.assertIsNotNone(directory.directory.get(employee.id))
+
+        response = Client().post(
+            '/api/employeeprojects/', {'employee': employee.id, 'project': self.project.id, 'hours_worked': 8}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), ['An employee or project no longer exists.'])
+        self.assertFalse(EmployeeProject.objects.exists())
+
+
+class ProjectCrewTest(TestCase):
+    """Projects saved together with their crew."""
+
+    def test_crew_employees_are_checked_against_the_database(self):
+        directory.directory.snapshot()
+        employee = create_employee()
+        payload = {'name': 'Baustelle', 'date': '2025-03-03', 'assignments': [
+            {'employee': employee.id, 'hours_worked': 8}, {'employee': employee.id + 1, 'hours_worked': 8},
+        ]}
+        response = Client().post('/api/projects/with-crew/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['assignments'], [f'Unknown employee id(s): {employee.id + 1}'])
+
+        payload['assignments'].pop()
+        response = Client().post('/api/projects/with-crew/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(EmployeeProject.objects.get().employee, employee)
+
+
+@override_settings(PROFILE_SAMPLE_RATE=0)
+class ProfilingTriggerTest(SimpleTestCase):
+    """Only staff requests asking for a profile are profiled, and only they load the user."""
+
+    def trigger(self, user, path='/api/employees/', **headers):
+        request = RequestFactory().get(path, **headers)
+        request.user = SimpleLazyObject(user)
+        return ProfilingMiddleware(lambda request: None)._trigger(request)
+
+    def test_user_is_not_loaded_without_the_flag(self):
+        def load_user():
+            raise AssertionError('user loaded')
+        self.assertIsNone(self.trigger(load_user))
+
+    def test_staff_with_param_or_header(self):
+        staff, other = (lambda: User(is_staff=True)), (lambda: User(is_staff=False))
+        self.assertEqual(self.trigger(staff, '/api/employees/?_profile=1'), 'staff')
+        self.assertEqual(self.trigger(staff, HTTP_X_PROFILE='1'), 'staff')
+        self.assertIsNone(self.trigger(other, '/api/employees/?_profile=1'))
+
+
+class StatisticsRangeTest(TestCase):
+    """Per-month statistics of a range of months, archived months included."""
+
+    def setUp(self):
+        employees = [create_employee(index) for index in range(3)]
+        for day, crew, hours in [
+            (date(2024, 12, 30), employees, 8), (date(2025, 1, 2), employees[:2], 6.5),
+            (date(2025, 1, 3), employees[:1], 4), (date(2025, 3, 3), employees[1:], 7),
+        ]:
+            project = Project.objects.create(name=f'Baustelle {day}', date=day)
+            for employee in crew:
+                EmployeeProject.objects.create(employee=employee, project=project, hours_worked=hours)
+
+    def statistics(self, **params):
+        response = Client().get('/api/statistics/statistics/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_totals_per_month_across_the_year_boundary(self):
+        data = self.statistics(**{'from': '2024-12', 'to': '2025-03'})
+        self.assertEqual(data['total_employees'], 3)
+        self.assertEqual(
+            [(row['year'], row['month'], row['total_projects'], row['active_employees'], row['total_hours'])
+             for row in data['months']],
+            [(2024, 12, 1, 3, 24.0), (2025, 1, 2, 2, 17.0), (2025, 2, 0, 0, 0.0), (2025, 3, 1, 2, 14.0)],
+        )
+        # The same figures as asking for each month on its own
+        for row in data['months']:
+            single = self.statistics(month=row['month'], year=row['year'])
+            self.assertEqual(
+                (single['total_projects'], single['total_hours']), (row['total_projects'], row['total_hours'])
+            )
+
+    def test_archived_months_come_from_their_manifests(self):
+        archive.archive_month(2025, 1)
+        january = self.statistics(**{'from': '2025-01', 'to': '2025-01'})['months'][0]
+        self.assertEqual((january['total_projects'], january['active_employees'], january['total_hours']), (2, 2, 17.0))
+
+    def test_query_count_does_not_grow_with_the_range(self):
+        with CaptureQueriesContext(connection) as short:
+            self.statistics(**{'from': '2025-01', 'to': '2025-01'})
+        with CaptureQueriesContext(connection) as long:
+            self.statistics(**{'from': '2023-01', 'to': '2025-12'})
+        self.assertEqual(len(long), len(short))
+
+    def test_invalid_ranges(self):
+        for params in [{'from': '2025-13', 'to': '2025-12'}, {'from': '2025-03', 'to': '2025-01'},
+                       {'from': '1990-01', 'to': '2025-12'}]:
+            self.assertEqual(Client().get('/api/statistics/statistics/', params).status_code, 400)
+
+
+class RangeReportExportTest(TestCase):
+    """The multi-month PDF export streams a spooled file, archived months merged in by date."""
+
+    def setUp(self):
+        self.employee = create_employee()
+        for day, name in [
+            (date(2025, 1, 7), 'Dachstuhl'), (date(2025, 2, 4), 'Kellerwand'), (date(2025, 3, 3), 'Garage'),
+        ]:
+            project = Project.objects.create(name=name, date=day)
+            EmployeeProject.objects.create(employee=self.employee, project=project, hours_worked=8)
+
+    def export(self, **params):
+        return Client().get(f'/api/export-employee/{self.employee.id}/range/', params)
+
+    def test_streamed_pdf_attachment(self):
+        archive.archive_month(2025, 2)
+        response = self.export(**{'from': '2025-01', 'to': '2025-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="employee_{self.employee.id}_report_2025_01_to_2025_03.pdf"',
+        )
+        data = b''.join(response.streaming_content)
+        self.assertTrue(data.startswith(b'%PDF'))
+        words, _ = reports.pdf_text(data)
+        for word in ('Dachstuhl', 'Kellerwand', 'Garage', '24.00'):
+            self.assertIn(word, words)
+
+    def test_invalid_range(self):
+        self.assertEqual(self.export(**{'from': '2025-03', 'to': '2025-01'}).status_code, 400)
+        self.assertEqual(self.export(**{'from': '2025-1'}).status_code, 400)
+        response = Client().get('/api/export-employee/999999/range/', {'from': '2025-01', 'to': '2025-03'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ProjectCloneTest(TestCase):
+    """Cloning a day copies its projects and crews, within the daily limit and outside closed months."""
+
+    def setUp(self):
+        self.employees = [create_employee(index) for index in range(2)]
+        self.sources = []
+        for index, hours in enumerate((6, 4)):
+            project = Project.objects.create(name=f'Baustelle {index}', description='Dach', date=date(2025, 3, 3))
+            for employee in self.employees[:index + 1]:
+                EmployeeProject.objects.create(employee=employee, project=project, hours_worked=hours)
+            self.sources.append(project)
+
+    def clone(self, **data):
+        return Client().post(
+            '/api/projects/clone/', {'source_date': '2025-03-03', **data}, content_type='application/json'
+        )
+
+    def test_copies_projects_and_crews(self):
+        response = self.clone(target_dates=['2025-03-04', '2025-03-05'], copy_hours=True)
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['created_projects'], data['created_assignments']), (4, 6))
+        self.assertEqual(
+            sorted((row['source_id'], row['date']) for row in data['projects']),
+            [(source.id, day) for source in self.sources for day in ('2025-03-04', '2025-03-05')],
+        )
+        copy = Project.objects.get(date=date(2025, 3, 5), name='Baustelle 1')
+        self.assertEqual(copy.description, 'Dach')
+        self.assertEqual(
+            sorted(copy.employee_projects.values_list('employee_id', 'hours_worked')),
+            [(self.employees[0].id, 4.0), (self.employees[1].id, 4.0)],
+        )
+        self.assertEqual(
+            EmployeeDailyTotal.objects.get(employee=self.employees[0], date=date(2025, 3, 4)).hours, 10.0
+        )
+
+    def test_hours_start_at_zero_without_copy_hours(self):
+        response = self.clone(target_dates=['2025-03-04'], project_ids=[self.sources[0].id])
+        self.assertEqual(response.json()['created_assignments'], 1)
+        self.assertEqual(EmployeeProject.objects.get(project__date=date(2025, 3, 4)).hours_worked, 0.0)
+
+    @override_settings(DAILY_HOURS_LIMIT=12)
+    def test_daily_limit(self):
+        other = Project.objects.create(name='Nachbar', date=date(2025, 3, 4))
+        EmployeeProject.objects.create(employee=self.employees[0], project=other, hours_worked=4)
+        response = self.clone(target_dates=['2025-03-04'], copy_hours=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Project.objects.filter(date=date(2025, 3, 4)).count(), 1)
+
+    def test_closed_target_month(self):
+        MonthClose.objects.create(year=2025, month=4)
+        response = self.clone(target_dates=['2025-03-04', '2025-04-01'])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('target_dates', response.json())
+        self.assertFalse(Project.objects.exclude(date=date(2025, 3, 3)).exists())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite profile')
+class SQLiteProfileTest(TestCase):
+    """The tuned profile sets its pragmas on every new connection, the default profile leaves them alone."""
+
+    def new_connection(self):
+        new = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.addCleanup(new.close)
+        return new
+
+    @override_settings(SQLITE_PROFILE='tuned')
+    def test_tuned_pragmas(self):
+        self.assertEqual(sqlite_tuning.current_pragmas(self.new_connection()), {
+            'journal_mode': 'wal',
+            'busy_timeout': settings.SQLITE_PRAGMAS['busy_timeout'],
+            'synchronous': 1,
+            'mmap_size': 128 * 1024 * 1024,
+            'cache_size': -20000,
+            'temp_store': 2,
+        })
+
+    @override_settings(SQLITE_PROFILE='default')
+    def test_default_profile_keeps_sqlite_defaults(self):
+        pragmas = sqlite_tuning.current_pragmas(self.new_connection())
+        # journal_mode=WAL is stored in the database file, the others are per connection
+        self.assertEqual((pragmas['synchronous'], pragmas['cache_size'], pragmas['temp_store']), (2, -2000, 0))
+
+
+class HealthCheckTest(TestCase):
+    """The probes answer before any other middleware runs."""
+
+    def test_healthz(self):
+        with self.assertNumQueries(0):
+            response = Client().get('/healthz', HTTP_HOST='unknown.example')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        # Skipped: ALLOWED_HOSTS, sessions and the response middleware
+        self.assertNotIn('X-Frame-Options', response)
+        self.assertNotIn('Vary', response)
+        self.assertEqual(Client().get('/api/employees/', HTTP_HOST='unknown.example').status_code, 400)
+
+    def test_readyz(self):
+        with self.assertNumQueries(1):
+            response = Client().get('/readyz', HTTP_HOST='unknown.example')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ready')
+        self.assertNotIn('X-Frame-Options', response)
+
+    @override_settings(READYZ_MAX_DB_LATENCY_MS=-1)
+    def test_readyz_slow_database(self):
+        response = Client().get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'degraded')
+
+    def test_readyz_database_down(self):
+        with mock.patch('core.middleware.connection.cursor', side_effect=OperationalError('unable to open')):
+            response = Client().get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'unavailable', 'database': 'unable to open'})
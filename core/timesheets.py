@@ -0,0 +1,276 @@
+"""
+Bulk import of timesheets from CSV.
+
+Rows are parsed one at a time and written in bounded batches, so memory use
+depends on the batch size and the number of employees, not on the file size.
+Employees are resolved through an in-memory phone number / id map loaded once,
+missing projects (by name and date) are created per batch, and assignments are
+upserted with a single INSERT ... ON CONFLICT per batch.
+
+Expected columns: employee (phone number or id), project (name), date (YYYY-MM-DD), hours.
+"""
+import csv
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+
+from . import daily_totals, facets, live_stats, month_close, outbox
+from .models import Employee, Project, EmployeeProject, ArchiveManifest, MonthClose
+
+REQUIRED_COLUMNS = ('employee', 'project', 'date', 'hours')
+# Known (name, date) -> project id entries kept between batches
+PROJECT_CACHE_SIZE = 50000
+
+
+class TimesheetImport:
+    """
+    One import run. Feed it CSV lines with run(); counters and the first
+    max_errors row errors are available in report() afterwards.
+    """
+
+    def __init__(self, batch_size=1000, dry_run=False, max_errors=100, progress=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.progress = progress
+
+        self.rows = 0
+        self.imported = 0
+        self.created_projects = 0
+        self.error_count = 0
+        self.errors = []
+
+        self._projects = {}
+        # (name, date) keys of the projects a dry run would create
+        self._pending_projects = set()
+        self._employees_by_phone = {}
+        self._employee_ids = set()
+        for employee_id, phone_number in Employee.objects.values_list('id', 'phone_number').iterator():
+            self._employees_by_phone[phone_number] = employee_id
+            self._employee_ids.add(employee_id)
+        self._archived_months = set(ArchiveManifest.objects.values_list('year', 'month'))
+        self._closed_months = set(MonthClose.objects.values_list('year', 'month'))
+
+    def _error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'error': message})
+
+    def _resolve_employee(self, value):
+        if value in self._employees_by_phone:
+            return self._employees_by_phone[value]
+        if value.isdigit() and int(value) in self._employee_ids:
+            return int(value)
+        return None
+
+    def _parse(self, line, row):
+        """Validate one CSV row and return (employee_id, project_name, date, hours), or None."""
+        values = {column: (row.get(column) or '').strip() for column in REQUIRED_COLUMNS}
+        missing = [column for column, value in values.items() if not value]
+        if missing:
+            self._error(line, f"Missing value for {', '.join(missing)}")
+            return None
+
+        employee_id = self._resolve_employee(values['employee'])
+        if employee_id is None:
+            self._error(line, f"Unknown employee '{values['employee']}'")
+            return None
+        try:
+            workday = date.fromisoformat(values['date'])
+        except ValueError:
+            self._error(line, f"Invalid date '{values['date']}', expected YYYY-MM-DD")
+            return None
+        if (workday.year, workday.month) in self._archived_months:
+            self._error(line, f'{workday:%Y-%m} is archived, restore it before importing')
+            return None
+        if (workday.year, workday.month) in self._closed_months:
+            self._error(line, f'{workday:%Y-%m} is closed, reopen it before importing')
+            return None
+        try:
+            hours = float(values['hours'].replace(',', '.'))
+        except ValueError:
+            self._error(line, f"Invalid hours '{values['hours']}'")
+            return None
+        if not 0 <= hours <= 24:
+            self._error(line, f'Hours must be between 0 and 24, got {hours:g}')
+            return None
+        if len(values['project']) > Project._meta.get_field('name').max_length:
+            self._error(line, 'Project name is too long')
+            return None
+        return employee_id, values['project'], workday, hours
+
+    def _drop_closed(self, batch):
+        """
+        The rows of a batch whose month is still open, checked again under the month lock
+        for months closed since the import started.
+        """
+        closed = set(month_close.closed_months({workday for _, _, _, workday, _ in batch}, lock=True))
+        if not closed:
+            return batch
+        kept = []
+        for row in batch:
+            line, _, _, workday, _ = row
+            if f'{workday:%Y-%m}' in closed:
+                self._closed_months.add((workday.year, workday.month))
+                self._error(line, f'{workday:%Y-%m} is closed, reopen it before importing')
+            else:
+                kept.append(row)
+        return kept
+
+    def _resolve_projects(self, keys):
+        """Map (name, date) keys of existing projects to their ids."""
+        missing = {key for key in keys if key not in self._projects and key not in self._pending_projects}
+        if not missing:
+            return
+        if len(self._projects) + len(missing) > PROJECT_CACHE_SIZE:
+            self._projects.clear()
+            missing = set(keys)
+
+        existing = Project.objects.filter(
+            name__in={name for name, _ in missing},
+            date__in={workday for _, workday in missing},
+        ).order_by('-id').values_list('name', 'date', 'id')
+        # Ordered by descending id, so the oldest project wins when a name is used twice on a day
+        for name, workday, project_id in existing:
+            if (name, workday) in missing:
+                self._projects[(name, workday)] = project_id
+
+    def _create_projects(self, keys):
+        """Create the projects of (name, date) keys that do not exist yet."""
+        new_keys = sorted(key for key in keys if key not in self._projects and key not in self._pending_projects)
+        if not new_keys:
+            return
+        self.created_projects += len(new_keys)
+        if self.dry_run:
+            self._pending_projects.update(new_keys)
+            return
+        projects = Project.objects.bulk_create([Project(name=name, date=workday) for name, workday in new_keys])
+        outbox.record_many(projects, outbox.CREATED)
+        for key, project in zip(new_keys, projects):
+            self._projects[key] = project.id
+
+    def _over_daily_limit(self, hours_by_assignment, previous):
+        """
+        {(employee_id, date): hours} of the employees and days the batch would take over DAILY_HOURS_LIMIT.
+        Locks the daily totals of the batch, a dry run only reads them.
+        """
+        pairs = {(employee_id, workday) for employee_id, _, workday in hours_by_assignment}
+        totals = daily_totals.current(pairs) if self.dry_run else daily_totals.lock(pairs)
+        for (employee_id, name, workday), hours in hours_by_assignment.items():
+            project_id = self._projects.get((name, workday))
+            totals[(employee_id, workday)] += hours - previous.get((employee_id, project_id), 0.0)
+        return dict(daily_totals.over_limit(totals))
+
+    def _write(self, accepted, previous, skipped):
+        """Upsert the accepted assignments of a batch and change the daily totals locked for it."""
+        # Totals locked for skipped days are dropped again if they were created empty
+        changes = [(employee_id, workday, 0.0, 0) for employee_id, workday in skipped]
+        if accepted:
+            assignments = EmployeeProject.objects.bulk_create(
+                [
+                    EmployeeProject(employee_id=employee_id, project_id=project_id, hours_worked=hours)
+                    for (employee_id, project_id, _), hours in accepted.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['employee', 'project'],
+                update_fields=['hours_worked', 'updated_at'],
+            )
+            # bulk_create sends no save signals
+            changes += [
+                (
+                    employee_id, workday, hours - previous.get((employee_id, project_id), 0.0),
+                    int((employee_id, project_id) not in previous),
+                )
+                for (employee_id, project_id, workday), hours in accepted.items()
+            ]
+            for action, was_existing in ((outbox.CREATED, False), (outbox.UPDATED, True)):
+                outbox.record_many([
+                    assignment for assignment in assignments
+                    if ((assignment.employee_id, assignment.project_id) in previous) == was_existing
+                ], action)
+            live_stats.changed({live_stats.month_key(workday) for _, _, workday in accepted})
+            facets.invalidate()
+        daily_totals.apply(changes)
+
+    def _flush(self, batch):
+        """
+        Upsert one batch of parsed rows. Later rows win over earlier ones for the same assignment.
+        The rows of an employee and day that would go over the daily limit are skipped as errors.
+        """
+        if not batch:
+            return
+        with transaction.atomic():
+            if not self.dry_run:
+                batch = self._drop_closed(batch)
+            self._resolve_projects({(name, workday) for _, _, name, workday, _ in batch})
+            hours_by_assignment = {}
+            for _, employee_id, name, workday, hours in batch:
+                hours_by_assignment[(employee_id, name, workday)] = hours
+
+            # Hours of the assignments that already exist
+            previous = {}
+            project_ids = {self._projects.get((name, workday)) for _, name, workday in hours_by_assignment} - {None}
+            if project_ids:
+                rows = EmployeeProject.objects.filter(
+                    employee_id__in={employee_id for employee_id, _, _ in hours_by_assignment},
+                    project_id__in=project_ids,
+                ).values_list('employee_id', 'project_id', 'hours_worked')
+                previous = {(employee_id, project_id): hours for employee_id, project_id, hours in rows}
+            over = self._over_daily_limit(hours_by_assignment, previous)
+            for line, employee_id, _, workday, _ in batch:
+                if (employee_id, workday) in over:
+                    self._error(line, (
+                        f'Employee would have {over[(employee_id, workday)]:g} hours on {workday}, '
+                        f'more than the daily limit of {settings.DAILY_HOURS_LIMIT:g}'
+                    ))
+            # Projects are only created for the rows that are imported
+            self._create_projects({
+                (name, workday) for employee_id, name, workday in hours_by_assignment
+                if (employee_id, workday) not in over
+            })
+            # A dry run keys the projects it would create by (name, date)
+            accepted = {
+                (employee_id, self._projects.get((name, workday), (name, workday)), workday): hours
+                for (employee_id, name, workday), hours in hours_by_assignment.items()
+                if (employee_id, workday) not in over
+            }
+
+            if not self.dry_run:
+                self._write(accepted, previous, over)
+        self.imported += sum(1 for _, employee_id, _, workday, _ in batch if (employee_id, workday) not in over)
+        if self.progress is not None:
+            self.progress(self)
+
+    def run(self, lines):
+        """Import CSV text lines (an open text file or any iterable of lines)."""
+        reader = csv.DictReader(lines)
+        columns = {(name or '').strip().lower() for name in reader.fieldnames or []}
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise ValueError(f"CSV header is missing column(s): {', '.join(missing)}")
+        reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames]
+
+        batch = []
+        for row in reader:
+            self.rows += 1
+            # Line numbers count the header as line 1
+            parsed = self._parse(reader.line_num, row)
+            if parsed is None:
+                continue
+            batch.append((reader.line_num, *parsed))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+        return self.report()
+
+    def report(self):
+        return {
+            'dry_run': self.dry_run,
+            'rows': self.rows,
+            'imported': self.imported,
+            'created_projects': self.created_projects,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
@@ -0,0 +1,156 @@
+"""
+Stateless bearer tokens for the API.
+
+A token is a Django-signed (HMAC) payload with the user id and name and the
+revocation generations it was issued under, time-stamped so it expires after
+API_TOKEN_MAX_AGE seconds. Checking it needs the user's active and staff flags,
+the user's generation (ApiTokenProfile) and the generation of all tokens (the
+"api-tokens" Generation row). Each worker caches the user rows it read until
+the "api-token-users" generation changes, which every revocation, change and
+delete of a user bumps, so a warm check runs no query and a revocation or
+deactivation applies on every worker and host within GENERATION_CHECK_INTERVAL.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .generations import GenerationCounter
+from .models import ApiTokenProfile
+
+SALT = 'core.tokens'
+KEYWORD = 'Bearer'
+
+all_tokens = GenerationCounter('api-tokens')
+users = GenerationCounter('api-token-users')
+
+# (all-tokens generation, users generation) the cached states were read under, and the states by user id
+_states_lock = threading.Lock()
+_states_generations = None
+_states = {}
+
+
+class TokenUser:
+    """The user a valid token was issued to, built from the token and the flags read with it."""
+    is_authenticated = True
+    is_anonymous = False
+    is_superuser = False
+
+    def __init__(self, user_id, username, is_active, is_staff):
+        self.id = self.pk = user_id
+        self.username = username
+        self.is_active = is_active
+        self.is_staff = is_staff
+
+    def get_username(self):
+        return self.username
+
+    def __str__(self):
+        return self.username
+
+
+def clear_cache():
+    """Forget the cached user rows of this worker."""
+    with _states_lock:
+        _states.clear()
+
+
+def bump_users_generation():
+    """Increment the users generation so every worker re-reads the user rows it cached."""
+    new_generation = users.bump()
+    clear_cache()
+    return new_generation
+
+
+def _user_state(user_id):
+    """(is_active, is_staff, (all-tokens generation, user generation)) of a user, or None if it does not exist."""
+    global _states_generations
+    generations = (all_tokens.read(), users.read())
+    with _states_lock:
+        if _states_generations != generations:
+            _states.clear()
+            _states_generations = generations
+        elif user_id in _states:
+            return _states[user_id]
+    row = get_user_model().objects.filter(pk=user_id).values_list(
+        'is_active', 'is_staff', 'api_token_profile__token_generation'
+    ).first()
+    if row is None:
+        return None
+    is_active, is_staff, user_generation = row
+    state = is_active, is_staff, (generations[0], user_generation or 0)
+    with _states_lock:
+        if _states_generations == generations:
+            _states[user_id] = state
+    return state
+
+
+def revoke(user_id=None):
+    """Revoke the tokens of one user, or of everyone when user_id is None."""
+    if user_id is None:
+        all_tokens.bump()
+        clear_cache()
+        return
+    _bump_user_generation(user_id)
+    bump_users_generation()
+
+
+def _bump_user_generation(user_id):
+    with transaction.atomic():
+        if ApiTokenProfile.objects.filter(user_id=user_id).update(token_generation=F('token_generation') + 1):
+            return
+        try:
+            with transaction.atomic():
+                ApiTokenProfile.objects.create(user_id=user_id, token_generation=1)
+        except IntegrityError:
+            # Created by another worker meanwhile
+            ApiTokenProfile.objects.filter(user_id=user_id).update(token_generation=F('token_generation') + 1)
+
+
+def issue(user):
+    """A new token for a user and the unix time it expires at."""
+    _, _, generations = _user_state(user.pk)
+    payload = {'u': user.pk, 'n': user.get_username(), 'g': generations}
+    token = signing.dumps(payload, salt=SALT, compress=True)
+    return token, int(time.time()) + settings.API_TOKEN_MAX_AGE
+
+
+def verify(token):
+    """The TokenUser of a valid token, or None if it is forged, expired, revoked or its user is inactive."""
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=settings.API_TOKEN_MAX_AGE)
+        user_id, username = payload['u'], payload['n']
+        generations = tuple(payload['g'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+    state = _user_state(user_id)
+    if state is None:
+        return None
+    is_active, is_staff, current = state
+    if not is_active or generations != current:
+        return None
+    return TokenUser(user_id, username, is_active, is_staff)
+
+
+def from_request(request):
+    """The raw bearer token of a request, or None."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme != KEYWORD or not token.strip():
+        return None
+    return token.strip()
+
+
+def request_user(request):
+    """The TokenUser of a request's bearer token, or None. Verified once per request."""
+    if not hasattr(request, '_token_user'):
+        request._token_user = verify(from_request(request))
+    return request._token_user
+
+
+def is_token_request(request):
+    """Whether a request is an API call carrying a bearer token, and so needs no session."""
+    return request.path_info.startswith('/api/') and from_request(request) is not None
@@ -8,10 +8,25 @@ router.register(r'employees', views.EmployeeViewSet, basename='employee')
 router.register(r'projects', views.ProjectViewSet, basename='project')
 router.register(r'employeeprojects', views.EmployeeProjectViewSet, basename='employeeproject')
 router.register(r'statistics', views.StatisticsViewSet, basename='statistics')
+router.register(r'month-closes', views.MonthCloseViewSet, basename='month-close')
+router.register(r'sync', views.SyncViewSet, basename='sync')
+router.register(r'analytics', views.AnalyticsViewSet, basename='analytics')
+router.register(r'rankings', views.RankingsViewSet, basename='rankings')
+router.register(r'overtime', views.OvertimeViewSet, basename='overtime')
+router.register(r'profiles', views.ProfileViewSet, basename='profile')
 
 urlpatterns = [
+    # Bearer tokens: POST /api/auth/token/ with username and password
+    path('auth/token/', views.obtain_token, name='obtain-token'),
+    path('auth/token/revoke/', views.revoke_tokens, name='revoke-tokens'),
+    # Live statistics as server-sent events: /api/statistics/stream/?month=1&year=2025
+    path('statistics/stream/', views.statistics_stream, name='statistics-stream'),
     # Include all router URLs
     path('', include(router.urls)),
     # PDF export endpoint: /api/export-employee/<id>/<month>/?year=2025
     path('export-employee/<int:employee_id>/<int:month>/', views.export_employee_pdf, name='export-employee-pdf'),
+    # Range PDF export endpoint: /api/export-employee/<id>/range/?from=2025-01&to=2025-12
+    path('export-employee/<int:employee_id>/range/', views.export_employee_range_pdf, name='export-employee-range-pdf'),
+    # Admission counters of the PDF export limiter: /api/export-employee/stats/
+    path('export-employee/stats/', views.export_admission_stats, name='export-admission-stats'),
 ]
@@ -1,32 +1,85 @@
 import os
 from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-from django.db.models import Q, Sum, Count
-from django.http import HttpResponse
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from django.db import IntegrityError, transaction
+from django.db.models import ProtectedError, Q, Sum, Count, Max, F, Func, Window, FloatField, IntegerField
+from django.db.models.functions import Coalesce, Rank, TruncWeek, TruncMonth, TruncYear
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, FileResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.csrf import csrf_exempt
-from datetime import datetime
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import KeepInFrame
+from datetime import datetime, timedelta, timezone as dt_timezone
+import heapq
+import io
+import tempfile
 from io import BytesIO
 import os
 from django.conf import settings
+from django.contrib.auth import authenticate
+from asgiref.sync import sync_to_async
 
-from .models import Employee, Project, EmployeeProject
+from . import facets, live_stats, month_close, tokens
+from .admission import admission_controlled, export_limiter
+from .archive import parse_month
+from .authentication import BearerTokenAuthentication
+from .directory import directory
+from .models import (
+    Employee, Project, EmployeeProject, EmployeeDailyTotal, Tombstone,
+    ArchiveManifest, ArchivedEmployeeProject, MonthClose, ClosedMonthReport
+)
 from .serializers import (
     EmployeeSerializer, EmployeeListSerializer,
     ProjectSerializer, ProjectListSerializer,
-    EmployeeProjectCreateSerializer, EmployeeProjectSerializer
+    EmployeeProjectCreateSerializer, EmployeeProjectSerializer,
+    EmployeeSyncSerializer, ProjectSyncSerializer, EmployeeProjectSyncSerializer,
+    ProjectCrewSerializer, ProjectCloneSerializer, validate_months_open
 )
+from .timesheets import TimesheetImport
+
+
+def save_assignments(serializer):
+    """
+    Save a serializer that writes hours. The in-memory employee directory may still list an employee
+    another worker deleted; the foreign key then fails on commit, which is answered with a 400.
+    """
+    try:
+        return serializer.save()
+    except IntegrityError:
+        raise ValidationError('An employee or project no longer exists.')
+
+
+class FacetListMixin:
+    """
+    List action with optional facet counts: ?facets=a,b adds a "facets" object next to the page.
+    Viewsets set facet_kind and implement filtered_queryset(ignore=None), which leaves out the
+    filter of the facet named by ignore.
+    """
+    facet_kind = None
+
+    def get_queryset(self):
+        return self.filtered_queryset()
+
+    def list(self, request, *args, **kwargs):
+        try:
+            names = facets.requested(request.query_params.get('facets'), self.facet_kind)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = super().list(request, *args, **kwargs)
+        if names:
+            params = {key: value for key, value in request.query_params.items() if key not in ('page', 'facets')}
+            response.data['facets'] = facets.counts(
+                self.facet_kind, names, lambda name: self.filtered_queryset(ignore=name), params
+            )
+        return response
 
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(FacetListMixin, viewsets.ModelViewSet):
     """
     ViewSet for Employee CRUD operations.
     Returns full details with nested projects in detail view,
@@ -34,22 +87,25 @@ class EmployeeViewSet(viewsets.ModelViewSet):
     """
     queryset = Employee.objects.all()
     permission_classes = [AllowAny]
+    facet_kind = 'employee'
 
     def get_serializer_class(self):
         if self.action == 'list':
             return EmployeeListSerializer
         return EmployeeSerializer
 
-    def get_queryset(self):
+    def filtered_queryset(self, ignore=None):
         """
         Filter employees by role, phone number, or name if provided.
+        The role matches case-insensitively on the indexed role_key column.
+        ignore names a facet whose own filter is left out.
         """
         queryset = Employee.objects.all()
         role = self.request.query_params.get('role', None)
         search = self.request.query_params.get('search', None)
 
-        if role:
-            queryset = queryset.filter(role__icontains=role)
+        if role and ignore != 'role':
+            queryset = queryset.filter(role_key=facets.role_key(role))
 
         if search:
             queryset = queryset.filter(
@@ -60,8 +116,47 @@ class EmployeeViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Employees whose first name, last name, full name or phone number starts with the query.
+        Served from the in-memory employee directory, without a database query.
+        Endpoint: /api/employees/autocomplete/?q=jo&limit=10
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [
+            {
+                'id': employee['id'],
+                'first_name': employee['first_name'],
+                'last_name': employee['last_name'],
+                'full_name': f"{employee['first_name']} {employee['last_name']}",
+                'phone_number': employee['phone_number'],
+                'role': employee['role'],
+            }
+            for employee in directory.search(query, limit)
+        ]
+        return Response({'query': query, 'results': results})
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Deleting an employee also deletes their hours
+        validate_months_open(
+            *EmployeeProject.objects.filter(employee=instance).dates('project__date', 'month'), lock=True
+        )
+        try:
+            instance.delete()
+        except ProtectedError:
+            raise ValidationError(
+                'The employee has hours in archived months. Restore them first to delete the employee.'
+            )
 
-class ProjectViewSet(viewsets.ModelViewSet):
+
+class ProjectViewSet(FacetListMixin, viewsets.ModelViewSet):
     """
     ViewSet for Project CRUD operations.
     Supports filtering by month and year.
@@ -69,15 +164,17 @@ class ProjectViewSet(viewsets.ModelViewSet):
     """
     queryset = Project.objects.all()
     permission_classes = [AllowAny]
+    facet_kind = 'project'
 
     def get_serializer_class(self):
         if self.action == 'list':
             return ProjectListSerializer
         return ProjectSerializer
 
-    def get_queryset(self):
+    def filtered_queryset(self, ignore=None):
         """
         Filter projects by month, year, or specific date if provided.
+        ignore names a facet whose own filter is left out (the month facet ignores month and date).
         Example: /api/projects/?month=11&year=2025
         Example: /api/projects/?date=2025-11-02
         """
@@ -87,6 +184,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
         date = self.request.query_params.get('date', None)
         search = self.request.query_params.get('search', None)
 
+        if ignore == 'month':
+            month = date = None
+
         # If specific date is provided, filter by that exact date
         if date:
             try:
@@ -112,6 +212,48 @@ class ProjectViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    @action(detail=False, methods=['post'], url_path='with-crew')
+    def create_with_crew(self, request):
+        """
+        Create a project together with all its employee assignments in one request.
+        Endpoint: POST /api/projects/with-crew/
+        """
+        serializer = ProjectCrewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        save_assignments(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def clone(self, request):
+        """
+        Copy all projects of a day, or a subset, with their crews to other days.
+        Endpoint: POST /api/projects/clone/
+        Body: source_date, target_dates, project_ids (optional), copy_hours (optional, default false)
+        """
+        serializer = ProjectCloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['put', 'patch'], url_path='with-crew')
+    def update_with_crew(self, request, pk=None):
+        """
+        Update a project and replace its employee assignments in one request.
+        Endpoint: PUT/PATCH /api/projects/<id>/with-crew/
+        Employees missing from the assignments list are removed from the project.
+        """
+        serializer = ProjectCrewSerializer(
+            self.get_object(), data=request.data, partial=request.method == 'PATCH'
+        )
+        serializer.is_valid(raise_exception=True)
+        save_assignments(serializer)
+        return Response(serializer.data)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        validate_months_open(instance.date, lock=True)
+        instance.delete()
+
 
 class EmployeeProjectViewSet(viewsets.ModelViewSet):
     """
@@ -123,6 +265,23 @@ class EmployeeProjectViewSet(viewsets.ModelViewSet):
     serializer_class = EmployeeProjectCreateSerializer
     permission_classes = [AllowAny]
 
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser])
+    def import_csv(self, request):
+        """
+        Import timesheet rows from an uploaded CSV file (columns: employee, project, date, hours).
+        Endpoint: POST /api/employeeprojects/import/ (multipart, field "file"), ?dry_run=1 to only validate
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the CSV file in the "file" field'}, status=status.HTTP_400_BAD_REQUEST)
+
+        run = TimesheetImport(dry_run=request.query_params.get('dry_run') in ('1', 'true'))
+        try:
+            report = run.run(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+        except (ValueError, UnicodeDecodeError) as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_200_OK if run.dry_run else status.HTTP_201_CREATED)
+
     def get_queryset(self):
         """
         Filter employee projects by employee, project, or date range.
@@ -147,6 +306,24 @@ class EmployeeProjectViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def create(self, request, *args, **kwargs):
+        """
+        Add hours for an employee on a project, or replace them if the pair already exists.
+        Responds with 201 for a new assignment and 200 for an updated one.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        save_assignments(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK)
+
+    def perform_update(self, serializer):
+        save_assignments(serializer)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        validate_months_open(instance.project.date, lock=True)
+        instance.delete()
+
     def list(self, request, *args, **kwargs):
         """
         Override list to use a serializer that includes related data.
@@ -162,6 +339,23 @@ class EmployeeProjectViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
+def revalidated_response(request, response, etag):
+    """Let browsers keep a response but revalidate it on every use: 304 Not Modified while the ETag matches."""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def closed_month_response(request, response, closed_at):
+    """
+    Tag a response served from a month-close snapshot with an ETag that changes when the month
+    is reopened and closed again. Revalidated on every use, since a reopen makes the same URL
+    serve live data.
+    """
+    return revalidated_response(request, response, f'"month-close-{int(closed_at.timestamp() * 1_000_000)}"')
+
+
+@admission_controlled(export_limiter)
 def export_employee_pdf(request, employee_id, month):
     """
     Generate a PDF report for an employee's work in a specific month/year.
@@ -169,9 +363,8 @@ def export_employee_pdf(request, employee_id, month):
     Query parameter: year (optional, defaults to current year)
     Note: The month parameter should be the month number (1-12).
     """
-    try:
-        employee = Employee.objects.get(id=employee_id)
-    except Employee.DoesNotExist:
+    employee = directory.lookup(employee_id)
+    if employee is None:
         return HttpResponse('Employee not found', status=404)
 
     # Get year from query parameter or use current year
@@ -182,6 +375,18 @@ def export_employee_pdf(request, employee_id, month):
     except ValueError:
         return HttpResponse('Invalid month or year parameter', status=400)
 
+    filename = f"employee_{employee_id}_report_{year}_{month:02d}.pdf"
+
+    # Closed months are served from the report rendered when the month was closed
+    snapshot = ClosedMonthReport.objects.filter(
+        close__year=year, close__month=month, employee_id=employee.id
+    ).values_list('pdf', 'close__closed_at').first()
+    if snapshot is not None:
+        pdf_content, closed_at = snapshot
+        response = HttpResponse(bytes(pdf_content), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return closed_month_response(request, response, closed_at)
+
     # Get all employee projects for the specified month/year
     employee_projects = EmployeeProject.objects.filter(
         employee=employee,
@@ -189,221 +394,24 @@ def export_employee_pdf(request, employee_id, month):
         project__date__month=month
     ).select_related('project').order_by('project__date')
 
-    # Calculate total hours
-    total_hours = sum(ep.hours_worked for ep in employee_projects)
+    # Archived months are read from the cold-storage tables
+    if ArchiveManifest.objects.filter(year=year, month=month).exists():
+        archived_projects = ArchivedEmployeeProject.objects.filter(
+            employee=employee,
+            project__date__year=year,
+            project__date__month=month
+        ).select_related('project')
+        employee_projects = sorted([*employee_projects, *archived_projects], key=lambda ep: ep.project.date)
 
-    # Check if employee has hourly rate
-    has_hourly_rate = employee.hourly_rate is not None and employee.hourly_rate > 0
+    rows = [(ep.project.date, ep.project.name, ep.hours_worked) for ep in employee_projects]
 
-    # Calculate total earnings if hourly rate exists
-    total_earnings = 0
-    if has_hourly_rate:
-        total_earnings = total_hours * float(employee.hourly_rate)
+    # ReportLab is only loaded by the workers that actually render a PDF
+    from . import reports
 
     # Create PDF in memory
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=colors.HexColor('#1a1a1a'),
-        spaceAfter=10,
-        alignment=1,  # Center alignment
-    )
-    org_style = ParagraphStyle(
-        'OrgStyle',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#1800ad'),
-        spaceAfter=5,
-        alignment=1,  # Center alignment
-    )
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#2c3e50'),
-        spaceAfter=12,
-    )
-    normal_style = styles['Normal']
-    date_style = ParagraphStyle(
-        'DateStyle',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.HexColor('#666666'),
-        alignment=2,  # Right alignment
-    )
-    bold_style = ParagraphStyle(
-        'BoldStyle',
-        parent=styles['Normal'],
-        fontName='Helvetica-Bold',
-    )
-
-    # Add header with logo and organization name
-    # Try to load logo if it exists in static files
-    logo_path = None
-    try:
-        # Check if logo exists in static files
-        static_logo_path = os.path.join(settings.BASE_DIR, 'static', 'logo_transp.png')
-        if os.path.exists(static_logo_path):
-            logo_path = static_logo_path
-    except:
-        pass
-
-    # Create header table with logo and organization name
-    if logo_path:
-        try:
-            logo = Image(logo_path, width=2*inch, height=0.8*inch)
-            logo.hAlign = 'CENTER'
-            elements.append(logo)
-            elements.append(Spacer(1, 0.1 * inch))
-        except:
-            pass
-
-    # Organization name
-    elements.append(Paragraph("ZeenAlZein", org_style))
-    elements.append(Spacer(1, 0.1 * inch))
-
-    # Add title
-    title = Paragraph(f"Mitarbeiter Arbeitsbericht", title_style)
-    elements.append(title)
-
-    # Add print date/time (in German format)
-    month_names_german = {
-        1: 'Januar', 2: 'Februar', 3: 'März', 4: 'April',
-        5: 'Mai', 6: 'Juni', 7: 'Juli', 8: 'August',
-        9: 'September', 10: 'Oktober', 11: 'November', 12: 'Dezember'
-    }
-    now = datetime.now()
-    month_name_print = month_names_german.get(now.month, f"Monat {now.month}")
-    day = now.day
-    year_print = now.year
-    hour = now.hour
-    minute = now.minute
-    # Format time in 24-hour format
-    time_str = f"{hour:02d}:{minute:02d} Uhr"
-    print_datetime = f"{month_name_print} {day}, {year_print} um {time_str}"
-    elements.append(Paragraph(f"<i>Gedruckt: {print_datetime}</i>", date_style))
-    elements.append(Spacer(1, 0.2 * inch))
-
-    # Add employee information
-    elements.append(Paragraph(f"<b>Mitarbeiter:</b> {employee.first_name} {employee.last_name}", normal_style))
-    elements.append(Paragraph(f"<b>Telefonnummer:</b> {employee.phone_number}", normal_style))
-    elements.append(Paragraph(f"<b>Rolle:</b> {employee.role}", normal_style))
-    if employee.hourly_rate:
-        elements.append(Paragraph(f"<b>Stundensatz:</b> €{employee.hourly_rate:.2f}", normal_style))
-
-    # Month/Year info
-    month_names = {
-        1: 'Januar', 2: 'Februar', 3: 'März', 4: 'April',
-        5: 'Mai', 6: 'Juni', 7: 'Juli', 8: 'August',
-        9: 'September', 10: 'Oktober', 11: 'November', 12: 'Dezember'
-    }
-    month_name = month_names.get(int(month), f"Monat {month}")
-    elements.append(Paragraph(f"<b>Zeitraum:</b> {month_name} {year}", normal_style))
-    elements.append(Spacer(1, 0.3 * inch))
-
-    # Add projects table
-    if employee_projects:
-        elements.append(Paragraph(f"<b>Bearbeitete Projekte</b>", heading_style))
-
-        # Prepare table headers - conditionally include earnings column
-        if has_hourly_rate:
-            table_data = [
-                [Paragraph('<b>Datum</b>', normal_style),
-                 Paragraph('<b>Projektname</b>', normal_style),
-                 Paragraph('<b>Gearbeitete Stunden</b>', normal_style),
-                 Paragraph('<b>Betrag</b>', normal_style)]
-            ]
-        else:
-            table_data = [
-                [Paragraph('<b>Datum</b>', normal_style),
-                 Paragraph('<b>Projektname</b>', normal_style),
-                 Paragraph('<b>Gearbeitete Stunden</b>', normal_style)]
-            ]
-
-        # Add project rows
-        for ep in employee_projects:
-            if has_hourly_rate:
-                earnings = ep.hours_worked * float(employee.hourly_rate)
-                table_data.append([
-                    ep.project.date.strftime('%Y-%m-%d'),
-                    ep.project.name,
-                    f"{ep.hours_worked:.2f}",
-                    f"€{earnings:.2f}"
-                ])
-            else:
-                table_data.append([
-                    ep.project.date.strftime('%Y-%m-%d'),
-                    ep.project.name,
-                    f"{ep.hours_worked:.2f}"
-                ])
-
-        # Add total row - conditionally include earnings
-        if has_hourly_rate:
-            total_row = [
-                '',
-                Paragraph('<b>GESAMTSTUNDEN</b>', bold_style),
-                Paragraph(f'<b>{total_hours:.2f}</b>', bold_style),
-                Paragraph(f'<b>€{total_earnings:.2f}</b>', bold_style)
-            ]
-        else:
-            total_row = [
-                '',
-                Paragraph('<b>GESAMTSTUNDEN</b>', bold_style),
-                Paragraph(f'<b>{total_hours:.2f}</b>', bold_style)
-            ]
-        table_data.append(total_row)
-
-        # Define column widths based on whether earnings column exists
-        if has_hourly_rate:
-            col_widths = [1.5 * inch, 2.8 * inch, 1.2 * inch, 1.5 * inch]
-            # Right align hours and amount columns
-            align_rules = [
-                ('ALIGN', (2, 0), (2, -1), 'RIGHT'),  # Hours column
-                ('ALIGN', (3, 0), (3, -1), 'RIGHT'),  # Amount column
-            ]
-        else:
-            col_widths = [1.5 * inch, 3.5 * inch, 1.5 * inch]
-            # Right align hours column
-            align_rules = [
-                ('ALIGN', (2, 0), (2, -1), 'RIGHT'),  # Hours column
-            ]
-
-        # Create table
-        table = Table(table_data, colWidths=col_widths)
-        table_style = [
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            *align_rules,  # Add conditional alignment rules
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('TOPPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.lightgrey]),
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#ecf0f1')),
-            ('TEXTCOLOR', (0, -1), (-1, -1), colors.black),
-            ('FONTSIZE', (0, -1), (-1, -1), 11),
-            ('TOPPADDING', (0, -1), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, -1), (-1, -1), 8),
-        ]
-        table.setStyle(TableStyle(table_style))
-
-        elements.append(table)
-    else:
-        elements.append(Paragraph(f"Für {month_name} {year} wurden keine Projekte gefunden", normal_style))
-
-    # Build PDF
-    doc.build(elements)
+    month_name = reports.MONTH_NAMES_GERMAN.get(int(month), f"Monat {month}")
+    reports.render_monthly_report(employee, rows, f"{month_name} {year}", buffer)
 
     # Get PDF content
     pdf_content = buffer.getvalue()
@@ -411,53 +419,761 @@ def export_employee_pdf(request, employee_id, month):
 
     # Create response
     response = HttpResponse(pdf_content, content_type='application/pdf')
-    filename = f"employee_{employee_id}_report_{year}_{month:02d}.pdf"
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
 
     return response
 
 
+# Reports larger than this are spooled to disk instead of memory
+REPORT_SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+
+@admission_controlled(export_limiter)
+def export_employee_range_pdf(request, employee_id):
+    """
+    Generate a PDF report for an employee's work over a range of months.
+    Endpoint: /api/export-employee/<id>/range/?from=YYYY-MM&to=YYYY-MM
+    Rows are grouped per month with subtotals; the PDF is written to a
+    spooled temporary file and streamed from there.
+    """
+    employee = directory.lookup(employee_id)
+    if employee is None:
+        return HttpResponse('Employee not found', status=404)
+
+    try:
+        start = parse_month(request.GET.get('from', ''))
+        end = parse_month(request.GET.get('to', ''))
+    except ValueError:
+        return HttpResponse('from and to must be in the format YYYY-MM', status=400)
+    if start > end:
+        return HttpResponse('from must not be after to', status=400)
+
+    date_from = datetime(start[0], start[1], 1).date()
+    date_to = datetime(end[0] + end[1] // 12, end[1] % 12 + 1, 1).date()
+
+    rows = EmployeeProject.objects.filter(
+        employee=employee,
+        project__date__gte=date_from,
+        project__date__lt=date_to
+    ).order_by('project__date').values_list('project__date', 'project__name', 'hours_worked').iterator(chunk_size=2000)
+
+    # Merge in archived months, both sources are already ordered by date
+    archived = ArchiveManifest.objects.filter(
+        Q(year__gt=start[0]) | Q(year=start[0], month__gte=start[1]),
+        Q(year__lt=end[0]) | Q(year=end[0], month__lte=end[1]),
+    )
+    if archived.exists():
+        archived_rows = ArchivedEmployeeProject.objects.filter(
+            employee=employee,
+            project__date__gte=date_from,
+            project__date__lt=date_to
+        ).order_by('project__date').values_list('project__date', 'project__name', 'hours_worked').iterator(chunk_size=2000)
+        rows = heapq.merge(rows, archived_rows, key=lambda row: row[0])
+
+    # ReportLab is only loaded by the workers that actually render a PDF
+    from . import reports
+
+    month_names = reports.MONTH_NAMES_GERMAN
+    period_label = f"{month_names[start[1]]} {start[0]} - {month_names[end[1]]} {end[0]}"
+    output = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_MAX_SIZE)
+    reports.render_range_report(employee, rows, period_label, output)
+    output.seek(0)
+
+    filename = f"employee_{employee_id}_report_{start[0]}_{start[1]:02d}_to_{end[0]}_{end[1]:02d}.pdf"
+    return FileResponse(output, as_attachment=True, filename=filename, content_type='application/pdf')
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_admission_stats(request):
+    """
+    Report the PDF export admission counters of the worker serving this request.
+    Endpoint: /api/export-employee/stats/
+    """
+    return Response(export_limiter.snapshot())
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def obtain_token(request):
+    """
+    Exchange a username and password for a signed bearer token.
+    Endpoint: POST /api/auth/token/
+    Body: username, password
+    """
+    user = authenticate(request, username=request.data.get('username'), password=request.data.get('password'))
+    if user is None or not user.is_active:
+        return Response({'error': 'Invalid username or password'}, status=status.HTTP_400_BAD_REQUEST)
+    token, expires_at = tokens.issue(user)
+    return Response({
+        'token': token,
+        'token_type': tokens.KEYWORD,
+        'expires_at': datetime.fromtimestamp(expires_at, tz=dt_timezone.utc),
+    })
+
+
+@api_view(['POST'])
+@authentication_classes([BearerTokenAuthentication])
+@permission_classes([IsAuthenticated])
+def revoke_tokens(request):
+    """
+    Revoke every token of the calling user, including the one used for this request.
+    Endpoint: POST /api/auth/token/revoke/
+    """
+    tokens.revoke(request.user.pk)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class StatisticsViewSet(viewsets.ViewSet):
     """
     ViewSet for statistics endpoint.
-    Returns total projects, total employees, and total hours for a month.
+    Returns total projects, total employees, and total hours for a month,
+    or per-month figures for a range of months.
     """
     permission_classes = [AllowAny]
+    MAX_RANGE_MONTHS = 240
 
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """
         Get statistics for the system or a specific month/year.
         Query params: month, year (optional)
+        Range mode: from, to (YYYY-MM), e.g. ?from=2025-01&to=2025-12
         """
+        if 'from' in request.query_params or 'to' in request.query_params:
+            return self._range_statistics(request)
+
         month = request.query_params.get('month', None)
         year = request.query_params.get('year', None)
 
-        # Total employees
-        total_employees = Employee.objects.count()
+        # Closed months are served from the statistics stored when they were closed
+        if month and year and month.isdigit() and year.isdigit():
+            close = MonthClose.objects.filter(year=year, month=month).only('statistics', 'closed_at').first()
+            if close is not None:
+                return closed_month_response(request, Response(close.statistics), close.closed_at)
+
+        return Response(live_stats.month_statistics(month, year))
+
+    def _range_statistics(self, request):
+        """
+        Per-month project counts, active employees and hours for a range of months.
+        Uses one grouped query per table, so the cost does not grow with the number of months.
+        """
+        try:
+            start = parse_month(request.query_params.get('from', ''))
+            end = parse_month(request.query_params.get('to', ''))
+        except ValueError:
+            return Response({'error': 'from and to must be in the format YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+
+        month_count = (end[0] - start[0]) * 12 + end[1] - start[1] + 1
+        if month_count < 1:
+            return Response({'error': 'from must not be after to'}, status=status.HTTP_400_BAD_REQUEST)
+        if month_count > self.MAX_RANGE_MONTHS:
+            return Response(
+                {'error': f'Range is limited to {self.MAX_RANGE_MONTHS} months'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        date_from = datetime(start[0], start[1], 1).date()
+        date_to = datetime(end[0] + end[1] // 12, end[1] % 12 + 1, 1).date()
+
+        months = {}
+        for index in range(month_count):
+            year, month = divmod(start[0] * 12 + start[1] - 1 + index, 12)
+            months[(year, month + 1)] = {
+                'year': year,
+                'month': month + 1,
+                'total_projects': 0,
+                'active_employees': 0,
+                'total_hours': 0.0,
+            }
 
-        # Total projects (optionally filtered by month/year)
-        projects_query = Project.objects.all()
-        if month:
-            projects_query = projects_query.filter(date__month=month)
-        if year:
-            projects_query = projects_query.filter(date__year=year)
-        total_projects = projects_query.count()
+        projects = (
+            Project.objects.filter(date__gte=date_from, date__lt=date_to)
+            .annotate(period=TruncMonth('date'))
+            .values('period')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for row in projects:
+            months[(row['period'].year, row['period'].month)]['total_projects'] += row['total']
 
-        # Total hours (optionally filtered by month/year)
-        hours_query = EmployeeProject.objects.all()
-        if month:
-            hours_query = hours_query.filter(project__date__month=month)
-        if year:
-            hours_query = hours_query.filter(project__date__year=year)
+        assignments = (
+            EmployeeProject.objects.filter(project__date__gte=date_from, project__date__lt=date_to)
+            .annotate(period=TruncMonth('project__date'))
+            .values('period')
+            .annotate(employees=Count('employee', distinct=True), hours=Sum('hours_worked'))
+            .order_by()
+        )
+        for row in assignments:
+            entry = months[(row['period'].year, row['period'].month)]
+            entry['active_employees'] += row['employees']
+            entry['total_hours'] += row['hours'] or 0.0
 
-        total_hours_result = hours_query.aggregate(total=Sum('hours_worked'))
-        total_hours = total_hours_result['total'] or 0.0
+        # Archived months come from their manifests
+        archived = ArchiveManifest.objects.filter(
+            Q(year__gt=start[0]) | Q(year=start[0], month__gte=start[1]),
+            Q(year__lt=end[0]) | Q(year=end[0], month__lte=end[1]),
+        )
+        for manifest in archived:
+            entry = months[(manifest.year, manifest.month)]
+            entry['total_projects'] += manifest.project_count
+            entry['active_employees'] += manifest.employee_count
+            entry['total_hours'] += manifest.total_hours
+
+        for entry in months.values():
+            entry['total_hours'] = round(entry['total_hours'], 2)
 
         return Response({
-            'total_employees': total_employees,
-            'total_projects': total_projects,
-            'total_hours': round(total_hours, 2),
-            'month': int(month) if month else None,
-            'year': int(year) if year else None,
+            'total_employees': Employee.objects.count(),
+            'from': f'{start[0]}-{start[1]:02d}',
+            'to': f'{end[0]}-{end[1]:02d}',
+            'months': list(months.values()),
         })
+
+
+
+async def statistics_stream(request):
+    """
+    Server-sent events with the statistics of a month and/or year.
+    Sends the current figures on connect and again whenever a write changes them,
+    with a keep-alive comment in between. Under WSGI, where an open stream would hold
+    a worker thread, one event is sent and the client reconnects after the keep-alive interval.
+    Endpoint: /api/statistics/stream/?month=1&year=2025
+    """
+    try:
+        month = int(request.GET['month']) if request.GET.get('month') else None
+        year = int(request.GET['year']) if request.GET.get('year') else None
+    except ValueError:
+        return JsonResponse({'error': 'month and year must be numbers'}, status=status.HTTP_400_BAD_REQUEST)
+    if month is not None and not 1 <= month <= 12:
+        return JsonResponse({'error': 'month must be between 1 and 12'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(live_stats.event_stream(month, year), content_type='text/event-stream')
+    else:
+        response = HttpResponse(
+            await sync_to_async(live_stats.single_event)(month, year), content_type='text/event-stream'
+        )
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class MonthCloseViewSet(viewsets.ViewSet):
+    """
+    ViewSet for closing months after payroll.
+    A closed month can no longer be changed; its statistics, per-employee totals and
+    PDF reports are served from the snapshots taken when it was closed.
+    Closing and reopening is staff-only.
+    """
+    lookup_value_regex = r'\d{4}-\d{2}'
+
+    def get_permissions(self):
+        if self.action in ('create', 'destroy'):
+            return [IsAdminUser()]
+        return [AllowAny()]
+
+    def list(self, request):
+        """
+        List the closed months, newest first.
+        Endpoint: /api/month-closes/
+        """
+        return Response([
+            {
+                'month': f"{close['year']}-{close['month']:02d}",
+                'closed_at': close['closed_at'],
+                'statistics': close['statistics'],
+            }
+            for close in MonthClose.objects.values('year', 'month', 'closed_at', 'statistics')
+        ])
+
+    def retrieve(self, request, pk=None):
+        """
+        Statistics and per-employee totals of a closed month.
+        Endpoint: /api/month-closes/2025-01/
+        """
+        try:
+            year, month = parse_month(pk)
+        except ValueError:
+            return Response({'error': 'Month must be in the format YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+        close = MonthClose.objects.filter(year=year, month=month).first()
+        if close is None:
+            return Response({'error': f'{pk} is not closed'}, status=status.HTTP_404_NOT_FOUND)
+
+        employees = [
+            {
+                'employee_id': report['employee_id'],
+                'first_name': report['employee__first_name'],
+                'last_name': report['employee__last_name'],
+                'total_hours': report['total_hours'],
+                'entries': report['entry_count'],
+            }
+            for report in close.reports.values(
+                'employee_id', 'employee__first_name', 'employee__last_name', 'total_hours', 'entry_count'
+            )
+        ]
+        response = Response({
+            'month': pk,
+            'closed_at': close.closed_at,
+            'statistics': close.statistics,
+            'employees': employees,
+        })
+        return closed_month_response(request, response, close.closed_at)
+
+    def create(self, request):
+        """
+        Close a month: lock its projects and hours and snapshot its statistics, totals and PDF reports.
+        Endpoint: POST /api/month-closes/
+        Body: {"month": "YYYY-MM"}
+        """
+        try:
+            year, month = parse_month(str(request.data.get('month', '')))
+        except ValueError:
+            return Response({'error': 'month must be in the format YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+        today = timezone.now().date()
+        if (year, month) > (today.year, today.month):
+            return Response({'error': 'Future months cannot be closed'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            close = month_close.close_month(year, month)
+        except month_close.MonthAlreadyClosed as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'month': f'{year}-{month:02d}',
+            'closed_at': close.closed_at,
+            'statistics': close.statistics,
+            'reports': close.reports.count(),
+        }, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, pk=None):
+        """
+        Reopen a closed month and drop its snapshots.
+        Endpoint: DELETE /api/month-closes/2025-01/
+        """
+        try:
+            year, month = parse_month(pk)
+        except ValueError:
+            return Response({'error': 'Month must be in the format YYYY-MM'}, status=status.HTTP_400_BAD_REQUEST)
+        if not month_close.reopen_month(year, month):
+            return Response({'error': f'{pk} is not closed'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    ViewSet for the incremental delta-sync feed used by offline clients.
+    Returns the rows created, changed or deleted since the given token.
+    """
+    permission_classes = [AllowAny]
+
+    @staticmethod
+    def encode_token(moment):
+        """Encode a timestamp as an opaque token (microseconds since the epoch)."""
+        return str(int(moment.timestamp() * 1_000_000))
+
+    @staticmethod
+    def decode_token(token):
+        """Decode a token produced by encode_token back into an aware datetime."""
+        return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+
+    def list(self, request):
+        """
+        Get changes since a sync token.
+        Query params: since (optional, omit for a full download)
+        Example: /api/sync/?since=1761955200000000
+        """
+        since = request.query_params.get('since', None)
+
+        # Take the new token before reading, and SYNC_SAFETY_WINDOW seconds back: a row is
+        # stamped with updated_at when it is saved but only visible once its transaction
+        # commits, so a slow transaction can commit rows older than the time of this read.
+        # Rows from the window are delivered again next time rather than lost.
+        now = timezone.now()
+        token = self.encode_token(now - timedelta(seconds=settings.SYNC_SAFETY_WINDOW))
+
+        employees = Employee.objects.all()
+        projects = Project.objects.all()
+        employee_projects = EmployeeProject.objects.all()
+        deleted = {'employees': [], 'projects': [], 'employee_projects': []}
+
+        if since:
+            try:
+                since_dt = self.decode_token(since)
+            except (ValueError, TypeError, OverflowError, OSError):
+                return Response({'error': 'Invalid since token'}, status=status.HTTP_400_BAD_REQUEST)
+            if since_dt < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+                # Tombstones this old are pruned, so deletes could be missing: start over
+                since = None
+
+        if since:
+            employees = employees.filter(updated_at__gte=since_dt)
+            projects = projects.filter(updated_at__gte=since_dt)
+            employee_projects = employee_projects.filter(updated_at__gte=since_dt)
+
+            keys = {'employee': 'employees', 'project': 'projects', 'employeeproject': 'employee_projects'}
+            tombstones = Tombstone.objects.filter(deleted_at__gte=since_dt).values_list('model_name', 'object_id')
+            for model_name, object_id in tombstones:
+                if model_name in keys:
+                    deleted[keys[model_name]].append(object_id)
+
+        return Response({
+            'token': token,
+            'full': not since,
+            'employees': EmployeeSyncSerializer(employees.order_by('id'), many=True).data,
+            'projects': ProjectSyncSerializer(projects.order_by('id'), many=True).data,
+            'employee_projects': EmployeeProjectSyncSerializer(employee_projects.order_by('id'), many=True).data,
+            'deleted': deleted,
+        })
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """
+    ViewSet for time-bucketed hours analytics.
+    Aggregates EmployeeProject hours by whitelisted dimensions in a single grouped query.
+    Archived months are not included.
+    """
+    permission_classes = [AllowAny]
+
+    # Dimension name -> output keys mapped to a field path or a database expression
+    DIMENSIONS = {
+        'role': {'role': 'employee__role_key'},
+        'employee': {
+            'employee_id': 'employee_id',
+            'employee_first_name': 'employee__first_name',
+            'employee_last_name': 'employee__last_name',
+        },
+        'project': {'project_id': 'project_id', 'project_name': 'project__name'},
+        'day': {'day': 'project__date'},
+        'week': {'week': TruncWeek('project__date')},
+        'month': {'month': TruncMonth('project__date')},
+        'year': {'year': TruncYear('project__date')},
+    }
+    DEFAULT_LIMIT = 500
+    MAX_LIMIT = 5000
+    CLOSED_PERIOD_CACHE_TIMEOUT = 60 * 60 * 24
+
+    @action(detail=False, methods=['get'])
+    def hours(self, request):
+        """
+        Get total hours, entries and headcount grouped by the requested dimensions.
+        Query params: group_by (comma separated: role, employee, project, day, week, month, year),
+                      date_from, date_to (YYYY-MM-DD, optional), limit (optional, max 5000)
+        Example: /api/analytics/hours/?group_by=role,week&date_from=2025-11-01&date_to=2025-11-30
+        """
+        group_by = [name.strip() for name in request.query_params.get('group_by', '').split(',') if name.strip()]
+        if not group_by:
+            return Response({'error': 'group_by is required'}, status=status.HTTP_400_BAD_REQUEST)
+        unknown = [name for name in group_by if name not in self.DIMENSIONS]
+        if unknown:
+            return Response(
+                {'error': f"Unknown group_by dimension(s): {', '.join(unknown)}",
+                 'allowed': list(self.DIMENSIONS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            date_from = request.query_params.get('date_from', None)
+            date_to = request.query_params.get('date_to', None)
+            date_from = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None
+            date_to = datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None
+            limit = min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'Invalid date or limit parameter'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # A range of closed months only changes when one is reopened (the close times change) or
+        # archived or restored (which bumps the facet generation), so it is cached under both
+        closed_at = self._closed_at(date_from, date_to)
+        if closed_at is not None:
+            version = f'{int(closed_at.timestamp() * 1_000_000)}-{facets.generation.read()}'
+            cache_key = f"analytics:hours:{version}:{','.join(group_by)}:{date_from}:{date_to}:{limit}"
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return revalidated_response(request, Response(cached), f'"analytics-{version}"')
+
+        queryset = EmployeeProject.objects.all()
+        if date_from:
+            queryset = queryset.filter(project__date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(project__date__lte=date_to)
+
+        columns, expressions, renames = [], {}, {}
+        for name in group_by:
+            for key, source in self.DIMENSIONS[name].items():
+                if isinstance(source, str):
+                    columns.append(source)
+                    renames[source] = key
+                else:
+                    columns.append(key)
+                    expressions[key] = source
+
+        rows = list(
+            queryset.annotate(**expressions)
+            .values(*columns)
+            .annotate(
+                total_hours=Sum('hours_worked'),
+                entries=Count('id'),
+                headcount=Count('employee', distinct=True),
+            )
+            .order_by(*columns)[:limit + 1]
+        )
+
+        results = []
+        for row in rows[:limit]:
+            results.append({renames.get(key, key): value for key, value in row.items()})
+            results[-1]['total_hours'] = round(results[-1]['total_hours'] or 0.0, 2)
+
+        data = {
+            'group_by': group_by,
+            'date_from': date_from,
+            'date_to': date_to,
+            'truncated': len(rows) > limit,
+            'results': results,
+        }
+
+        if closed_at is not None:
+            cache.set(cache_key, data, self.CLOSED_PERIOD_CACHE_TIMEOUT)
+            return revalidated_response(request, Response(data), f'"analytics-{version}"')
+        return Response(data)
+
+    @staticmethod
+    def _closed_at(date_from, date_to):
+        """The latest close of the months from date_from to date_to if every one of them is closed, else None."""
+        if date_from is None or date_to is None or date_from > date_to:
+            return None
+        first = date_from.year * 12 + date_from.month - 1
+        last = date_to.year * 12 + date_to.month - 1
+        closes = MonthClose.objects.annotate(index=F('year') * 12 + F('month') - 1).filter(
+            index__gte=first, index__lte=last
+        ).aggregate(count=Count('id'), closed_at=Max('closed_at'))
+        return closes['closed_at'] if closes['count'] == last - first + 1 else None
+
+
+
+class _WindowSum(Func):
+    """SUM() OVER a window. Unlike Sum(), it can take an aggregate of the same query as its argument."""
+    function = 'SUM'
+    window_compatible = True
+
+
+class RankingsViewSet(viewsets.ViewSet):
+    """
+    ViewSet for top-N leaderboards of employees, projects or roles.
+    Rank, share of the period total and the change against the previous period
+    come from one grouped query with window functions. Archived months are not included.
+    """
+    permission_classes = [AllowAny]
+
+    # Ranked subject -> output keys mapped to field paths. Projects are ranked by name,
+    # since a project row only covers a single workday.
+    SUBJECTS = {
+        'employee': {
+            'employee_id': 'employee_id',
+            'employee_first_name': 'employee__first_name',
+            'employee_last_name': 'employee__last_name',
+        },
+        'project': {'project_name': 'project__name'},
+        'role': {'role': 'employee__role_key'},
+    }
+    METRICS = {
+        'hours': (Sum, 'hours_worked', FloatField),
+        'entries': (Count, 'id', IntegerField),
+    }
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 100
+
+    def _periods(self, request):
+        """(current start, current end, previous start) of the requested month or year, default this month."""
+        today = timezone.now().date()
+        month = request.query_params.get('month', None)
+        year = request.query_params.get('year', None)
+        year = int(year) if year else today.year
+        if month is None and 'year' in request.query_params:
+            return datetime(year, 1, 1).date(), datetime(year + 1, 1, 1).date(), datetime(year - 1, 1, 1).date()
+        month = int(month) if month else today.month
+        start = datetime(year, month, 1).date()
+        end = datetime(year + month // 12, month % 12 + 1, 1).date()
+        previous = datetime(year - (month == 1), (month - 2) % 12 + 1, 1).date()
+        return start, end, previous
+
+    @classmethod
+    def ranking_queryset(cls, by, metric, start, end, previous_start):
+        """Grouped rows of the period ordered by rank. Both periods are read in one pass over project_date_idx."""
+        aggregate, field, output_field = cls.METRICS[metric]
+        columns = cls.SUBJECTS[by]
+        return (
+            EmployeeProject.objects.filter(project__date__gte=previous_start, project__date__lt=end)
+            .values(*columns.values())
+            .annotate(
+                value=Coalesce(aggregate(field, filter=Q(project__date__gte=start)), 0, output_field=output_field()),
+                previous_value=Coalesce(aggregate(field, filter=Q(project__date__lt=start)), 0,
+                                        output_field=output_field()),
+            )
+            .filter(value__gt=0)
+            .annotate(
+                rank=Window(Rank(), order_by=F('value').desc()),
+                period_total=Window(_WindowSum(F('value'), output_field=output_field())),
+            )
+            .order_by('rank', *columns.values())
+        )
+
+    def list(self, request):
+        """
+        Get the top entries by hours or number of assignments in a month or year.
+        Query params: by (employee, project, role), metric (hours, entries, default hours),
+                      month, year (optional, default current month), limit (optional, max 100)
+        Example: /api/rankings/?by=employee&metric=hours&month=11&year=2025&limit=10
+        """
+        by = request.query_params.get('by', '')
+        metric = request.query_params.get('metric', 'hours')
+        if by not in self.SUBJECTS:
+            return Response(
+                {'error': f"by must be one of: {', '.join(self.SUBJECTS)}", 'allowed': list(self.SUBJECTS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if metric not in self.METRICS:
+            return Response(
+                {'error': f'Unknown metric: {metric}', 'allowed': list(self.METRICS)}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start, end, previous_start = self._periods(request)
+            limit = min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'Invalid month, year or limit parameter'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'limit must be positive'}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns = self.SUBJECTS[by]
+        rows = self.ranking_queryset(by, metric, start, end, previous_start)[:limit]
+
+        results = []
+        for row in rows:
+            entry = {key: row[path] for key, path in columns.items()}
+            value, previous_value = row['value'], row['previous_value']
+            entry.update({
+                'rank': row['rank'],
+                'value': round(value, 2),
+                'share': round(value / row['period_total'], 4) if row['period_total'] else 0.0,
+                'previous_value': round(previous_value, 2),
+                'delta': round(value - previous_value, 2),
+                'delta_percent': round((value - previous_value) / previous_value * 100, 1) if previous_value else None,
+            })
+            results.append(entry)
+
+        return Response({
+            'by': by,
+            'metric': metric,
+            'period_start': start,
+            'period_end': end - timedelta(days=1),
+            'previous_period_start': previous_start,
+            'results': results,
+        })
+
+
+class OvertimeViewSet(viewsets.ViewSet):
+    """
+    ViewSet for the overtime report of a month or year.
+    Reads only the per-employee daily totals, never the assignments. Archived months are included.
+    """
+    permission_classes = [AllowAny]
+
+    def list(self, request):
+        """
+        Get the employees with days above OVERTIME_DAILY_HOURS and their hours on each of those days.
+        Query params: month, year (optional, default current month; year alone reports the whole year)
+        Example: /api/overtime/?month=11&year=2025
+        """
+        today = timezone.now().date()
+        month = request.query_params.get('month') or None
+        try:
+            year = int(request.query_params.get('year', today.year))
+            if month:
+                month = int(month)
+            elif 'year' not in request.query_params:
+                month = today.month
+            if month is not None and not 1 <= month <= 12:
+                raise ValueError(month)
+            start = datetime(year, month or 1, 1).date()
+            if month is None:
+                end = datetime(year + 1, 1, 1).date()
+            else:
+                end = datetime(year + month // 12, month % 12 + 1, 1).date()
+        except ValueError:
+            return Response({'error': 'Invalid month or year parameter'}, status=status.HTTP_400_BAD_REQUEST)
+
+        threshold = settings.OVERTIME_DAILY_HOURS
+        period = EmployeeDailyTotal.objects.filter(date__gte=start, date__lt=end)
+        employees = {}
+        overtime_days = period.filter(hours__gt=threshold).order_by('employee_id', 'date')
+        for employee_id, day, hours in overtime_days.values_list('employee_id', 'date', 'hours'):
+            employees.setdefault(employee_id, []).append(
+                {'date': day, 'hours': round(hours, 2), 'overtime_hours': round(hours - threshold, 2)}
+            )
+
+        results = []
+        for row in (
+            period.filter(employee_id__in=employees).values('employee_id')
+            .annotate(days_worked=Count('id'), total_hours=Sum('hours')).order_by()
+        ):
+            days = employees[row['employee_id']]
+            employee = directory.get(row['employee_id'])
+            results.append({
+                'employee_id': row['employee_id'],
+                'first_name': employee.first_name if employee else None,
+                'last_name': employee.last_name if employee else None,
+                'days_worked': row['days_worked'],
+                'total_hours': round(row['total_hours'], 2),
+                'overtime_days': len(days),
+                'overtime_hours': round(sum(day['overtime_hours'] for day in days), 2),
+                'max_day_hours': max(day['hours'] for day in days),
+                'days': days,
+            })
+        results.sort(key=lambda entry: (-entry['overtime_hours'], entry['employee_id']))
+
+        return Response({
+            'month': month,
+            'year': year,
+            'period_start': start,
+            'period_end': end - timedelta(days=1),
+            'overtime_threshold': threshold,
+            'daily_limit': settings.DAILY_HOURS_LIMIT,
+            'total_overtime_hours': round(sum(entry['overtime_hours'] for entry in results), 2),
+            'employees': results,
+        })
+
+
+class ProfileViewSet(viewsets.ViewSet):
+    """
+    Staff-only ViewSet for the request profiles captured by ProfilingMiddleware.
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        """List stored profiles, newest first."""
+        from . import profiling
+
+        return Response(profiling.list_profiles())
+
+    def retrieve(self, request, pk=None):
+        """Full profile: SQL queries with timings, memory peak and the top functions."""
+        from . import profiling
+
+        summary = profiling.load_profile(pk)
+        if summary is None:
+            return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(summary)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download the cProfile dump (.prof) for pstats or snakeviz."""
+        from . import profiling
+
+        path = profiling.profile_stats_path(pk)
+        if path is None:
+            return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{pk}.prof',
+                            content_type='application/octet-stream')
@@ -0,0 +1,93 @@
+"""
+Worker warm-up.
+
+Runs once in every gunicorn worker after it loaded the application and
+before it accepts requests (see WorkTrack/gunicorn_conf.py), so the first
+requests do not pay for opening the database connection, compiling the URL
+patterns, building serializer fields, loading the employee directory and
+loading ReportLab with its fonts and the logo.
+"""
+import inspect
+import logging
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.db import connection
+from django.urls import NoReverseMatch, Resolver404, get_resolver, resolve, reverse
+
+logger = logging.getLogger('core.warmup')
+
+# Set once warm_up() finished in this process
+warmed_up = False
+
+
+def _database():
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def _urls():
+    """Compile every URL pattern and resolve one path per named route."""
+    resolver = get_resolver()
+    for name in [key for key in resolver.reverse_dict if isinstance(key, str)]:
+        for possibilities, *_ in resolver.reverse_dict.getlist(name):
+            for _, params in possibilities:
+                try:
+                    resolve(reverse(name, kwargs=dict.fromkeys(params, '1')))
+                except (NoReverseMatch, Resolver404):
+                    pass
+
+
+def _serializers():
+    from rest_framework.serializers import BaseSerializer
+    from . import serializers
+
+    for _, serializer_class in inspect.getmembers(serializers, inspect.isclass):
+        if issubclass(serializer_class, BaseSerializer) and serializer_class.__module__ == serializers.__name__:
+            serializer_class().fields
+
+
+def _directory():
+    from .directory import directory
+
+    directory.snapshot()
+
+
+def _pdf():
+    from . import reports
+    from .models import Employee
+
+    employee = Employee(first_name='Warm', last_name='Up', phone_number='', role='')
+    reports.render_monthly_canvas(employee, [], 'Warm-up', BytesIO())
+    reports.render_monthly_platypus(employee, [], 'Warm-up', BytesIO())
+
+
+STEPS = {
+    'database': _database,
+    'urls': _urls,
+    'serializers': _serializers,
+    'directory': _directory,
+    'pdf': _pdf,
+}
+
+
+def warm_up(steps=None):
+    """
+    Run the warm-up steps (default: WARMUP_STEPS) and return their durations in ms.
+    A failing step is logged and skipped, it never keeps the worker from starting.
+    """
+    global warmed_up
+    timings = {}
+    for name in settings.WARMUP_STEPS if steps is None else steps:
+        started = time.perf_counter()
+        try:
+            STEPS[name]()
+        except Exception:
+            logger.exception('Warm-up step %s failed', name)
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    warmed_up = True
+    return timings
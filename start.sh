@@ -18,5 +18,5 @@ cd WorkTrack
 export PYTHONPATH=..:$PYTHONPATH
 
 # Start gunicorn (WorkTrack module is at ./WorkTrack/wsgi.py)
-exec gunicorn WorkTrack.wsgi:application --bind 0.0.0.0:$PORT
+exec gunicorn WorkTrack.wsgi:application --config python:WorkTrack.gunicorn_conf --bind 0.0.0.0:$PORT
 